@@ -15,7 +15,6 @@
 #
 import numpy as np
 from numpy.random import rand
-import matplotlib.pyplot as plt
 
 #
 # Here we define the interactions of the model (2D spin Ising model)
@@ -45,8 +44,8 @@ def mcmove(config, N, beta):
 #This function makes an image of the spin configurations
 def configPlot(f, config, i, N):
         ''' This modules plts the configuration '''
-        X, Y = np.meshgrid(range(N), range(N))
-        plt.pcolormesh(X, Y, config, vmin=-1.0, vmax=1.0, cmap='RdBu_r');
+        import matplotlib.pyplot as plt
+        plt.pcolormesh(config, vmin=-1.0, vmax=1.0, cmap='RdBu_r', shading='nearest');
         plt.title('MC iteration=%d'%i);
         plt.axis('tight')
         plt.pause(0.1)
@@ -54,12 +53,13 @@ def configPlot(f, config, i, N):
 #This function calculates the energy of a given configuration for the plots of Energy as a function of T
 def calcEnergy(config):
     '''Energy of a given configuration'''
+    N = len(config)
     energy = 0
     for i in range(len(config)):
         for j in range(len(config)):
             S = config[i,j]
             nb = config[(i+1)%N, j] + config[i,(j+1)%N] + config[(i-1)%N, j] + config[i,(j-1)%N]
-            energy += -nb*S
+            energy += -int(nb*S)
     return energy/4.
 
 #This function calculates the magnetization of a given configuration
@@ -70,83 +70,89 @@ def calcMag(config):
 #
 # MAIN PROGRAM
 #
-#
-#  Here we set initial conditions and control the flow of the simulation
-#
-#size of the lattice
-N = 64
-#Enter data for the simulation
-temp = float(input("\n Please enter temperature in reduced units (suggestion 1.2): "))
-msrmnt = int(input("\n Enter number of Monte Carlo iterations (suggestion 1000):"))
-
-#Init Magnetization and Energy
-step=[]
-M=[]
-E=[]
-
-#Generate initial condition
-config = 0.0*np.random.randint(2, size=(N,N))-1.0
-
-#Calculate initial value of magnetization and Energy
-Ene = calcEnergy(config)/(N*N)     # calculate average energy
-Mag = calcMag(config)/(N*N)        # calculate average magnetisation
-t=0
-print('MC step=',t,' Energy=',Ene,' M=',Mag)
-#Update 
-step.append(t)
-E.append(Ene)
-M.append(Mag)
-
-#Show initial condition
-print('Initial configuration:')
-print(config)
-#f = plt.figure(figsize=(15, 15), dpi=80);
-f = plt.figure(dpi=100)
-configPlot(f, config, 0, N)
-plt.show()
-
-#Turn on interactive mode for plots
-print("Starting MC simulation")
-plt.ion()
-
-#Perform the MC iterations
-for i in range(msrmnt):
-            #call MC calculation
-            mcmove(config, N, 1.0/temp)
-            #update variables
-            t=t+1                              # update MC step
-            Ene = calcEnergy(config)/(N*N)     # calculate average energy
-            Mag = calcMag(config)/(N*N)        # calculate average magnetisation
-            #Update 
-            step.append(t)
-            E.append(Ene)
-            M.append(Mag)
-
-            #plot certain configurations
-            if t%100 == 0:
-                print('\nMC step=',t,' Energy=',Ene,' M=',Mag)
-                print(config)
-                configPlot(f, config, t, N)
-
-#Print end
-print('\nSimulation finished after',t, 'MC steps')
-
-#interactive plotting off
-plt.ioff()
-
-#Show final configuration
-configPlot(f, config, t, N)
-plt.show()
-
-#Plot evolution of Energy and Magnetization during the simulation
-plt.subplot(2, 1, 1)
-plt.plot(step, E, 'r+-')
-plt.ylabel('Energy')
-
-plt.subplot(2, 1, 2)
-plt.plot(step, M, 'b+-')
-plt.ylabel('Magnetization')
-plt.xlabel('MC step')
-
-#Show the plot in screen
-plt.show()
+def main():
+    import matplotlib.pyplot as plt
+    #
+    #  Here we set initial conditions and control the flow of the simulation
+    #
+    #size of the lattice
+    N = 64
+    #Enter data for the simulation
+    temp = float(input("\n Please enter temperature in reduced units (suggestion 1.2): "))
+    msrmnt = int(input("\n Enter number of Monte Carlo iterations (suggestion 1000):"))
+
+    #Init Magnetization and Energy
+    step=[]
+    M=[]
+    E=[]
+
+    #Generate initial condition
+    config = np.full((N,N), -1, dtype=np.int8)
+
+    #Calculate initial value of magnetization and Energy
+    Ene = calcEnergy(config)/(N*N)     # calculate average energy
+    Mag = calcMag(config)/(N*N)        # calculate average magnetisation
+    t=0
+    print('MC step=',t,' Energy=',Ene,' M=',Mag)
+    #Update 
+    step.append(t)
+    E.append(Ene)
+    M.append(Mag)
+
+    #Show initial condition
+    print('Initial configuration:')
+    print(config)
+    #f = plt.figure(figsize=(15, 15), dpi=80);
+    f = plt.figure(dpi=100)
+    configPlot(f, config, 0, N)
+    plt.show()
+
+    #Turn on interactive mode for plots
+    print("Starting MC simulation")
+    plt.ion()
+
+    #Perform the MC iterations
+    for i in range(msrmnt):
+                #call MC calculation
+                mcmove(config, N, 1.0/temp)
+                #update variables
+                t=t+1                              # update MC step
+                Ene = calcEnergy(config)/(N*N)     # calculate average energy
+                Mag = calcMag(config)/(N*N)        # calculate average magnetisation
+                #Update 
+                step.append(t)
+                E.append(Ene)
+                M.append(Mag)
+
+                #plot certain configurations
+                if t%100 == 0:
+                    print('\nMC step=',t,' Energy=',Ene,' M=',Mag)
+                    print(config)
+                    configPlot(f, config, t, N)
+
+    #Print end
+    print('\nSimulation finished after',t, 'MC steps')
+
+    #interactive plotting off
+    plt.ioff()
+
+    #Show final configuration
+    configPlot(f, config, t, N)
+    plt.show()
+
+    #Plot evolution of Energy and Magnetization during the simulation
+    plt.subplot(2, 1, 1)
+    plt.plot(step, E, 'r+-')
+    plt.ylabel('Energy')
+
+    plt.subplot(2, 1, 2)
+    plt.plot(step, M, 'b+-')
+    plt.ylabel('Magnetization')
+    plt.xlabel('MC step')
+
+    #Show the plot in screen
+    plt.show()
+
+
+if __name__ == '__main__':
+    main()
@@ -11,7 +11,6 @@
 #
 import numpy as np
 from numpy.random import rand
-import matplotlib.pyplot as plt
 
 #----------------------------------------------------------------------
 ##  BLOCK OF FUNCTIONS USED IN THE MAIN CODE
@@ -20,13 +19,14 @@ import matplotlib.pyplot as plt
 #Generation of a random initial state for NxN spins
 def initialstate(N):   
     ''' generates a random spin configuration for initial condition'''
-    state = 2*np.random.randint(2, size=(N,N))-1
+    state = 2*np.random.randint(2, size=(N,N), dtype=np.int8)-1
     return state
 
 # Here we define the interactions of the model (2D spin Ising model) 
 # and the solution method (Metropolis Monte Carlo) 
 def mcmove(config, beta):
     '''Monte Carlo move using Metropolis algorithm '''
+    N = len(config)
     for i in range(N):
         for j in range(N):
                 #select random spin from NxN system  
@@ -48,12 +48,13 @@ def mcmove(config, beta):
 #This function calculates the energy of a given configuration for the plots of Energy as a function of T
 def calcEnergy(config):
     '''Energy of a given configuration'''
+    N = len(config)
     energy = 0
     for i in range(len(config)):
         for j in range(len(config)):
             S = config[i,j]
             nb = config[(i+1)%N, j] + config[i,(j+1)%N] + config[(i-1)%N, j] + config[i,(j-1)%N]
-            energy += -nb*S
+            energy += -int(nb*S)
     return energy/4.
 
 #This function calculates the magnetization of a given configuration
@@ -64,6 +65,7 @@ def calcMag(config):
 
 #This function makes a plot of all data
 def resultPlot(T,Energy,Magnetization,SpecificHeat,Susceptibility):
+    import matplotlib.pyplot as plt
  # Plot everything
     plt.clf()
     plt.subplot(2, 2, 1 );
@@ -91,78 +93,89 @@ def resultPlot(T,Energy,Magnetization,SpecificHeat,Susceptibility):
 #
 # MAIN PROGRAM
 #
-# Initial parameters for calculation
-## change the parameters below to change system size and statistics
-nt      = 100         # number of temperature points
-N       = 2**4        # size of the lattice, N x N
-eqSteps = 2**10       # number of MC sweeps for equilibration
-mcSteps = 2**10       # number of MC sweeps for calculation
-
-## recommended values
-#nt      = 2**8        # number of temperature points
-#N       = 2**4        # size of the lattice, N x N
-#eqSteps = 2**10       # number of MC sweeps for equilibration
-#mcSteps = 2**10       # number of MC sweeps for calculation
-
-#calculate normalization constants for future averages
-n1  = 1.0/(mcSteps*N*N)
-n2  = 1.0/(mcSteps*mcSteps*N*N)
-
-#Generate a random distribution of temperatures 
-#centered around the most interesting one (tm) to make an exploration
-tm = 2.269    
-T=np.random.normal(tm, .64, nt)
-#keep only those in a reasonable interval
-T  = T[(T>1.0) & (T<4.0)]
-T.sort()
-nt = np.size(T)
-
-#Init calculation of physical quantities
-Energy       = np.zeros(nt)
-Magnetization  = np.zeros(nt)
-SpecificHeat = np.zeros(nt)
-Susceptibility = np.zeros(nt)
+def main():
+    import matplotlib.pyplot as plt
+    # Initial parameters for calculation
+    ## change the parameters below to change system size and statistics
+    nt      = 100         # number of temperature points
+    N       = 2**4        # size of the lattice, N x N
+    eqSteps = 2**10       # number of MC sweeps for equilibration
+    mcSteps = 2**10       # number of MC sweeps for calculation
+    msSteps = 1           # measure every msSteps MC sweeps (successive sweeps are correlated)
+
+    ## recommended values
+    #nt      = 2**8        # number of temperature points
+    #N       = 2**4        # size of the lattice, N x N
+    #eqSteps = 2**10       # number of MC sweeps for equilibration
+    #mcSteps = 2**10       # number of MC sweeps for calculation
+
+    #calculate normalization constants for future averages
+    #(over the mcSteps/msSteps measurements)
+    nmsr = mcSteps//msSteps
+    n1  = 1.0/(nmsr*N*N)
+    n2  = 1.0/(nmsr*nmsr*N*N)
+
+    #Generate a random distribution of temperatures 
+    #centered around the most interesting one (tm) to make an exploration
+    tm = 2.269    
+    T=np.random.normal(tm, .64, nt)
+    #keep only those in a reasonable interval
+    T  = T[(T>1.0) & (T<4.0)]
+    T.sort()
+    nt = np.size(T)
+
+    #Init calculation of physical quantities
+    Energy       = np.zeros(nt)
+    Magnetization  = np.zeros(nt)
+    SpecificHeat = np.zeros(nt)
+    Susceptibility = np.zeros(nt)
+
+
+    #----------------------------------------------------------------------
+    #  SIMULATION LOOP
+    #----------------------------------------------------------------------
+    print('Starting Simulations at ',len(T),' different temperatures.')
+
+    #Init interative plot
+    plt.ion()
+    plt.figure(figsize=(18, 10)); # create figure to plot the calculated values    
+
+    for m in range(len(T)):
+        E1 = M1 = E2 = M2 = 0
+        config = initialstate(N)
+        iT=1.0/T[m]
+        iT2=iT*iT
+        print('Running Simulation ',m+1,' of',len(T),' at reduced temperature T=',T[m])
+
+        for i in range(eqSteps):         # equilibrate
+            mcmove(config, iT)           # Monte Carlo moves
+
+        for i in range(nmsr*msSteps):
+            mcmove(config, iT)           
+            if (i+1) % msSteps != 0:     # no measurement in this sweep
+                continue
+            Ene = calcEnergy(config)     # calculate the energy
+            Mag = calcMag(config)        # calculate the magnetisation
+
+            E1 = E1 + Ene
+            M1 = M1 + Mag
+            M2 = M2 + Mag*Mag 
+            E2 = E2 + Ene*Ene
+
+            Energy[m]         = n1*E1
+            Magnetization[m]  = n1*M1
+            SpecificHeat[m]   = (n1*E2 - n2*E1*E1)*iT2
+            Susceptibility[m] = (n1*M2 - n2*M1*M1)*iT
+
+        #Plot final data for this T
+        resultPlot(T,Energy,Magnetization,SpecificHeat,Susceptibility)
+
+    #end interactive plot: final plot of everything
+    plt.ioff()
+    print("Finished. Plotting all results")
+    resultPlot(T,Energy,Magnetization,SpecificHeat,Susceptibility)
+    plt.show()
 
 
-#----------------------------------------------------------------------
-#  SIMULATION LOOP
-#----------------------------------------------------------------------
-print('Starting Simulations at ',len(T),' different temperatures.')
-
-#Init interative plot
-plt.ion()
-plt.figure(figsize=(18, 10)); # create figure to plot the calculated values    
-
-for m in range(len(T)):
-    E1 = M1 = E2 = M2 = 0
-    config = initialstate(N)
-    iT=1.0/T[m]
-    iT2=iT*iT
-    print('Running Simulation ',m+1,' of',len(T),' at reduced temperature T=',T[m])
-    
-    for i in range(eqSteps):         # equilibrate
-        mcmove(config, iT)           # Monte Carlo moves
-
-    for i in range(mcSteps):
-        mcmove(config, iT)           
-        Ene = calcEnergy(config)     # calculate the energy
-        Mag = calcMag(config)        # calculate the magnetisation
-
-        E1 = E1 + Ene
-        M1 = M1 + Mag
-        M2 = M2 + Mag*Mag 
-        E2 = E2 + Ene*Ene
-
-        Energy[m]         = n1*E1
-        Magnetization[m]  = n1*M1
-        SpecificHeat[m]   = (n1*E2 - n2*E1*E1)*iT2
-        Susceptibility[m] = (n1*M2 - n2*M1*M1)*iT
-        
-    #Plot final data for this T
-    resultPlot(T,Energy,Magnetization,SpecificHeat,Susceptibility)
-        
-#end interactive plot: final plot of everything
-plt.ioff()
-print("Finished. Plotting all results")
-resultPlot(T,Energy,Magnetization,SpecificHeat,Susceptibility)
-plt.show()
+if __name__ == '__main__':
+    main()
@@ -11,7 +11,6 @@
 #
 import numpy as np
 from numpy.random import rand
-import matplotlib.pyplot as plt
 
 #
 # Function implementing the method (Metropolis Monte Carlo) and model
@@ -47,8 +46,8 @@ def mcmove(config, N, beta):
 #This function makes an image of the spin configurations
 def configPlot(f, config, i, N):
         ''' This modules plts the configuration '''
-        X, Y = np.meshgrid(range(N), range(N))
-        plt.pcolormesh(X, Y, config, vmin=-1.0, vmax=1.0, cmap='RdBu_r');
+        import matplotlib.pyplot as plt
+        plt.pcolormesh(config, vmin=-1.0, vmax=1.0, cmap='RdBu_r', shading='nearest');
         plt.title('MC iteration=%d'%i);
         plt.axis('tight')
         plt.pause(0.1)
@@ -72,89 +71,95 @@ def calcMag(config):
 #
 # MAIN PROGRAM
 #
-#
-#  Here we set initial conditions and control the flow of the simulation
-#
-#size of the lattice
-N = 64
-#Enter data for the simulation
-print("MC Simulation two State system")
-print("------------------------------")
-print("Epsilon = Energy exited state")
-temp = float(input("\n Please enter kT/Epsilon (suggestion 0.5): "))
-msrmnt = int(input("\n Enter number of Monte Carlo (Metropolis) iterations (suggestion 100):"))
-
-#Init Magnetization and Energy
-step=[]
-M=[]
-E=[]
-
-#Generate initial condition random state for all sites
-#config = 2*np.random.randint(2, size=(N,N))-1
-
-#Generate initial condition system in the ground state
-config = np.zeros([N,N]) -1.0
-
-#Calculate initial value of magnetization and Energy
-Ene = calcEnergy(config)/(N*N)     # calculate average energy
-Mag = calcMag(config)/(N*N)        # calculate average magnetisation
-t=0
-print('MC step=',t,' Energy=',Ene,' M=',Mag)
-#Update 
-step.append(t)
-E.append(Ene)
-M.append(Mag)
-
-#Show initial condition
-print('Initial configuration:')
-print(config)
-#f = plt.figure(figsize=(15, 15), dpi=80);
-f = plt.figure(dpi=100)
-configPlot(f, config, 0, N)
-plt.show()
-
-#Turn on interactive mode for plots
-print("Starting MC simulation")
-plt.ion()
-
-#Perform the MC iterations
-for i in range(msrmnt):
-            #call MC calculation
-            mcmove(config, N, 1.0/temp)
-            #update variables
-            t=t+1                              # update MC step
-            Ene = calcEnergy(config)/(N*N)     # calculate average energy
-            Mag = calcMag(config)/(N*N)        # calculate average magnetisation
-            #Update 
-            step.append(t)
-            E.append(Ene)
-            M.append(Mag)
-
-            #plot certain configurations
-            if t%10 == 0:
-                print('\nMC step=',t,' Energy=',Ene,' M=',Mag)
-                print(config)
-                configPlot(f, config, t, N)
-
-#Print end
-print('\nSimulation finished after',t, 'MC steps')
-
-#interactive plotting off
-plt.ioff()
-
-#Show final configuration
-configPlot(f, config, t, N)
-plt.show()
-
-#Plot evolution of Energy and average state during the simulation
-plt.subplot(2, 1, 1)
-plt.plot(step, E, 'r+-')
-plt.ylabel('Energy')
-
-plt.subplot(2, 1, 2)
-plt.plot(step, M, 'b+-')
-plt.ylabel('Average State')
-plt.xlabel('MC step')
-
-#Show the plot in screen
-plt.show()
+def main():
+    import matplotlib.pyplot as plt
+    #
+    #  Here we set initial conditions and control the flow of the simulation
+    #
+    #size of the lattice
+    N = 64
+    #Enter data for the simulation
+    print("MC Simulation two State system")
+    print("------------------------------")
+    print("Epsilon = Energy exited state")
+    temp = float(input("\n Please enter kT/Epsilon (suggestion 0.5): "))
+    msrmnt = int(input("\n Enter number of Monte Carlo (Metropolis) iterations (suggestion 100):"))
+
+    #Init Magnetization and Energy
+    step=[]
+    M=[]
+    E=[]
+
+    #Generate initial condition random state for all sites
+    #config = 2*np.random.randint(2, size=(N,N), dtype=np.int8)-1
+
+    #Generate initial condition system in the ground state
+    config = np.full((N,N), -1, dtype=np.int8)
+
+    #Calculate initial value of magnetization and Energy
+    Ene = calcEnergy(config)/(N*N)     # calculate average energy
+    Mag = calcMag(config)/(N*N)        # calculate average magnetisation
+    t=0
+    print('MC step=',t,' Energy=',Ene,' M=',Mag)
+    #Update 
+    step.append(t)
+    E.append(Ene)
+    M.append(Mag)
+
+    #Show initial condition
+    print('Initial configuration:')
+    print(config)
+    #f = plt.figure(figsize=(15, 15), dpi=80);
+    f = plt.figure(dpi=100)
+    configPlot(f, config, 0, N)
+    plt.show()
+
+    #Turn on interactive mode for plots
+    print("Starting MC simulation")
+    plt.ion()
+
+    #Perform the MC iterations
+    for i in range(msrmnt):
+                #call MC calculation
+                mcmove(config, N, 1.0/temp)
+                #update variables
+                t=t+1                              # update MC step
+                Ene = calcEnergy(config)/(N*N)     # calculate average energy
+                Mag = calcMag(config)/(N*N)        # calculate average magnetisation
+                #Update 
+                step.append(t)
+                E.append(Ene)
+                M.append(Mag)
+
+                #plot certain configurations
+                if t%10 == 0:
+                    print('\nMC step=',t,' Energy=',Ene,' M=',Mag)
+                    print(config)
+                    configPlot(f, config, t, N)
+
+    #Print end
+    print('\nSimulation finished after',t, 'MC steps')
+
+    #interactive plotting off
+    plt.ioff()
+
+    #Show final configuration
+    configPlot(f, config, t, N)
+    plt.show()
+
+    #Plot evolution of Energy and average state during the simulation
+    plt.subplot(2, 1, 1)
+    plt.plot(step, E, 'r+-')
+    plt.ylabel('Energy')
+
+    plt.subplot(2, 1, 2)
+    plt.plot(step, M, 'b+-')
+    plt.ylabel('Average State')
+    plt.xlabel('MC step')
+
+    #Show the plot in screen
+    plt.show()
+
+
+if __name__ == '__main__':
+    main()
@@ -9,7 +9,6 @@
 #
 import numpy as np
 from numpy.random import rand
-import matplotlib.pyplot as plt
 
 #----------------------------------------------------------------------
 ##  BLOCK OF FUNCTIONS USED IN THE MAIN CODE
@@ -18,7 +17,7 @@ import matplotlib.pyplot as plt
 #Generation of a random initial state for NxN sites with 2 states
 def initialstate(N):   
     ''' generates a random spin configuration for initial condition'''
-    state = 2*np.random.randint(2, size=(N,N))-1
+    state = 2*np.random.randint(2, size=(N,N), dtype=np.int8)-1
     return state
 
 # Function implementing the method (Metropolis Monte Carlo) and model
@@ -26,6 +25,7 @@ def initialstate(N):
 #      The state with s=+1 has energy 1
 def mcmove(config, beta):
     '''Monte Carlo move using Metropolis algorithm '''
+    N = len(config)
     for i in range(N):
         for j in range(N):
                 #select random state from NxN system  
@@ -68,74 +68,80 @@ def calcMag(config):
 #
 # MAIN PROGRAM
 #
-# Initial parameters for calculation
-## change the parameter below if you want to simulate a smaller system
-nt      = 100        # number of temperature points
-N       = 64        # size of the lattice, N x N
-eqSteps = 100       # number of MC sweeps for equilibration
-mcSteps = 400       # number of MC sweeps for calculation
-
-n1, n2  = 1.0/(mcSteps*N*N), 1.0/(mcSteps*mcSteps*N*N)
-#Generate a random distribution of temperatures to make an exploration
-tm = 1.0;    T=np.random.normal(tm, .64, nt)
-T  = T[(T>0.0) & (T<5.8)];    nt = np.size(T)
-
-Energy       = np.zeros(nt);   Magnetization  = np.zeros(nt)
-SpecificHeat = np.zeros(nt);   Susceptibility = np.zeros(nt)
-
-
-#----------------------------------------------------------------------
-#  SIMULATION LOOP
-#----------------------------------------------------------------------
-print('Starting Simulations at ',len(T),' different temperatures.')
-for m in range(len(T)):
-    E1 = M1 = E2 = M2 = 0
-    config = initialstate(N)
-    iT=1.0/T[m]
-    iT2=iT*iT
-    print('Simulation ',m+1,' of',len(T),' at reduced temperature T=',T[m])
-    
-    for i in range(eqSteps):         # equilibrate
-        mcmove(config, iT)           # Monte Carlo moves
-
-    for i in range(mcSteps):
-        mcmove(config, iT)           
-        Ene = calcEnergy(config)     # calculate the energy
-        Mag = calcMag(config)        # calculate the magnetisation
-
-        E1 = E1 + Ene
-        M1 = M1 + Mag
-        M2 = M2 + Mag*Mag 
-        E2 = E2 + Ene*Ene
-
-        Energy[m]         = n1*E1
-        Magnetization[m]  = n1*M1
-        SpecificHeat[m]   = (n1*E2 - n2*E1*E1)*iT2
-        Susceptibility[m] = (n1*M2 - n2*M1*M1)*iT
-
-#
-# Plot everything
-#
-
-f = plt.figure(figsize=(18, 10)); # plot the calculated values    
-
-sp =  f.add_subplot(2, 2, 1 );
-plt.plot(T, Energy, 'o', color="#A60628");
-plt.xlabel("Temperature (T)", fontsize=20);
-plt.ylabel("Energy ", fontsize=20);
-
-sp =  f.add_subplot(2, 2, 2 );
-plt.plot(T, Magnetization, 'o', color="#348ABD");
-plt.xlabel("Temperature (T)", fontsize=20);
-plt.ylabel("Average State ", fontsize=20);
-
-sp =  f.add_subplot(2, 2, 3 );
-plt.plot(T, SpecificHeat, 'o', color="#A60628");
-plt.xlabel("Temperature (T)", fontsize=20);
-plt.ylabel("Specific Heat ", fontsize=20);
-
-sp =  f.add_subplot(2, 2, 4 );
-plt.plot(T, Susceptibility, 'o', color="#348ABD");
-plt.xlabel("Temperature (T)", fontsize=20);
-plt.ylabel("Susceptibility", fontsize=20);
-plt.show()
+def main():
+    import matplotlib.pyplot as plt
+    # Initial parameters for calculation
+    ## change the parameter below if you want to simulate a smaller system
+    nt      = 100        # number of temperature points
+    N       = 64        # size of the lattice, N x N
+    eqSteps = 100       # number of MC sweeps for equilibration
+    mcSteps = 400       # number of MC sweeps for calculation
+
+    n1, n2  = 1.0/(mcSteps*N*N), 1.0/(mcSteps*mcSteps*N*N)
+    #Generate a random distribution of temperatures to make an exploration
+    tm = 1.0;    T=np.random.normal(tm, .64, nt)
+    T  = T[(T>0.0) & (T<5.8)];    nt = np.size(T)
+
+    Energy       = np.zeros(nt);   Magnetization  = np.zeros(nt)
+    SpecificHeat = np.zeros(nt);   Susceptibility = np.zeros(nt)
+
+
+    #----------------------------------------------------------------------
+    #  SIMULATION LOOP
+    #----------------------------------------------------------------------
+    print('Starting Simulations at ',len(T),' different temperatures.')
+    for m in range(len(T)):
+        E1 = M1 = E2 = M2 = 0
+        config = initialstate(N)
+        iT=1.0/T[m]
+        iT2=iT*iT
+        print('Simulation ',m+1,' of',len(T),' at reduced temperature T=',T[m])
+
+        for i in range(eqSteps):         # equilibrate
+            mcmove(config, iT)           # Monte Carlo moves
+
+        for i in range(mcSteps):
+            mcmove(config, iT)           
+            Ene = calcEnergy(config)     # calculate the energy
+            Mag = calcMag(config)        # calculate the magnetisation
+
+            E1 = E1 + Ene
+            M1 = M1 + Mag
+            M2 = M2 + Mag*Mag 
+            E2 = E2 + Ene*Ene
+
+            Energy[m]         = n1*E1
+            Magnetization[m]  = n1*M1
+            SpecificHeat[m]   = (n1*E2 - n2*E1*E1)*iT2
+            Susceptibility[m] = (n1*M2 - n2*M1*M1)*iT
+
+    #
+    # Plot everything
+    #
+
+    f = plt.figure(figsize=(18, 10)); # plot the calculated values    
+
+    sp =  f.add_subplot(2, 2, 1 );
+    plt.plot(T, Energy, 'o', color="#A60628");
+    plt.xlabel("Temperature (T)", fontsize=20);
+    plt.ylabel("Energy ", fontsize=20);
+
+    sp =  f.add_subplot(2, 2, 2 );
+    plt.plot(T, Magnetization, 'o', color="#348ABD");
+    plt.xlabel("Temperature (T)", fontsize=20);
+    plt.ylabel("Average State ", fontsize=20);
+
+    sp =  f.add_subplot(2, 2, 3 );
+    plt.plot(T, SpecificHeat, 'o', color="#A60628");
+    plt.xlabel("Temperature (T)", fontsize=20);
+    plt.ylabel("Specific Heat ", fontsize=20);
+
+    sp =  f.add_subplot(2, 2, 4 );
+    plt.plot(T, Susceptibility, 'o', color="#348ABD");
+    plt.xlabel("Temperature (T)", fontsize=20);
+    plt.ylabel("Susceptibility", fontsize=20);
+    plt.show()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,21 @@
+# -----------------------------------------------------------------
+# MONTE CARLO SIMULATIONS IN PHYSICS
+# Importable library with the models and kernels used by the
+# example programs in Ising/ and TwoStateModel/
+# -----------------------------------------------------------------
+'''Monte Carlo (Metropolis) simulation of the 2D Ising and two state models
+
+The lattice, the model and the update kernel are explicit objects, so the
+same kernels can be reused from scripts, worker processes or pipelines.
+matplotlib is only imported when a plot is requested (see plotting.py).
+'''
+from .lattice import (Lattice, SquareLattice, TriangularLattice, HoneycombLattice,
+                      CubicLattice)
+from .models import IsingModel, TwoStateModel
+from .kernels import (initialstate, mcmove, checkerboard_move, heatbath_move, calcEnergy,
+                      calcMag)
+from .potts import PottsModel, ClockModel, potts_move, cluster_move
+from .rng import make_rng, streams
+from .state import SpinState
+from .parallel import SharedLatticeEngine
+from .driver import simulate, temperature_scan, snapshots, hysteresis
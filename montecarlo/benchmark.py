@@ -0,0 +1,332 @@
+# -----------------------------------------------------------------
+# Throughput benchmarks of the update engines and observables
+#
+# For every engine and lattice size N x N the sweeps are repeated until
+# at least `min_time` seconds have passed, and the results are reported as
+#     sweeps_per_s    MC sweeps per second
+#     flips_per_s     attempted spin flips per second (N*N per sweep)
+#     bytes_per_spin  peak memory (tracemalloc) of building the engine,
+#                     with its lattice, and doing one sweep, divided by N*N
+#     table_bytes_per_spin   of which the neighbour tables of the lattice
+#                     (only for the engines that use a lattice object)
+# The measurement cost of calcEnergy, calcMag and of the faster
+# SpinState observables is reported in ns per spin. The shared memory
+# engine is run with 1, 2, 4... workers up to the number of cores; its
+# memory is that of the parent process plus the shared segment, the
+# private buffers of the workers are not included (memory: 'parent+shm'
+# in the record). Each shared-w record also gets
+#     speedup         its flips_per_s over that of shared-1 at the same N
+#     efficiency      speedup/w, 1 for perfectly linear scaling
+# (when shared-1 was run at that size). The loops of Ising/ising.py and
+# TwoStateModel/two_state.py are run as the baselines legacy-ising and
+# legacy-twostate (when the scripts are found next to the package).
+#
+# A size is skipped when one sweep of the engine is expected (from the
+# previous size) to take longer than `max_time` seconds, so that the
+# slow reference kernels do not dominate the run at 4096^2.
+#
+#     python -m montecarlo.benchmark [-o results.json] [--baseline base.json]
+# writes the results as JSON; with a baseline every record whose rate
+# dropped by more than `threshold` is reported and the exit status is 1.
+# -----------------------------------------------------------------
+import importlib.util
+import json
+import multiprocessing as mp
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+from .kernels import initialstate, mcmove, checkerboard_move, heatbath_move, calcEnergy, calcMag
+from .kinetic import ActiveInterfaceEngine, NFoldWayEngine
+from .lattice import SquareLattice
+from .models import IsingModel, TwoStateModel
+from .parallel import SharedLatticeEngine
+from .potts import PottsModel, potts_move, cluster_move
+from .rng import make_rng
+from .state import SpinState
+
+SIZES = (16, 64, 256, 1024, 4096)
+BETA = 0.4                                  # a little below beta_c, mixed domains
+
+
+# -- engines --------------------------------------------------------
+# An engine is built by a function (N, rng) -> (sweep, close), where
+# sweep() does one MC sweep. The engines that work on a lattice object
+# build it themselves (_on_lattice), the others only need N.
+
+def _on_lattice(make):
+    '''Builder of the engine make(lattice, rng) on an N x N SquareLattice
+
+    The lattice is built in the traced region of bench_engine; the bytes
+    it keeps (its neighbour tables) are left in build.table_bytes.
+    '''
+    def build(N, rng):
+        before = tracemalloc.get_traced_memory()[0]
+        lattice = SquareLattice(N)
+        build.table_bytes = tracemalloc.get_traced_memory()[0] - before
+        return make(lattice, rng)
+    build.table_bytes = None
+    return build
+
+
+def _kernel(kernel, model):
+    def make(lattice, rng):
+        config = initialstate(lattice, rng, model)
+        return (lambda: kernel(config, lattice, model, BETA, rng)), None
+    return _on_lattice(make)
+
+
+def _spin_state(lattice, rng):
+    state = SpinState(lattice, IsingModel(), rng=rng)
+    return (lambda: state.sweep(BETA)), None
+
+
+def _kinetic(engine):
+    def make(lattice, rng):
+        model = IsingModel()
+        eng = engine(initialstate(lattice, rng, model), lattice, model, BETA, rng)
+        return (lambda: eng.run(1, every=2)), None
+    return _on_lattice(make)
+
+
+def _shared(nworkers):
+    def build(N, rng):
+        engine = SharedLatticeEngine(N, IsingModel(), BETA, nworkers=nworkers,
+                                     seed=int(rng.integers(2**63)))
+        return (lambda: engine.run(1)), engine.close
+    build.shared_bytes = lambda N: N*N     # the int8 configuration in shared memory
+    return build
+
+
+def _script(path):
+    '''Module of one of the original scripts, loaded from its file (None if not found)'''
+    path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), path)
+    if not os.path.exists(path):
+        return None
+    spec = importlib.util.spec_from_file_location(
+        '_legacy_' + os.path.splitext(os.path.basename(path))[0], path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def _legacy(module):
+    def build(N, rng):
+        np.random.seed(int(rng.integers(2**32)))
+        config = module.initialstate(N)
+        return (lambda: module.mcmove(config, BETA)), None
+    return build
+
+
+def engines(workers=None):
+    '''Dict name -> builder of all the benchmarked engines'''
+    out = {
+        'mcmove': _kernel(mcmove, IsingModel()),
+        'mcmove-twostate': _kernel(mcmove, TwoStateModel()),
+        'checkerboard': _kernel(checkerboard_move, IsingModel()),
+        'checkerboard-twostate': _kernel(checkerboard_move, TwoStateModel()),
+        'heatbath': _kernel(heatbath_move, IsingModel()),
+        'spinstate': _on_lattice(_spin_state),
+        'active': _kinetic(ActiveInterfaceEngine),
+        'nfold': _kinetic(NFoldWayEngine),
+        'potts3': _kernel(potts_move, PottsModel(3)),
+        'cluster3': _kernel(cluster_move, PottsModel(3)),
+    }
+    for name, path in (('legacy-ising', os.path.join('Ising', 'ising.py')),
+                       ('legacy-twostate', os.path.join('TwoStateModel', 'two_state.py'))):
+        module = _script(path)
+        if module is not None:
+            out[name] = _legacy(module)
+    if workers is None:
+        workers = []
+        w = 1
+        while w <= mp.cpu_count():
+            workers.append(w)
+            w *= 2
+    for w in workers:
+        out['shared-%d' % w] = _shared(w)
+    return out
+
+
+# -- measurements ---------------------------------------------------
+
+def _timed(f, min_time):
+    '''(number of calls, seconds) of calling f repeatedly for at least min_time'''
+    calls, elapsed, batch = 0, 0.0, 1
+    while elapsed < min_time:
+        t0 = time.perf_counter()
+        for i in range(batch):
+            f()
+        elapsed += time.perf_counter() - t0
+        calls += batch
+        batch *= 2
+    return calls, elapsed
+
+
+def bench_engine(name, build, N, min_time=0.5, seed=2023):
+    '''Benchmark record of one engine on an N x N lattice'''
+    rng = make_rng(seed)
+    close = None
+    tracemalloc.start()
+    try:
+        sweep, close = build(N, rng)
+        sweep()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        sweeps, elapsed = _timed(sweep, min_time)
+    finally:
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+        if close is not None:
+            close()
+    n = N*N
+    record = {'kind': 'sweep', 'name': name, 'N': N, 'sweeps': sweeps, 'seconds': elapsed,
+              'sweeps_per_s': sweeps/elapsed, 'flips_per_s': n*sweeps/elapsed}
+    shared = getattr(build, 'shared_bytes', None)
+    if shared is None:
+        record['bytes_per_spin'] = peak/n
+    else:
+        record['bytes_per_spin'] = (peak + shared(N))/n
+        record['memory'] = 'parent+shm'
+    table = getattr(build, 'table_bytes', None)
+    if table is not None:
+        record['table_bytes_per_spin'] = table/n
+    return record
+
+
+def bench_observables(N, min_time=0.2, seed=2023):
+    '''Benchmark records of the energy and magnetization measurements'''
+    lattice = SquareLattice(N)
+    model = IsingModel()
+    state = SpinState(lattice, model, rng=make_rng(seed))
+    config = state.config
+    n = lattice.nsites
+    out = []
+    for name, f in [('calcEnergy', lambda: calcEnergy(config, lattice, model)),
+                    ('calcMag', lambda: calcMag(config)),
+                    ('SpinState.energy', state.energy),
+                    ('SpinState.magnetization', state.magnetization)]:
+        calls, elapsed = _timed(f, min_time)
+        out.append({'kind': 'measure', 'name': name, 'N': N, 'calls': calls,
+                    'seconds': elapsed, 'calls_per_s': calls/elapsed,
+                    'ns_per_spin': 1e9*elapsed/(calls*n)})
+    return out
+
+
+def scaling(records):
+    '''Add speedup and efficiency to the shared-w records (see the header)
+
+    Returns the records that got them.
+    '''
+    single = {r['N']: r for r in records if r['kind'] == 'sweep' and r['name'] == 'shared-1'}
+    out = []
+    for r in records:
+        if r['kind'] != 'sweep' or not r['name'].startswith('shared-') or r['N'] not in single:
+            continue
+        w = int(r['name'].split('-')[1])
+        r['speedup'] = r['flips_per_s']/single[r['N']]['flips_per_s']
+        r['efficiency'] = r['speedup']/w
+        out.append(r)
+    return out
+
+
+def run(names=None, sizes=SIZES, workers=None, min_time=0.5, max_time=5.0, verbose=True):
+    '''Run the benchmarks; returns a dict with the environment and the records'''
+    builders = engines(workers)
+    names = list(builders) if names is None else names
+    records = []
+    for name in names:
+        rate = None                         # flips per second at the previous size
+        for N in sizes:
+            if rate is not None and N*N/rate > max_time:
+                if verbose:
+                    print('%-22s N=%-5d skipped (one sweep ~ %.0f s)' % (name, N, N*N/rate))
+                continue
+            r = bench_engine(name, builders[name], N, min_time)
+            rate = r['flips_per_s']
+            records.append(r)
+            if verbose:
+                note = ('(%s)' % r['memory'] if 'memory' in r else
+                        '(tables %.1f)' % r['table_bytes_per_spin']
+                        if 'table_bytes_per_spin' in r else '')
+                print('%-22s N=%-5d %10.1f sweeps/s %12.3g flips/s %8.1f B/spin %s'
+                      % (name, N, r['sweeps_per_s'], r['flips_per_s'], r['bytes_per_spin'],
+                         note))
+    for r in scaling(records):
+        if verbose:
+            print('%-22s N=%-5d speedup %5.2f efficiency %4.2f'
+                  % (r['name'], r['N'], r['speedup'], r['efficiency']))
+    for N in sizes:
+        for r in bench_observables(N, min_time=0.4*min_time):
+            records.append(r)
+            if verbose:
+                print('%-22s N=%-5d %10.3f ns/spin' % (r['name'], N, r['ns_per_spin']))
+    return {'python': platform.python_version(), 'numpy': np.__version__,
+            'machine': platform.machine(), 'processor': platform.processor(),
+            'cpu_count': mp.cpu_count(), 'date': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'records': records}
+
+
+def _rate(r):
+    return r['flips_per_s'] if r['kind'] == 'sweep' else 1.0/r['ns_per_spin']
+
+
+def compare(results, baseline, threshold=0.2):
+    '''Records slower than the baseline by more than the fraction threshold
+
+    Returns a list of (record, baseline record, ratio of the rates).
+    Records that are not in both runs are ignored.
+    '''
+    key = lambda r: (r['kind'], r['name'], r['N'])
+    base = {key(r): r for r in baseline['records']}
+    out = []
+    for r in results['records']:
+        b = base.get(key(r))
+        if b is not None:
+            ratio = _rate(r)/_rate(b)
+            if ratio < 1.0 - threshold:
+                out.append((r, b, ratio))
+    return out
+
+
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description='Throughput benchmarks of the update engines')
+    parser.add_argument('engines', nargs='*', help='engines to run (default: all)')
+    parser.add_argument('--sizes', type=int, nargs='+', default=list(SIZES))
+    parser.add_argument('--workers', type=int, nargs='+',
+                        help='numbers of workers of the shared memory engine')
+    parser.add_argument('--min-time', type=float, default=0.5,
+                        help='minimum time of every measurement (s)')
+    parser.add_argument('--max-time', type=float, default=5.0,
+                        help='skip sizes where one sweep takes longer (s)')
+    parser.add_argument('-o', '--output', help='write the results to this JSON file')
+    parser.add_argument('--baseline', help='JSON file of a previous run to compare with')
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help='relative slowdown reported as a regression')
+    args = parser.parse_args(argv)
+    builders = engines(args.workers)
+    unknown = [e for e in args.engines if e not in builders]
+    if unknown:
+        parser.error('unknown engines %s (choose from %s)' % (unknown, ', '.join(builders)))
+    results = run(args.engines or None, args.sizes, args.workers, args.min_time, args.max_time)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=1)
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        slower = compare(results, baseline, args.threshold)
+        for r, b, ratio in slower:
+            print('REGRESSION %s %s N=%d: %.2fx of the baseline' % (r['kind'], r['name'],
+                                                                    r['N'], ratio))
+        return 1 if slower else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
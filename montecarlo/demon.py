@@ -0,0 +1,141 @@
+# -----------------------------------------------------------------
+# Creutz demon: microcanonical Monte Carlo without random numbers in
+# the acceptance test and without exponentials
+#
+# Every site carries a demon with an integer energy E_d >= 0. A spin
+# flips if the demon can pay its cost (cost <= E_d) and the demon takes
+# the difference (E_d -= cost), so the total energy of spins plus
+# demons is conserved. Sites of one sublattice are updated at once with
+# integer comparisons only. After each sweep the demons are displaced
+# by a random cyclic shift so that energy can travel across the
+# lattice.
+#
+# In equilibrium the demons follow a Boltzmann distribution,
+#     P(E_d) ~ exp(-E_d/T),  E_d = 0, q, 2q, ...
+# (q is the energy quantum, 4J for the square Ising lattice), so the
+# temperature is read from the mean demon energy:
+#     T = q / ln(1 + q/<E_d>)
+# -----------------------------------------------------------------
+from functools import reduce
+from math import gcd
+
+import numpy as np
+
+from . import profiling
+from .kernels import calcMag
+from .rng import as_rng
+
+
+class DemonEngine:
+    '''Microcanonical (Creutz demon) dynamics on the sublattices of a lattice
+
+    config        : initial configuration (modified in place)
+    model         : model with integer flip costs (e.g. IsingModel with
+                    integer J and h)
+    demon_energy  : initial mean energy of the demons (given to random
+                    demons in multiples of the energy quantum)
+    '''
+
+    def __init__(self, config, lattice, model, demon_energy=0, rng=None, shift=True):
+        self.lattice = lattice
+        self.model = model
+        self.rng = as_rng(rng)
+        self.shift = shift
+        self.config = config
+        self._flat = lattice.flat(config)
+        z = lattice.z
+        nb = np.arange(-z, z+1)
+        cost = np.array([np.broadcast_to(model.cost(s, nb), nb.shape) for s in (-1, 1)],
+                        dtype=float)
+        if not np.all(cost == np.rint(cost)):
+            raise ValueError('the demon algorithm needs integer flip costs, %r has not' % model)
+        self.costs = np.rint(cost).astype(np.int64)
+        #energy quantum: every cost that can occur is a multiple of it (a
+        #site with d neighbours has a neighbour sum of the parity of d)
+        reachable = np.zeros(2*z+1, dtype=bool)
+        for d in np.unique(lattice.degree):
+            reachable[z-d:z+d+1:2] = True
+        self.quantum = reduce(gcd, np.abs(self.costs[:, reachable]).ravel().tolist(), 0) or 1
+        #the initial demon energy is spread in quanta over random demons
+        quanta = int(round(demon_energy*lattice.nsites/self.quantum))
+        self.demons = self.quantum*np.bincount(self.rng.integers(lattice.nsites, size=quanta),
+                                               minlength=lattice.nsites).astype(np.int64)
+        self.E = float(model.energy(config, lattice))
+
+    @property
+    def total_energy(self):
+        '''Energy of spins plus demons (conserved)'''
+        return self.E + float(self.demons.sum())
+
+    def sweep(self):
+        '''One sweep: every sublattice is updated once'''
+        flat, demons, z = self._flat, self.demons, self.lattice.z
+        prof = profiling.active()
+        for sites in self.lattice.colours:
+            nb = self.lattice.neighbour_sum(flat, sites)
+            s = flat[sites]
+            cost = self.costs[(s+1)//2, nb+z]
+            d = demons[sites]
+            ok = cost <= d
+            if prof.enabled:
+                prof.count(attempted=len(sites), accepted=np.count_nonzero(ok))
+            flat[sites[ok]] = -s[ok]
+            demons[sites[ok]] = d[ok] - cost[ok]
+            self.E += float(cost[ok].sum())
+        if self.shift:
+            self.demons = np.roll(demons, int(self.rng.integers(self.lattice.nsites)))
+
+    def run(self, nsweeps, every=1):
+        '''nsweeps sweeps; returns step, E, M per site and the mean demon energy
+
+        The run is timed as the phase 'demon' of the active profiler.
+        '''
+        n = self.lattice.nsites
+        step, E, M, D = [], [], [], []
+        with profiling.active().phase('demon'):
+            for t in range(1, nsweeps+1):
+                self.sweep()
+                if t % every == 0:
+                    step.append(t)
+                    E.append(self.E/n)
+                    M.append(calcMag(self.config)/n)
+                    D.append(self.demons.mean())
+        return step, E, M, D
+
+    def temperature(self, mean_demon=None):
+        '''Temperature from the mean demon energy (current or given)'''
+        d = self.demons.mean() if mean_demon is None else mean_demon
+        if d <= 0:
+            return 0.0
+        return self.quantum/np.log1p(self.quantum/d)
+
+    def demon_histogram(self):
+        '''Demon energies 0, q, 2q... and their frequencies'''
+        counts = np.bincount(self.demons//self.quantum)
+        return self.quantum*np.arange(len(counts)), counts/counts.sum()
+
+
+def demon_scan(model, lattice, energies, eqSteps, mcSteps, rng=None):
+    '''Energy, magnetization and temperature at a set of total energies
+
+    For every total energy per site in `energies` the lattice starts
+    fully magnetized with the excess energy given to the demons, is
+    equilibrated for eqSteps sweeps and sampled for mcSteps sweeps.
+    Returns arrays T, Energy, Magnetization (per site, <|m|>), to be
+    compared with the canonical curves of ising.py.
+    '''
+    rng = as_rng(rng)
+    n = lattice.nsites
+    T = np.zeros(len(energies))
+    Energy = np.zeros(len(energies))
+    Magnetization = np.zeros(len(energies))
+    for k, e in enumerate(energies):
+        config = np.ones(lattice.shape, dtype=np.int8)
+        e0 = model.energy(config, lattice)/n
+        engine = DemonEngine(config, lattice, model, demon_energy=max(e - e0, 0.0), rng=rng)
+        engine.run(eqSteps)
+        step, E, M, D = engine.run(mcSteps)
+        T[k] = engine.temperature(np.mean(D))
+        Energy[k] = np.mean(E)
+        Magnetization[k] = np.mean(np.abs(M))
+    return T, Energy, Magnetization
@@ -0,0 +1,135 @@
+# -----------------------------------------------------------------
+# Domains: connected clusters of parallel spins in snapshots
+#
+# Domains are labelled with periodic boundary conditions in two steps:
+#  - runs of parallel spins along each row are found with a cumulative
+#    sum (no loop over sites),
+#  - runs are then joined by a vectorized union-find over the bonds
+#    between rows: every round, each remaining bond hooks the larger of
+#    its two roots onto the smaller one, and all labels are compressed
+#    to their roots (label = label[label]). Bonds whose two ends already
+#    share a root are dropped, so the rounds get cheaper and a handful
+#    of rounds is enough even for lattices of 10^6 spins.
+# A batch of K frames is labelled at once as a single graph.
+# -----------------------------------------------------------------
+import numpy as np
+
+
+def components(n, u, v):
+    '''Connected components of the graph with n nodes and edges (u[k], v[k])
+
+    Returns an array with the label of every node: the smallest node of
+    its component.
+    '''
+    parent = np.arange(n)
+    u = np.asarray(u, dtype=np.intp)
+    v = np.asarray(v, dtype=np.intp)
+    while len(u):
+        pu = parent[u]
+        pv = parent[v]
+        keep = pu != pv
+        if not keep.any():
+            break
+        u, v, pu, pv = u[keep], v[keep], pu[keep], pv[keep]
+        #hook the larger root onto the smaller one
+        np.minimum.at(parent, np.maximum(pu, pv), np.minimum(pu, pv))
+        #compress every path to its root
+        while True:
+            grand = parent[parent]
+            if np.array_equal(grand, parent):
+                break
+            parent = grand
+    return parent
+
+
+def label(configs):
+    '''Domain labels of one (N, N) frame or a batch (K, N, N) of frames
+
+    The label of a site is the smallest (flat) site index of its domain,
+    so labels are unique over the whole batch and label // (N*N) is the
+    frame.
+    '''
+    configs = np.asarray(configs)
+    N = configs.shape[-1]
+    s = configs.reshape(-1, configs.shape[-2], N)
+    #runs of parallel spins along the rows are joined directly
+    start = np.empty(s.shape, dtype=bool)
+    start[:, :, 0] = True
+    np.not_equal(s[:, :, 1:], s[:, :, :-1], out=start[:, :, 1:])
+    run = np.cumsum(start.ravel(), dtype=np.int32).reshape(s.shape) - 1
+    first_site = np.flatnonzero(start)
+    #bonds left between runs: across the periodic edge of each row and
+    #between consecutive rows (periodic in every frame)
+    wrap = s[:, :, -1] == s[:, :, 0]
+    u = [run[:, :, -1][wrap]]
+    v = [run[:, :, 0][wrap]]
+    for a, b in ((slice(None, -1), slice(1, None)), (slice(-1, None), slice(0, 1))):
+        same = s[:, a] == s[:, b]
+        ru, rv = run[:, a][same], run[:, b][same]
+        #a pair of overlapping runs is joined by several consecutive bonds, keep one
+        new = np.ones(len(ru), dtype=bool)
+        new[1:] = (ru[1:] != ru[:-1]) | (rv[1:] != rv[:-1])
+        u.append(ru[new])
+        v.append(rv[new])
+    root = components(len(first_site), np.concatenate(u), np.concatenate(v))
+    return first_site[root][run].reshape(configs.shape)
+
+
+class DomainStatistics:
+    '''Domain statistics of a stream of N x N snapshots
+
+    For every frame added it records the number of domains, the mean
+    domain area, the interface length (number of antiparallel bonds)
+    and the fraction of sites in the largest domain; the distribution
+    of domain sizes is accumulated over all frames. add() accepts one
+    frame or a batch (K, N, N) and can be used as an observer of
+    driver.snapshots() (frames are then labelled in batches of `batch`).
+    '''
+
+    def __init__(self, N, batch=16):
+        self.N = N
+        self.size_hist = np.zeros(N*N+1, dtype=np.int64)
+        self.ndomains = []
+        self.mean_area = []
+        self.interface = []
+        self.largest = []
+        self._buf = np.empty((batch, N, N), dtype=np.int8)
+        self._fill = 0
+
+    def add(self, config):
+        config = np.asarray(config)
+        for frame in config.reshape(-1, self.N, self.N):
+            self._buf[self._fill] = frame
+            self._fill += 1
+            if self._fill == len(self._buf):
+                self.flush()
+
+    __call__ = add
+
+    def flush(self):
+        '''Label the frames waiting in the buffer'''
+        if self._fill == 0:
+            return
+        frames = self._buf[:self._fill]
+        n = self.N*self.N
+        labels = label(frames).reshape(self._fill, n)
+        roots = np.arange(self._fill*n).reshape(self._fill, n)
+        sizes = np.bincount(labels.ravel(), minlength=self._fill*n).reshape(self._fill, n)
+        isroot = labels == roots
+        count = isroot.sum(axis=1)
+        self.ndomains.extend(count.tolist())
+        self.mean_area.extend((n/count).tolist())
+        self.largest.extend((sizes.max(axis=1)/n).tolist())
+        self.size_hist += np.bincount(sizes[isroot], minlength=n+1)
+        same = ((frames == np.roll(frames, -1, axis=1)).sum(axis=(1, 2))
+                + (frames == np.roll(frames, -1, axis=2)).sum(axis=(1, 2)))
+        self.interface.extend((2*n - same).tolist())
+        self._fill = 0
+
+    def results(self):
+        '''Per-frame arrays and the accumulated domain size distribution'''
+        self.flush()
+        sizes = np.flatnonzero(self.size_hist)
+        return {'ndomains': np.array(self.ndomains), 'mean_area': np.array(self.mean_area),
+                'interface': np.array(self.interface), 'largest': np.array(self.largest),
+                'sizes': sizes, 'counts': self.size_hist[sizes]}
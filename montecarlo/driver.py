@@ -0,0 +1,258 @@
+# -----------------------------------------------------------------
+# Drivers: the main programs of ising.py / two_state.py and of the
+# snapshots programs as reusable functions
+# -----------------------------------------------------------------
+import numpy as np
+
+from . import profiling
+from .kernels import initialstate, mcmove, checkerboard_move, calcEnergy, calcMag
+from .models import IsingModel
+from .rng import as_rng, make_rng, new_seed
+from .series import SeriesWriter
+from .stats import measurement_interval
+
+MIN_PILOT = 10      # shortest pilot series for every='auto' (sweeps)
+
+
+def simulate(model, lattice, T, eqSteps, mcSteps, kernel=mcmove, config=None, rng=None,
+             observers=(), every=1, progress=None):
+    '''Equilibrate and sample at temperature T
+
+    Returns Energy, Magnetization, SpecificHeat and Susceptibility per
+    site, with the same estimators as ising.py but in the energy
+    convention of the model: for IsingModel (each bond counted once)
+    Energy is 2 times and SpecificHeat 4 times the values printed by
+    ising.py, which divides the energy by 2 (see models.IsingModel);
+    Magnetization and Susceptibility are the same. The mcSteps production sweeps are
+    measured every `every` sweeps; with every='auto' the interval is the
+    integrated autocorrelation time of E and M measured over the second
+    half of the equilibration (see stats.py), capped so that there are
+    at least 100 measurements; if that half is shorter than MIN_PILOT
+    sweeps every sweep is measured. rng is a Generator or a seed (see rng.py).
+    Every observer is called with the configuration at each measurement
+    (e.g. a correlation.CorrelationAccumulator). progress, if given, is
+    called as progress(sweeps, total) with the number of sweeps done and
+    to be done at T, at the end of the equilibration and at each
+    measurement. The phases are timed by the active profiler (see
+    profiling.py).
+    '''
+    with profiling.active().phase('simulate', T=float(T)):
+        return _simulate(model, lattice, T, eqSteps, mcSteps, kernel, config, rng,
+                         observers, every, progress)
+
+
+def _simulate(model, lattice, T, eqSteps, mcSteps, kernel, config, rng, observers, every,
+              progress):
+    prof = profiling.active()
+    rng = as_rng(rng)
+    if config is None:
+        config = initialstate(lattice, rng, model)
+    iT = 1.0/T
+    iT2 = iT*iT
+    if every != 'auto' and not (isinstance(every, (int, np.integer)) and every >= 1):
+        raise ValueError("every must be a positive integer or 'auto', got %r" % (every,))
+    if every == 'auto' and eqSteps//2 < MIN_PILOT:
+        every = 1                                # too short a pilot to estimate tau
+
+    if every == 'auto':
+        pilot = eqSteps//2
+        with prof.phase('equilibrate'):
+            for i in range(eqSteps - pilot):     # equilibrate
+                kernel(config, lattice, model, iT, rng)
+            Ep = np.empty(pilot)
+            Mp = np.empty(pilot)
+            for i in range(pilot):               # equilibrate and record a pilot series
+                kernel(config, lattice, model, iT, rng)
+                with prof.phase('measure'):
+                    Ep[i] = calcEnergy(config, lattice, model)
+                    Mp[i] = calcMag(config, model)
+            every = measurement_interval(Ep, Mp, nmax=mcSteps//100)
+    else:
+        with prof.phase('equilibrate'):
+            for i in range(eqSteps):             # equilibrate
+                kernel(config, lattice, model, iT, rng)
+
+    nmsr = max(mcSteps//every, 1)
+    n1 = 1.0/(nmsr*lattice.nsites)
+    n2 = 1.0/(nmsr*nmsr*lattice.nsites)
+    E1 = M1 = E2 = M2 = 0
+    total = eqSteps + nmsr*every
+    if progress is not None:
+        progress(eqSteps, total)
+    with prof.phase('production'):
+        for i in range(nmsr*every):
+            kernel(config, lattice, model, iT, rng)
+            if (i+1) % every:
+                continue
+            with prof.phase('measure'):
+                Ene = calcEnergy(config, lattice, model)
+                Mag = calcMag(config, model)
+                E1 = E1 + Ene
+                M1 = M1 + Mag
+                M2 = M2 + Mag*Mag
+                E2 = E2 + Ene*Ene
+                for observer in observers:
+                    observer(config)
+            if progress is not None:
+                progress(eqSteps + i + 1, total)
+
+    return (n1*E1, n1*M1, (n1*E2 - n2*E1*E1)*iT2, (n1*M2 - n2*M1*M1)*iT)
+
+
+def temperature_scan(model, lattice, T, eqSteps, mcSteps, kernel=mcmove,
+                     seed=None, plot=False, verbose=True, every=1, metrics=None,
+                     interval=1.0):
+    '''Run simulate() at every temperature of T
+
+    Returns the arrays Energy, Magnetization, SpecificHeat and
+    Susceptibility. With plot=True the results are drawn after each
+    temperature, as in ising.py. `every` is the measurement interval
+    passed to simulate().
+
+    Temperature m uses the random stream (seed, m), so a given seed gives
+    the same results however the temperatures are distributed. With
+    profiling on (profiling.enable) the log is flushed after every
+    temperature.
+
+    metrics: a metrics.MetricsServer where the progress is published
+    during the run (at the measurements, at most every `interval`
+    seconds) and the results after every temperature (for runs without
+    a display). The acceptance ratio comes from the kernels' profiling
+    counters, so profiling is switched on for the scan if it is off.
+    '''
+    if metrics is not None and not profiling.active().enabled:
+        with profiling.profile():
+            return temperature_scan(model, lattice, T, eqSteps, mcSteps, kernel, seed,
+                                    plot, verbose, every, metrics, interval)
+    prof = profiling.active()
+    if seed is None:
+        seed = new_seed()
+    T = np.asarray(T, dtype=float)
+    nt = np.size(T)
+    Energy = np.zeros(nt)
+    Magnetization = np.zeros(nt)
+    SpecificHeat = np.zeros(nt)
+    Susceptibility = np.zeros(nt)
+
+    if plot:
+        from .plotting import _pyplot, resultPlot
+        plt = _pyplot()
+        plt.ion()
+        plt.figure(figsize=(18, 10))
+
+    progress = None
+    if metrics is not None:
+        from .metrics import ScanProgress
+        progress = ScanProgress(metrics, T, prof, interval)
+    for m in range(nt):
+        if verbose:
+            print('Running Simulation ', m+1, ' of', nt, ' at reduced temperature T=', T[m])
+        if progress is not None:
+            progress.start(m)
+        (Energy[m], Magnetization[m],
+         SpecificHeat[m], Susceptibility[m]) = simulate(model, lattice, T[m], eqSteps,
+                                                        mcSteps, kernel=kernel,
+                                                        rng=make_rng(seed, (m,)),
+                                                        every=every, progress=progress)
+        if progress is not None:
+            progress.finish(energy=Energy[m], magnetization=Magnetization[m],
+                            specific_heat=SpecificHeat[m], susceptibility=Susceptibility[m])
+        if plot:
+            with prof.phase('plot', T=float(T[m])):
+                resultPlot(T, Energy, Magnetization, SpecificHeat, Susceptibility)
+        prof.flush()
+
+    if plot:
+        plt.ioff()
+        resultPlot(T, Energy, Magnetization, SpecificHeat, Susceptibility)
+        plt.show()
+    return Energy, Magnetization, SpecificHeat, Susceptibility
+
+
+def snapshots(model, lattice, temp, msrmnt, config=None, kernel=mcmove,
+              every=10, rng=None, observers=(), plot=False, verbose=False, out=None):
+    '''Sequence of msrmnt MC sweeps at temperature temp
+
+    Returns the lists step, E, M with the energy and magnetization per
+    site after every sweep (as ising_snapshots.py) and the final
+    configuration. Every `every` sweeps the configuration is printed
+    (verbose) and/or plotted (plot). Every observer is called with the
+    configuration after each sweep.
+
+    With out (a file name) step, E, M are streamed to a series file (see
+    series.py) instead of being kept in lists, so the memory used does
+    not grow with msrmnt; the path and the final configuration are then
+    returned, and the series can be read one chunk at a time with
+    series.iter_series (or all at once with read_series).
+    '''
+    rng = as_rng(rng)
+    if config is None:
+        config = initialstate(lattice, rng, model)
+    if out is None:
+        step, E, M = [], [], []
+        record = lambda t, e, m: (step.append(t), E.append(e), M.append(m))
+        _snapshots(model, lattice, temp, msrmnt, config, kernel, every, rng, observers,
+                   plot, verbose, record)
+        return step, E, M, config
+    metadata = {'model': repr(model), 'lattice': repr(lattice), 'T': temp,
+                'kernel': kernel.__name__}
+    with SeriesWriter(out, ('step', 'E', 'M'), metadata) as sink:
+        _snapshots(model, lattice, temp, msrmnt, config, kernel, every, rng, observers,
+                   plot, verbose, sink.append)
+    return out, config
+
+
+def _snapshots(model, lattice, temp, msrmnt, config, kernel, every, rng, observers,
+               plot, verbose, record):
+    prof = profiling.active()
+    n = lattice.nsites
+    Ene = calcEnergy(config, lattice, model)/n
+    Mag = calcMag(config, model)/n
+    record(0, Ene, Mag)
+    if plot:
+        from .plotting import _pyplot, configPlot
+        plt = _pyplot()
+        plt.figure(dpi=100)
+        configPlot(config, 0)
+        plt.ion()
+
+    for t in range(1, msrmnt+1):
+        with prof.phase('sweep', T=float(temp)):
+            kernel(config, lattice, model, 1.0/temp, rng)
+        with prof.phase('measure', T=float(temp)):
+            Ene = calcEnergy(config, lattice, model)/n
+            Mag = calcMag(config, model)/n
+            record(t, Ene, Mag)
+            for observer in observers:
+                observer(config)
+        if t % every == 0:
+            if verbose:
+                print('\nMC step=', t, ' Energy=', Ene, ' M=', Mag)
+            if plot:
+                with prof.phase('plot', T=float(temp)):
+                    configPlot(config, t)
+
+    if plot:
+        plt.ioff()
+        plt.show()
+
+
+def hysteresis(lattice, T, fields, sweeps, J=1.0, kernel=checkerboard_move,
+               config=None, rng=None):
+    '''Magnetization loop M(h) at temperature T
+
+    The field takes the values of `fields` in order (e.g. a ramp up and
+    back down), and the system is evolved `sweeps` sweeps at each value
+    starting from the configuration of the previous field. Returns the
+    magnetization per site at the end of each field value.
+    '''
+    rng = as_rng(rng)
+    if config is None:
+        config = initialstate(lattice, rng)
+    M = np.zeros(len(fields))
+    for k, h in enumerate(fields):
+        model = IsingModel(J, h)
+        for i in range(sweeps):
+            kernel(config, lattice, model, 1.0/T, rng)
+        M[k] = calcMag(config)/lattice.nsites
+    return M
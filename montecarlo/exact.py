@@ -0,0 +1,173 @@
+# -----------------------------------------------------------------
+# Exact results for small 2D Ising systems
+#
+# Energy convention of the library (IsingModel, calcEnergy):
+#     E = -J*B - h*M,   B = sum over bonds s_i*s_j,   M = sum_i s_i
+# (the programs in Ising/ print E/2, so their energy is half of E and
+# their specific heat a quarter of C below; M and chi are the same).
+# thermodynamics() and strip() return E and C in the convention of
+# Ising/ with convention='ising.py'.
+#
+# L x K torus (ExactTorus): every configuration is a sequence of K rows,
+# each row an integer of L bits. With the tables
+#     intra[r]     bond sum inside row r (periodic)
+#     inter[r, q]  bond sum between rows r and q
+#     m[r]         magnetization of row r
+# B and M of all the configurations with a given first row are built
+# by broadcasting over the other rows, and counted with bincount into
+# the density of states g(B, M). Configurations whose first row is the
+# complement of another are not enumerated: they have the same B and
+# opposite M. Z, E, C, M and chi then follow at any T (and h) from g.
+#
+# L x infinity strip (strip): transfer matrix between rows,
+#     T[r, q] = exp(beta*(J*(intra[r]/2 + intra[q]/2 + inter[r, q]) + h*(m[r] + m[q])/2))
+# The free energy per site is -ln(lambda_max)/(beta*L); E and M come
+# from the leading eigenvector (Hellmann-Feynman), C and chi from
+# central differences of E and M.
+# -----------------------------------------------------------------
+import numpy as np
+
+#factor of the energy of each convention relative to E = -J*B - h*M
+CONVENTIONS = {'bonds': 1.0, 'ising.py': 0.5}
+
+
+def _convert(out, convention):
+    '''E and C of a result dict in the given energy convention'''
+    if convention not in CONVENTIONS:
+        raise ValueError('unknown energy convention %r (choose from %s)'
+                         % (convention, ', '.join(CONVENTIONS)))
+    f = CONVENTIONS[convention]
+    if f != 1.0:
+        out['E'] = f*out['E']
+        out['C'] = f*f*out['C']
+    return out
+
+
+def _popcount(x, L):
+    return sum((x >> j) & 1 for j in range(L))
+
+
+def _row_tables(L, periodic=True):
+    '''intra, inter, m tables of the 2^L rows of width L'''
+    r = np.arange(2**L)
+    m = 2*_popcount(r, L) - L
+    if periodic:
+        rot = ((r << 1) | (r >> (L-1))) & (2**L - 1)
+        intra = L - 2*_popcount(r ^ rot, L)
+    else:
+        pairs = (r ^ (r >> 1)) & (2**(L-1) - 1)
+        intra = (L-1) - 2*_popcount(pairs, L)
+    inter = L - 2*_popcount(r[:, None] ^ r[None, :], L)
+    return intra, inter, m
+
+
+def _moments(weights, B, M, J, h, beta):
+    '''Thermodynamics from the (B, M) histogram at the inverse temperatures beta'''
+    E = -J*B[:, None] - h*M[None, :]
+    #log-sum-exp over the states for every beta
+    mask = weights > 0
+    Es, Ms, ws = E[mask], np.broadcast_to(M, E.shape)[mask], weights[mask]
+    x = -beta[:, None]*Es[None, :]
+    x0 = x.max(axis=1, keepdims=True)
+    p = ws[None, :]*np.exp(x - x0)
+    Z = p.sum(axis=1)
+    p /= Z[:, None]
+    lnZ = np.log(Z) + x0[:, 0]
+    return lnZ, p, Es, Ms
+
+
+class ExactTorus:
+    '''Exact density of states of the Ising model on an L x K torus (L, K >= 3, LK <= 25)
+
+    g[i, j] is the number of configurations with bond sum B = bonds[i]
+    and magnetization M = mags[j].
+    '''
+
+    def __init__(self, L, K=None):
+        K = L if K is None else K
+        if L < 3 or K < 3:
+            raise ValueError('the torus needs L, K >= 3 (no double bonds)')
+        if L*K > 25:
+            raise ValueError('exact enumeration is limited to 25 sites, use strip() for wider systems')
+        self.L, self.K = L, K
+        n = self.n = L*K
+        intra, inter, m = _row_tables(L)
+        nM = 2*n+1
+        g = np.zeros((4*n+1)*nM, dtype=np.int64)
+        for r0 in range(2**(L-1)):
+            #first row r0, the other rows along the axes of B and M
+            B = intra[r0] + inter[r0] + intra
+            M = m[r0] + m
+            for k in range(2, K):
+                B = B[..., None] + inter + intra
+                M = M[..., None] + m
+            B = B + inter[:, r0]
+            idx = (B + 2*n)*nM + M + n
+            g += np.bincount(idx.ravel(), minlength=len(g))
+        g = g.reshape(4*n+1, nM)
+        #the complements of the first rows: same B, opposite M
+        g += g[:, ::-1]
+        keepB = np.flatnonzero(g.any(axis=1))
+        keepM = np.flatnonzero(g.any(axis=0))
+        self.g = g[keepB][:, keepM]
+        self.bonds = keepB - 2*n
+        self.mags = keepM - n
+
+    def thermodynamics(self, T, J=1.0, h=0.0, convention='bonds'):
+        '''Exact averages per site at the temperatures T
+
+        Returns a dict of arrays: F (free energy), E, C, M, absM and the
+        susceptibilities chi = beta*(<M^2> - <M>^2)/n (the estimator of
+        ising.py) and chi_abs = beta*(<M^2> - <|M|>^2)/n.
+        With convention='ising.py' E is halved and C divided by 4, as
+        printed by the programs in Ising/ (F is not changed).
+        '''
+        T = np.atleast_1d(np.asarray(T, dtype=float))
+        beta = 1.0/T
+        n = self.n
+        lnZ, p, E, M = _moments(self.g.astype(float), self.bonds.astype(float),
+                                self.mags.astype(float), J, h, beta)
+        E1, E2 = p @ E, p @ (E*E)
+        M1, M2, A1 = p @ M, p @ (M*M), p @ np.abs(M)
+        return _convert({'T': T, 'F': -T*lnZ/n, 'E': E1/n, 'C': beta**2*(E2 - E1*E1)/n,
+                         'M': M1/n, 'absM': A1/n, 'chi': beta*(M2 - M1*M1)/n,
+                         'chi_abs': beta*(M2 - A1*A1)/n}, convention)
+
+
+def _strip_E_M(beta, J, h, intra, inter, m, L):
+    '''ln(lambda_max)/L, E and M per site of the strip at one (beta, h)'''
+    pair = J*(0.5*(intra[:, None] + intra[None, :]) + inter)
+    field = 0.5*(m[:, None] + m[None, :])
+    x = beta*(pair + h*field)
+    x0 = x.max()
+    Tm = np.exp(x - x0)
+    w, v = np.linalg.eigh(Tm)
+    lam, u = w[-1], v[:, -1]
+    #Hellmann-Feynman: d ln(lambda)/dp = u.(dT/dp).u/lambda
+    dbeta = u @ (Tm*(pair + h*field)) @ u/lam
+    dh = u @ (Tm*beta*field) @ u/lam
+    return (np.log(lam) + x0)/L, -dbeta/L, dh/(beta*L)
+
+
+def strip(L, T, J=1.0, h=0.0, periodic=True, dT=1e-4, dh=1e-4, convention='bonds'):
+    '''Exact thermodynamics per site of an L x infinity strip (transfer matrix)
+
+    periodic: periodic boundary conditions across the strip (a cylinder).
+    Returns a dict of arrays F, E, C, M, chi at the temperatures T
+    (E and C as printed by Ising/ with convention='ising.py').
+    '''
+    intra, inter, m = _row_tables(L, periodic)
+    T = np.atleast_1d(np.asarray(T, dtype=float))
+    out = {'T': T, 'F': [], 'E': [], 'C': [], 'M': [], 'chi': []}
+    for t in T:
+        lnl, E, M = _strip_E_M(1.0/t, J, h, intra, inter, m, L)
+        Ep = _strip_E_M(1.0/(t+dT), J, h, intra, inter, m, L)[1]
+        Em = _strip_E_M(1.0/(t-dT), J, h, intra, inter, m, L)[1]
+        Mp = _strip_E_M(1.0/t, J, h+dh, intra, inter, m, L)[2]
+        Mm = _strip_E_M(1.0/t, J, h-dh, intra, inter, m, L)[2]
+        out['F'].append(-t*lnl)
+        out['E'].append(E)
+        out['M'].append(M)
+        out['C'].append((Ep - Em)/(2*dT))
+        out['chi'].append((Mp - Mm)/(2*dh))
+    return _convert({k: np.asarray(v) for k, v in out.items()}, convention)
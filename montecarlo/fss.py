@@ -0,0 +1,181 @@
+# -----------------------------------------------------------------
+# Finite size scaling: Binder cumulant crossings and peak scaling
+#
+# A single N x N lattice gives peaks of C and chi that are shifted and
+# rounded by the finite size. Here a set of sizes L is simulated and
+#  - the Binder cumulant U = 1 - <m^4>/(3<m^2>^2) of different sizes
+#    crosses at Tc (independent of L up to corrections),
+#  - the maxima of chi, C and dU/dT scale as L^(gamma/nu), L^(alpha/nu)
+#    and L^(1/nu), and their positions as Tc + a*L^(-1/nu),
+#  - <|m|> at Tc scales as L^(-beta/nu).
+#
+# Sizes are run from small to large. The smallest sizes scan the whole
+# temperature range; larger sizes only scan a window around the current
+# estimate of the crossing, narrowing as L^(-1/nu), so most of the cost
+# of the large lattices goes where it matters.
+# -----------------------------------------------------------------
+import numpy as np
+
+from .kernels import checkerboard_move, initialstate, calcEnergy, calcMag
+from .lattice import SquareLattice
+from .models import IsingModel
+from .rng import as_rng, make_rng, new_seed
+
+
+def measure_moments(model, lattice, T, eqSteps, mcSteps, kernel=checkerboard_move,
+                    rng=None, bins=50):
+    '''Moments of E and m = M/nsites at temperature T
+
+    Returns a dict with E, E2, absM, M2, M4 (averages over mcSteps sweeps)
+    and hist, the histogram of |m| over `bins` bins in [0, 1].
+    '''
+    rng = as_rng(rng)
+    n = lattice.nsites
+    config = initialstate(lattice, rng)
+    beta = 1.0/T
+    for i in range(eqSteps):
+        kernel(config, lattice, model, beta, rng)
+    E = np.empty(mcSteps)
+    m = np.empty(mcSteps)
+    for i in range(mcSteps):
+        kernel(config, lattice, model, beta, rng)
+        E[i] = calcEnergy(config, lattice, model)
+        m[i] = calcMag(config)/n
+    m2 = m*m
+    return {'T': T, 'L': lattice.N, 'E': E.mean(), 'E2': (E*E).mean(),
+            'absM': np.abs(m).mean(), 'M2': m2.mean(), 'M4': (m2*m2).mean(),
+            'hist': np.histogram(np.abs(m), bins=bins, range=(0.0, 1.0))[0]}
+
+
+def _point(args):
+    '''One (L, T) point; top level so it can be sent to a process pool'''
+    L, T, eqSteps, mcSteps, seed, J = args
+    rng = make_rng(seed, (L, int(round(T*1e6))))
+    return measure_moments(IsingModel(J), SquareLattice(L), T, eqSteps, mcSteps, rng=rng)
+
+
+def observables(points):
+    '''Arrays T, U, chi, C, absM of one size from its measure_moments dicts'''
+    points = sorted(points, key=lambda p: p['T'])
+    T = np.array([p['T'] for p in points])
+    n = points[0]['L']**2
+    beta = 1.0/T
+    M2 = np.array([p['M2'] for p in points])
+    M4 = np.array([p['M4'] for p in points])
+    absM = np.array([p['absM'] for p in points])
+    E = np.array([p['E'] for p in points])
+    E2 = np.array([p['E2'] for p in points])
+    return {'T': T, 'U': 1.0 - M4/(3.0*M2*M2), 'chi': beta*n*(M2 - absM*absM),
+            'C': beta*beta*(E2 - E*E)/n, 'absM': absM}
+
+
+def binder_crossing(obs1, obs2):
+    '''Temperature where the Binder cumulants of two sizes cross (None if they do not)'''
+    lo = max(obs1['T'][0], obs2['T'][0])
+    hi = min(obs1['T'][-1], obs2['T'][-1])
+    if hi <= lo:
+        return None
+    T = np.linspace(lo, hi, 401)
+    d = np.interp(T, obs1['T'], obs1['U']) - np.interp(T, obs2['T'], obs2['U'])
+    k = np.flatnonzero(np.sign(d[:-1]) != np.sign(d[1:]))
+    if len(k) == 0:
+        return None
+    #crossing closest to the middle of the common range
+    k = k[np.argmin(np.abs(T[k] - 0.5*(lo+hi)))]
+    return T[k] - d[k]*(T[k+1]-T[k])/(d[k+1]-d[k])
+
+
+def peak(T, y):
+    '''Position and height of the maximum of y(T), refined with a parabola'''
+    k = int(np.argmax(y))
+    if 0 < k < len(T)-1:
+        a, b, c = np.polyfit(T[k-1:k+2], y[k-1:k+2], 2)
+        if a < 0:
+            Tp = -b/(2*a)
+            return Tp, np.polyval((a, b, c), Tp)
+    return T[k], y[k]
+
+
+def _slope(L, y):
+    '''Exponent of a power law y ~ L^x fitted in log-log scale'''
+    return np.polyfit(np.log(L), np.log(y), 1)[0]
+
+
+class FSSResult:
+    '''Observables per size and the finite size scaling estimates'''
+
+    def __init__(self, points):
+        self.points = points
+        self.sizes = sorted(points)
+        self.obs = {L: observables(points[L]) for L in self.sizes}
+        self.crossings = []
+        for L1, L2 in zip(self.sizes[:-1], self.sizes[1:]):
+            Tx = binder_crossing(self.obs[L1], self.obs[L2])
+            if Tx is not None:
+                self.crossings.append((L1, L2, Tx))
+        self.fit()
+
+    def fit(self):
+        '''Tc and exponent ratios from Binder crossings and peak scaling'''
+        L = np.array(self.sizes, dtype=float)
+        chi_peak = [peak(self.obs[l]['T'], self.obs[l]['chi']) for l in self.sizes]
+        dU = [peak(self.obs[l]['T'][1:], -np.diff(self.obs[l]['U'])/np.diff(self.obs[l]['T']))
+              for l in self.sizes]
+        self.chi_max = np.array([h for t, h in chi_peak])
+        self.T_chi = np.array([t for t, h in chi_peak])
+        self.dU_max = np.array([h for t, h in dU])
+        est = {}
+        if self.crossings:
+            #the crossings of the largest sizes have the smallest corrections
+            est['Tc_binder'] = self.crossings[-1][2]
+        if len(L) >= 2:
+            est['gamma/nu'] = _slope(L, self.chi_max)
+            est['1/nu'] = _slope(L, self.dU_max)
+            inv = L**(-est['1/nu'])
+            est['Tc_chi'] = np.polyfit(inv, self.T_chi, 1)[1]
+            Tc = est.get('Tc_binder', est['Tc_chi'])
+            absM = [np.interp(Tc, self.obs[l]['T'], self.obs[l]['absM']) for l in self.sizes]
+            est['beta/nu'] = -_slope(L, absM)
+        self.estimates = est
+        return est
+
+    @property
+    def Tc(self):
+        return self.estimates.get('Tc_binder', self.estimates.get('Tc_chi'))
+
+
+def fss_scan(sizes, T=None, eqSteps=1000, mcSteps=4000, window=0.5, nfine=11,
+             nu=1.0, J=1.0, seed=None, map=map, verbose=True):
+    '''Finite size scaling study of the 2D Ising model
+
+    sizes   : lattice sizes L (run from small to large)
+    T       : temperatures scanned by the two smallest sizes
+              (default 21 points in [1.5, 3.5])
+    window  : half width of the window around the crossing scanned by the
+              third size; later sizes use window*(L3/L)**(1/nu)
+    nfine   : number of temperatures in each window
+    map     : map function used to run the points of one size, e.g. the
+              map method of a concurrent.futures pool
+    Returns an FSSResult.
+    '''
+    if seed is None:
+        seed = new_seed()
+    sizes = sorted(sizes)
+    T = np.linspace(1.5, 3.5, 21) if T is None else np.sort(np.asarray(T, dtype=float))
+    Tc = 2.0*J/np.log(1.0 + np.sqrt(2.0))
+    points = {}
+    for k, L in enumerate(sizes):
+        if k < 2:
+            temps = T
+        else:
+            obs = [observables(points[l]) for l in sizes[k-2:k]]
+            Tx = binder_crossing(*obs)
+            if Tx is not None:
+                Tc = Tx
+            w = window*(sizes[2]/L)**(1.0/nu)
+            temps = np.linspace(Tc - w, Tc + w, nfine)
+        if verbose:
+            print('L=%d: %d temperatures in [%.3f, %.3f]' % (L, len(temps), temps[0], temps[-1]))
+        args = [(L, t, eqSteps, mcSteps, seed, J) for t in temps]
+        points[L] = list(map(_point, args))
+    return FSSResult(points)
@@ -0,0 +1,137 @@
+# -----------------------------------------------------------------
+# Kernels: initial condition, Metropolis Monte Carlo move and
+# measurement of Energy and magnetization of a configuration
+# -----------------------------------------------------------------
+import numpy as np
+
+from . import profiling
+from .rng import as_rng
+
+
+#Generation of a random initial state for the sites of the lattice
+def initialstate(lattice, rng=None, model=None):
+    ''' generates a random spin configuration for initial condition
+
+    Spins are +1/-1 stored as int8 unless a model with other states is given (e.g. a
+    potts.PottsModel, whose states are 0..q-1).
+    '''
+    rng = as_rng(rng)
+    if model is not None:
+        return model.random_state(lattice.shape, rng)
+    return 2*rng.integers(2, size=lattice.shape, dtype=np.int8)-1
+
+
+#One Monte Carlo sweep: as many random single-site trials as sites
+def mcmove(config, lattice, model, beta, rng=None):
+    '''Monte Carlo move using Metropolis algorithm
+
+    All the random numbers of the sweep (sites and acceptance tests) are
+    drawn in bulk from rng before the loop over trials, acceptance
+    probabilities are looked up in the model's table for this beta and
+    neighbours in the lattice's precomputed neighbour lists.
+    '''
+    rng = as_rng(rng)
+    prof = profiling.active()
+    n = lattice.nsites
+    z = lattice.z
+    acc = model.acceptance_table(beta, z).tolist()
+    nbrs = lattice.neighbour_lists()
+    flat = lattice.flat(config)
+    spins = flat.tolist()
+    with prof.phase('rng'):
+        sites = rng.integers(0, n, size=n).tolist()
+        u = rng.random(n).tolist()
+    accepted = 0
+    for i, r in zip(sites, u):
+        s = spins[i]
+        nb = sum([spins[j] for j in nbrs[i]])
+        #flip spin or not with probability min(1, exp(-beta*cost))
+        if r < acc[(s+1) >> 1][nb+z]:
+            spins[i] = -s
+            accepted += 1
+    flat[:] = spins
+    prof.count(attempted=n, accepted=accepted)
+    return config
+
+
+#One Monte Carlo sweep updating the sublattices (colours) in turn
+def checkerboard_move(config, lattice, model, beta, rng=None):
+    '''Vectorized Metropolis sweep over the sublattices of the lattice
+
+    Sites of the same colour (the two sublattices of a checkerboard on
+    the square lattice) do not interact, so all of them are updated at
+    once. This samples the same distribution as mcmove (it is a
+    different but equally valid Metropolis dynamics).
+    '''
+    rng = as_rng(rng)
+    prof = profiling.active()
+    z = lattice.z
+    table = model.acceptance_table(beta, z)
+    flat = lattice.flat(config)
+    for sites in lattice.colours:
+        nb = lattice.neighbour_sum(flat, sites)
+        s = flat[sites]
+        p = table[(s+1)//2, nb+z]
+        with prof.phase('rng'):
+            u = rng.random(len(sites))
+        flip = u < p
+        flat[sites[flip]] = -s[flip]
+        if prof.enabled:
+            prof.count(attempted=len(sites), accepted=np.count_nonzero(flip))
+    return config
+
+
+#One heat-bath sweep updating the sublattices (colours) in turn
+def heatbath_move(config, lattice, model, beta, rng=None):
+    '''Vectorized heat-bath (Glauber) sweep
+
+    Every site is set to +1 with probability 1/(1+exp(beta*cost)), where
+    cost is the energy of the +1 state relative to the -1 state given its
+    neighbours, regardless of its current state. Probabilities are looked
+    up in the model's heat-bath table for this beta. Interacting models
+    are updated one sublattice at a time as in checkerboard_move; in a
+    model without interactions (TwoStateModel) all the sites are
+    independent and are set at once.
+    '''
+    rng = as_rng(rng)
+    prof = profiling.active()
+    z = lattice.z
+    p_up = model.heatbath_table(beta, z)
+    flat = lattice.flat(config)
+    if not model.interacting:
+        #the neighbour sum does not matter, use the nb=0 entry
+        with prof.phase('rng'):
+            u = rng.random(lattice.nsites)
+        new = np.where(u < p_up[z], 1, -1)
+        if prof.enabled:
+            #a heat-bath update is 'accepted' when the spin changes
+            prof.count(attempted=lattice.nsites, accepted=np.count_nonzero(new != flat))
+        flat[:] = new
+        return config
+    for sites in lattice.colours:
+        nb = lattice.neighbour_sum(flat, sites)
+        with prof.phase('rng'):
+            u = rng.random(len(sites))
+        new = np.where(u < p_up[nb+z], 1, -1)
+        if prof.enabled:
+            prof.count(attempted=len(sites), accepted=np.count_nonzero(new != flat[sites]))
+        flat[sites] = new
+    return config
+
+
+#Energy of a given configuration
+def calcEnergy(config, lattice, model):
+    '''Energy of a given configuration'''
+    return model.energy(config, lattice)
+
+
+#Magnetization of a given configuration
+def calcMag(config, model=None):
+    '''Magnetization of a given configuration
+
+    With a model, its order parameter (e.g. the Potts magnetization)
+    times the number of sites.
+    '''
+    if model is not None:
+        return model.magnetization(config)
+    return np.sum(config)
@@ -0,0 +1,364 @@
+# -----------------------------------------------------------------
+# Event driven kinetic engines for low temperature dynamics
+#
+# At low T almost every trial of mcmove is rejected: a spin inside a
+# domain has all its neighbours parallel and a large flip cost. These
+# engines keep track of the state of every site incrementally and only
+# spend work on the moves that can happen, while advancing the clock
+# so that the dynamics (in units of MC sweeps) is the same as random
+# site Metropolis.
+#
+# ActiveInterfaceEngine
+#     keeps the set of active sites (at least one antiparallel
+#     neighbour). A trial of mcmove picks an active site with
+#     probability n_active/n and otherwise an inactive site, which is
+#     flipped with the (small) probability a_up or a_down. The number of
+#     trials until something can happen is geometric, so null trials
+#     are skipped in one step; the chosen active site is then tested
+#     with the usual Metropolis probability.
+#
+# NFoldWayEngine
+#     rejection free (Bortz-Kalos-Lebowitz n-fold way): sites are grouped
+#     in classes by (s, neighbour sum), all sites of a class have the same
+#     flip probability a_k. A class is chosen with probability
+#     n_k*a_k/R, R = sum_k n_k*a_k, a random member is flipped and the
+#     clock advances by an exponential waiting time of mean 1/R sweeps.
+#     Every event is a flip.
+#
+# KawasakiEngine
+#     conserved magnetization (lattice gas at fixed density): a trial
+#     picks a random bond and exchanges its two spins with Metropolis
+#     acceptance. Only antiparallel bonds change anything, so the engine
+#     keeps the set of antiparallel bonds and skips the trials on
+#     parallel bonds in one geometric step, as ActiveInterfaceEngine does
+#     with the inactive sites.
+# -----------------------------------------------------------------
+import math
+
+import numpy as np
+
+from . import profiling
+from .rng import as_rng
+
+
+class _IndexedSets:
+    '''Partition of the sites in classes, with O(1) moves and random picks'''
+
+    def __init__(self, nclasses, cls):
+        self.members = [[] for c in range(nclasses)]
+        self.cls = list(cls)
+        self.pos = [0]*len(self.cls)
+        for i, c in enumerate(self.cls):
+            self.pos[i] = len(self.members[c])
+            self.members[c].append(i)
+
+    def move(self, i, c):
+        '''Move site i to class c'''
+        old = self.cls[i]
+        if old == c:
+            return
+        src = self.members[old]
+        last = src.pop()
+        if last != i:
+            p = self.pos[i]
+            src[p] = last
+            self.pos[last] = p
+        self.pos[i] = len(self.members[c])
+        self.members[c].append(i)
+        self.cls[i] = c
+
+    def count(self, c):
+        return len(self.members[c])
+
+
+class _KineticEngine:
+    '''State kept by the event driven engines and their sampling loop
+
+    Subclasses implement _event(), which returns the waiting time (in
+    sweeps) until the next event, and _apply(), which performs it.
+    '''
+
+    #spins changed by one accepted move (for the profiling counters)
+    spins_per_move = 1
+
+    def __init__(self, config, lattice, model, beta, rng=None, buffer=4096):
+        if not lattice.regular:
+            raise ValueError('%s needs a lattice where all sites have the same number '
+                             'of neighbours' % type(self).__name__)
+        self.lattice = lattice
+        self.model = model
+        self.rng = as_rng(rng)
+        self._config = config
+        self._flat = lattice.flat(config)
+        self.n = lattice.nsites
+        self.z = lattice.z
+        self.nbrs = lattice.neighbour_lists()
+        self.spins = self._flat.tolist()
+        self.nb = lattice.neighbour_sum(self._flat).tolist()
+        self.E = float(model.energy(config, lattice))
+        self.M = int(sum(self.spins))
+        self.time = 0.0
+        self.flips = 0
+        self._u = []
+        self._buffer = buffer
+        self.set_beta(beta)
+
+    def set_beta(self, beta):
+        '''Change the temperature (the acceptance tables are recomputed)'''
+        self.beta = beta
+        self.acc = self.model.acceptance_table(beta, self.z).tolist()
+
+    def _uniform(self):
+        '''Next uniform number from a buffer filled in bulk'''
+        if not self._u:
+            with profiling.active().phase('rng'):
+                self._u = self.rng.random(self._buffer).tolist()
+        return self._u.pop()
+
+    def _flip(self, i):
+        '''Flip site i and update energy, magnetization and neighbour sums'''
+        s = self.spins[i]
+        self.E += self.model.cost(s, self.nb[i])
+        self.spins[i] = -s
+        self.M -= 2*s
+        d = -2*s
+        nb = self.nb
+        for j in self.nbrs[i]:
+            nb[j] += d
+        self.flips += 1
+
+    @property
+    def config(self):
+        '''Current configuration (shape of the lattice)'''
+        self._flat[:] = self.spins
+        return self._config
+
+    def run(self, nsweeps, every=1, observers=()):
+        '''Evolve for nsweeps MC sweeps
+
+        Returns the lists step, E, M with time (in sweeps), energy and
+        magnetization per site sampled every `every` sweeps (including
+        the initial state), as in the snapshot programs. Observers are
+        called with the configuration at every sample. The run is timed
+        as the phase 'kinetic' of the active profiler, which counts
+        n*nsweeps attempted moves (the trials of the equivalent random
+        site dynamics) and the moves made as accepted.
+        '''
+        prof = profiling.active()
+        with prof.phase('kinetic'):
+            flips = self.flips
+            out = self._run(nsweeps, every, observers)
+            prof.count(attempted=round(self.n*nsweeps),
+                       accepted=(self.flips - flips)//self.spins_per_move)
+        return out
+
+    def _run(self, nsweeps, every, observers):
+        n = self.n
+        end = self.time + nsweeps
+        step, E, M = [], [], []
+        next_sample = self.time
+        while True:
+            wait = self._event()
+            t_event = self.time + wait
+            while next_sample <= min(t_event, end):
+                step.append(next_sample)
+                E.append(self.E/n)
+                M.append(self.M/n)
+                if observers:
+                    config = self.config
+                    for observer in observers:
+                        observer(config)
+                next_sample += every
+            if t_event > end:
+                #memoryless waiting times: the pending event can be dropped
+                self.time = end
+                break
+            self.time = t_event
+            self._apply()
+        self.config
+        return step, E, M
+
+
+class ActiveInterfaceEngine(_KineticEngine):
+    '''Random site Metropolis that only proposes moves at the interfaces
+
+    Equivalent to repeated calls of kernels.mcmove (same dynamics in
+    units of MC sweeps) on a lattice where every site has z neighbours.
+    '''
+
+    ACTIVE, UP, DOWN = 0, 1, 2
+
+    def __init__(self, config, lattice, model, beta, rng=None):
+        super().__init__(config, lattice, model, beta, rng)
+        self.sets = _IndexedSets(3, [self._class(i) for i in range(self.n)])
+
+    def set_beta(self, beta):
+        super().set_beta(beta)
+        z = self.z
+        #acceptance of a spin with all neighbours parallel
+        self.a_up = self.acc[1][2*z]
+        self.a_down = self.acc[0][0]
+
+    def _class(self, i):
+        s = self.spins[i]
+        if self.nb[i] != self.z*s:
+            return self.ACTIVE
+        return self.UP if s > 0 else self.DOWN
+
+    def _event(self):
+        sets = self.sets
+        n_act = sets.count(self.ACTIVE)
+        w_up = sets.count(self.UP)*self.a_up
+        w_down = sets.count(self.DOWN)*self.a_down
+        total = n_act + w_up + w_down
+        if total == 0:
+            return math.inf
+        self._weights = (n_act, w_up, total)
+        p = total/self.n
+        #trials until one picks an active site or flips an inactive one
+        if p >= 1.0:
+            return 1.0/self.n
+        return (1 + int(math.log(1.0 - self._uniform())/math.log1p(-p)))/self.n
+
+    def _apply(self):
+        n_act, w_up, total = self._weights
+        x = self._uniform()*total
+        if x < n_act:
+            members = self.sets.members[self.ACTIVE]
+            i = members[int(self._uniform()*len(members))]
+            s = self.spins[i]
+            if not self._uniform() < self.acc[(s+1) >> 1][self.nb[i]+self.z]:
+                return
+        else:
+            c = self.UP if x < n_act + w_up else self.DOWN
+            members = self.sets.members[c]
+            i = members[int(self._uniform()*len(members))]
+        self._flip(i)
+        self.sets.move(i, self._class(i))
+        for j in self.nbrs[i]:
+            self.sets.move(j, self._class(j))
+
+
+class NFoldWayEngine(_KineticEngine):
+    '''Rejection free continuous time Monte Carlo (n-fold way)
+
+    Same dynamics as random site Metropolis in the continuous time limit,
+    with the time measured in MC sweeps.
+    '''
+
+    def __init__(self, config, lattice, model, beta, rng=None):
+        super().__init__(config, lattice, model, beta, rng)
+        self.sets = _IndexedSets(len(self.rates), [self._class(i) for i in range(self.n)])
+
+    def set_beta(self, beta):
+        super().set_beta(beta)
+        #flip probability of the class (s+1)//2*(2z+1) + nb + z
+        self.rates = self.acc[0] + self.acc[1]
+
+    def _class(self, i):
+        return ((self.spins[i]+1) >> 1)*(2*self.z+1) + self.nb[i] + self.z
+
+    def _event(self):
+        members = self.sets.members
+        weights = [len(m)*r for m, r in zip(members, self.rates)]
+        total = sum(weights)
+        if total == 0:
+            return math.inf
+        self._weights = (weights, total)
+        return -math.log(1.0 - self._uniform())/total
+
+    def _apply(self):
+        weights, total = self._weights
+        x = self._uniform()*total
+        #class chosen with the cumulative weights (the last non-empty class
+        #absorbs round off)
+        for k, w in enumerate(weights):
+            if w:
+                c = k
+                if x < w:
+                    break
+                x -= w
+        members = self.sets.members[c]
+        i = members[int(self._uniform()*len(members))]
+        self._flip(i)
+        self.sets.move(i, self._class(i))
+        for j in self.nbrs[i]:
+            self.sets.move(j, self._class(j))
+
+
+class KawasakiEngine(_KineticEngine):
+    '''Kawasaki spin exchange dynamics (conserved magnetization)
+
+    A MC sweep is nsites trials; each trial picks one of the nearest
+    neighbour bonds at random and exchanges its spins with probability
+    min(1, exp(-beta*dE)). Trials on parallel bonds are never made
+    explicitly. The magnetization of the initial configuration is
+    conserved (see fixed_magnetization for a starting state).
+    '''
+
+    ALIGNED, ANTI = 0, 1
+    spins_per_move = 2
+
+    def __init__(self, config, lattice, model, beta, rng=None):
+        super().__init__(config, lattice, model, beta, rng)
+        bonds = lattice.bonds()
+        self.nbonds = len(bonds)
+        self.bond_i = bonds[:, 0].tolist()
+        self.bond_j = bonds[:, 1].tolist()
+        #bonds of every site (all sites have z of them)
+        ends = bonds.ravel()
+        self.site_bonds = (np.argsort(ends, kind='stable')//2).reshape(self.n, self.z).tolist()
+        self.sets = _IndexedSets(2, [self._class(b) for b in range(self.nbonds)])
+
+    def set_beta(self, beta):
+        super().set_beta(beta)
+        #acceptance of an exchange of s_i = s and s_j = -s indexed by
+        #[(s+1)//2][nb_i+z][nb_j+z]: flip i, then flip j (which then has
+        #neighbour sum nb_j - 2s)
+        z = self.z
+        nb = np.arange(-z, z+1)
+        table = []
+        for s in (-1, 1):
+            cost = (np.broadcast_to(self.model.cost(s, nb), nb.shape)[:, None]
+                    + np.broadcast_to(self.model.cost(-s, nb - 2*s), nb.shape)[None, :])
+            table.append(np.exp(np.minimum(0.0, -beta*cost)).tolist())
+        self.swap = table
+
+    def _class(self, b):
+        return int(self.spins[self.bond_i[b]] != self.spins[self.bond_j[b]])
+
+    def _event(self):
+        n_anti = self.sets.count(self.ANTI)
+        if n_anti == 0:
+            return math.inf
+        p = n_anti/self.nbonds
+        #trials until one picks an antiparallel bond
+        if p >= 1.0:
+            return 1.0/self.n
+        return (1 + int(math.log(1.0 - self._uniform())/math.log1p(-p)))/self.n
+
+    def _apply(self):
+        members = self.sets.members[self.ANTI]
+        b = members[int(self._uniform()*len(members))]
+        i, j = self.bond_i[b], self.bond_j[b]
+        s = self.spins[i]
+        z = self.z
+        if not self._uniform() < self.swap[(s+1) >> 1][self.nb[i]+z][self.nb[j]+z]:
+            return
+        self._flip(i)
+        self._flip(j)
+        for k in self.site_bonds[i] + self.site_bonds[j]:
+            self.sets.move(k, self._class(k))
+
+
+def fixed_magnetization(lattice, m=0.0, rng=None):
+    '''Random configuration with magnetization per site as close as possible to m
+
+    Starting state for KawasakiEngine: a lattice gas with a fraction
+    (1+m)/2 of the sites occupied (s=+1).
+    '''
+    rng = as_rng(rng)
+    n = lattice.nsites
+    flat = -np.ones(n, dtype=np.int8)
+    flat[rng.permutation(n)[:int(round(0.5*(1.0 + m)*n))]] = 1
+    return flat.reshape(lattice.shape)
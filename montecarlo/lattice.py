@@ -0,0 +1,215 @@
+# -----------------------------------------------------------------
+# Lattices: geometry and neighbours of the sites of the system
+#
+# Sites are numbered 0..nsites-1 in C order of the configuration
+# array, and the neighbours of every site are stored once, when the
+# lattice is built, in CSR layout:
+#     neighbours of site i = indices[indptr[i]:indptr[i+1]]
+# so the kernels never compute periodic images with % in their loops.
+# When all sites have the same number of neighbours (periodic
+# lattices) the same array is also available as a (nsites, z) table.
+# -----------------------------------------------------------------
+import numpy as np
+
+
+class Lattice:
+    '''Lattice given by its neighbour lists in CSR layout
+
+    shape   : shape of the configuration arrays
+    indptr  : array of nsites+1 offsets into indices
+    indices : neighbour sites of every site, one after the other
+    colours : optional list of arrays of sites; sites of the same colour
+              must not be neighbours. Computed greedily if not given.
+    '''
+
+    def __init__(self, shape, indptr, indices, colours=None):
+        self.shape = tuple(shape)
+        self.nsites = int(np.prod(self.shape))
+        self.indptr = np.ascontiguousarray(indptr, dtype=np.intp)
+        self.indices = np.ascontiguousarray(indices, dtype=np.intp)
+        if len(self.indptr) != self.nsites+1:
+            raise ValueError('indptr must have nsites+1 entries')
+        self.degree = np.diff(self.indptr)
+        if self.degree.min() < 1:
+            raise ValueError('every site needs at least one neighbour')
+        self.z = int(self.degree.max())
+        self.regular = bool(np.all(self.degree == self.z))
+        #dense (nsites, z) view of the neighbours, only for regular lattices
+        self.table = self.indices.reshape(self.nsites, self.z) if self.regular else None
+        if colours is None:
+            colours = self._greedy_colours()
+        self.colours = [np.ascontiguousarray(c, dtype=np.intp) for c in colours]
+        #gather indices and segment offsets of each colour (irregular lattices)
+        self._segments = {}
+        if not self.regular:
+            for c in self.colours:
+                self._segments[id(c)] = self._segment(c)
+        self._lists = None
+        self._bonds = None
+
+    def __repr__(self):
+        return '%s(shape=%r)' % (type(self).__name__, self.shape)
+
+    def _greedy_colours(self):
+        '''Colour the sites so that no two neighbours share a colour'''
+        colour = np.full(self.nsites, -1)
+        indptr = self.indptr.tolist()
+        indices = self.indices.tolist()
+        for i in range(self.nsites):
+            used = {colour[j] for j in indices[indptr[i]:indptr[i+1]]}
+            c = 0
+            while c in used:
+                c += 1
+            colour[i] = c
+        return [np.flatnonzero(colour == c) for c in range(colour.max()+1)]
+
+    def _segment(self, sites):
+        '''Neighbours of `sites` in CSR order and the start of each segment'''
+        deg = self.degree[sites]
+        starts = np.zeros(len(sites), dtype=np.intp)
+        np.cumsum(deg[:-1], out=starts[1:])
+        pos = np.repeat(self.indptr[sites] - starts, deg) + np.arange(deg.sum())
+        return self.indices[pos], starts
+
+    def flat(self, config):
+        '''View of config with the lattice dimensions flattened into one axis'''
+        lead = config.shape[:config.ndim-len(self.shape)]
+        flat = config.reshape(lead + (self.nsites,))
+        if not np.may_share_memory(flat, config):
+            raise ValueError('configuration must be a contiguous array')
+        return flat
+
+    def neighbours(self, i):
+        '''Neighbour sites of site i'''
+        return self.indices[self.indptr[i]:self.indptr[i+1]]
+
+    def neighbour_lists(self):
+        '''Neighbours of every site as Python lists (for the sequential kernels)'''
+        if self._lists is None:
+            indptr = self.indptr.tolist()
+            indices = self.indices.tolist()
+            self._lists = [indices[indptr[i]:indptr[i+1]] for i in range(self.nsites)]
+        return self._lists
+
+    def neighbour_sum(self, flat, sites=None):
+        '''Sum of the neighbours of `sites` (default all) of a flat configuration
+
+        flat may have leading batch dimensions, e.g. (replicas, nsites).
+        '''
+        if self.regular:
+            table = self.table if sites is None else self.table[sites]
+            return flat[..., table].sum(axis=-1)
+        if sites is None:
+            idx, starts = self.indices, self.indptr[:-1]
+        else:
+            seg = self._segments.get(id(sites))
+            idx, starts = seg if seg is not None else self._segment(sites)
+        return np.add.reduceat(flat[..., idx], starts, axis=-1)
+
+    def bond_sum(self, config):
+        '''Sum of s_i*s_j over all nearest neighbour bonds (each bond counted once)'''
+        flat = np.asarray(config).reshape(np.shape(config)[:np.ndim(config)-len(self.shape)]
+                                          + (self.nsites,))
+        return np.sum(flat*self.neighbour_sum(flat), axis=-1)//2
+
+    def bonds(self):
+        '''Array (nbonds, 2) with every bond i<j listed once (cached, read only)'''
+        if self._bonds is None:
+            i = np.repeat(np.arange(self.nsites), self.degree)
+            keep = i < self.indices
+            self._bonds = np.stack([i[keep], self.indices[keep]], axis=1)
+            self._bonds.setflags(write=False)
+        return self._bonds
+
+
+def _from_offsets(shape, offsets, periodic):
+    '''CSR neighbour arrays of a hypercubic grid from neighbour offsets
+
+    offsets has shape (z, ndim), or (nsites, z, ndim) when the offsets
+    depend on the site. Without periodic boundaries neighbours falling
+    outside the grid are dropped.
+    '''
+    shape = np.array(shape)
+    coords = np.indices(shape).reshape(len(shape), -1).T        # (nsites, ndim)
+    nb = coords[:, None, :] + np.asarray(offsets)               # (nsites, z, ndim)
+    if periodic:
+        nb %= shape
+        valid = np.ones(nb.shape[:2], dtype=bool)
+    else:
+        valid = np.all((nb >= 0) & (nb < shape), axis=-1)
+    idx = np.ravel_multi_index(tuple(np.moveaxis(nb, -1, 0)), shape, mode='wrap')
+    indptr = np.zeros(len(coords)+1, dtype=np.intp)
+    np.cumsum(valid.sum(axis=1), out=indptr[1:])
+    return indptr, idx[valid], coords
+
+
+def _colour_classes(colour, ncolours):
+    return [np.flatnonzero(colour == c) for c in range(ncolours)]
+
+
+class SquareLattice(Lattice):
+    '''N x N square lattice (4 neighbours), periodic boundaries by default'''
+
+    def __init__(self, N, periodic=True):
+        if N < 2:
+            raise ValueError('lattice size N must be at least 2, got %r' % (N,))
+        self.N = N
+        self.periodic = periodic
+        indptr, indices, xy = _from_offsets((N, N), [(1, 0), (0, 1), (-1, 0), (0, -1)], periodic)
+        colours = None
+        if N % 2 == 0 or not periodic:
+            colours = _colour_classes(xy.sum(axis=1) % 2, 2)
+        super().__init__((N, N), indptr, indices, colours)
+
+
+class TriangularLattice(Lattice):
+    '''N x N triangular lattice (6 neighbours) drawn on a sheared square grid'''
+
+    def __init__(self, N, periodic=True):
+        if N < 3:
+            raise ValueError('lattice size N must be at least 3, got %r' % (N,))
+        self.N = N
+        self.periodic = periodic
+        offsets = [(1, 0), (0, 1), (-1, 0), (0, -1), (1, 1), (-1, -1)]
+        indptr, indices, xy = _from_offsets((N, N), offsets, periodic)
+        colours = None
+        if N % 3 == 0 or not periodic:
+            colours = _colour_classes(xy.sum(axis=1) % 3, 3)
+        super().__init__((N, N), indptr, indices, colours)
+
+
+class HoneycombLattice(Lattice):
+    '''N x N honeycomb lattice (3 neighbours) in the brick-wall representation
+
+    Every site is bonded to its left and right neighbours in the row, and
+    to the site above or below depending on the parity of i+j.
+    '''
+
+    def __init__(self, N, periodic=True):
+        if N < 2 or (periodic and N % 2):
+            raise ValueError('a periodic honeycomb lattice needs an even N, got %r' % (N,))
+        self.N = N
+        self.periodic = periodic
+        parity = np.add.outer(np.arange(N), np.arange(N)).reshape(-1) % 2
+        offsets = np.zeros((N*N, 3, 2), dtype=int)
+        offsets[:, 0] = (0, 1)
+        offsets[:, 1] = (0, -1)
+        offsets[:, 2, 0] = 1 - 2*parity
+        indptr, indices, xy = _from_offsets((N, N), offsets, periodic)
+        super().__init__((N, N), indptr, indices, _colour_classes(parity, 2))
+
+
+class CubicLattice(Lattice):
+    '''N x N x N simple cubic lattice (6 neighbours)'''
+
+    def __init__(self, N, periodic=True):
+        if N < 2:
+            raise ValueError('lattice size N must be at least 2, got %r' % (N,))
+        self.N = N
+        self.periodic = periodic
+        offsets = [(1, 0, 0), (0, 1, 0), (0, 0, 1), (-1, 0, 0), (0, -1, 0), (0, 0, -1)]
+        indptr, indices, xyz = _from_offsets((N, N, N), offsets, periodic)
+        colours = None
+        if N % 2 == 0 or not periodic:
+            colours = _colour_classes(xyz.sum(axis=1) % 2, 2)
+        super().__init__((N, N, N), indptr, indices, colours)
@@ -0,0 +1,177 @@
+# -----------------------------------------------------------------
+# Live metrics of long runs over HTTP (Prometheus text format)
+#
+# On a node without a display the interactive plots of ising.py are not
+# available. A MetricsServer answers GET /metrics on a local port from
+# a background thread with the latest progress of a run:
+#     montecarlo_temperature_index   temperatures done (0..)
+#     montecarlo_temperatures        number of temperatures of the scan
+#     montecarlo_temperature         current temperature
+#     montecarlo_sweeps_total        MC sweeps done
+#     montecarlo_sweeps_per_second   rate at the current temperature
+#     montecarlo_acceptance_ratio    accepted/attempted flips at the current T
+#     montecarlo_eta_seconds         estimated time to the end of the scan
+#     montecarlo_energy ... _susceptibility   results at the last T done
+#
+# The simulation thread never waits for the server: publish() builds a
+# new dict of values and replaces the reference to the snapshot in one
+# assignment, and the server thread only reads whole snapshots. A
+# ScanProgress is called by driver.simulate at every measurement with
+# the sweeps done, and publishes at most once every `interval` seconds
+# (and at the end of every temperature), so the values are live within
+# a long temperature and the cost to the run stays a few microseconds
+# per measurement.
+# -----------------------------------------------------------------
+import math
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+#name: (type, description) of the published metrics
+METRICS = {
+    'temperature_index': ('gauge', 'Number of temperatures done'),
+    'temperatures': ('gauge', 'Number of temperatures of the scan'),
+    'temperature': ('gauge', 'Current temperature (reduced units)'),
+    'sweeps_total': ('counter', 'Monte Carlo sweeps done'),
+    'sweeps_per_second': ('gauge', 'Sweeps per second at the current temperature'),
+    'acceptance_ratio': ('gauge', 'Accepted/attempted spin flips at the current temperature'),
+    'eta_seconds': ('gauge', 'Estimated time to the end of the scan'),
+    'energy': ('gauge', 'Energy per site at the last temperature'),
+    'magnetization': ('gauge', 'Magnetization per site at the last temperature'),
+    'specific_heat': ('gauge', 'Specific heat per site at the last temperature'),
+    'susceptibility': ('gauge', 'Susceptibility per site at the last temperature'),
+}
+PREFIX = 'montecarlo_'
+
+
+def exposition(snapshot):
+    '''Prometheus text exposition of a snapshot dict of metric values'''
+    lines = []
+    for name, (kind, doc) in METRICS.items():
+        value = snapshot.get(name)
+        if value is None:
+            continue
+        value = float(value)
+        lines.append('# HELP %s%s %s' % (PREFIX, name, doc))
+        lines.append('# TYPE %s%s %s' % (PREFIX, name, kind))
+        if math.isnan(value):
+            text = 'NaN'
+        elif math.isinf(value):
+            text = '+Inf' if value > 0 else '-Inf'
+        else:
+            text = repr(value)
+        lines.append('%s%s %s' % (PREFIX, name, text))
+    return '\n'.join(lines) + '\n'
+
+
+class _Handler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        if self.path.split('?')[0] != '/metrics':
+            self.send_error(404)
+            return
+        body = exposition(self.server.metrics.snapshot).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class MetricsServer:
+    '''HTTP endpoint /metrics with the values passed to publish()
+
+    port 0 picks a free port (see .port). Bound to localhost by default.
+    Use as a context manager, or call close() to stop the server.
+    '''
+
+    def __init__(self, port=0, host='127.0.0.1'):
+        self.snapshot = {}
+        self._server = ThreadingHTTPServer((host, port), _Handler)
+        self._server.daemon_threads = True
+        self._server.metrics = self
+        self.host, self.port = self._server.server_address[:2]
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+
+    def __repr__(self):
+        return 'MetricsServer(http://%s:%d/metrics)' % (self.host, self.port)
+
+    def publish(self, **values):
+        '''Update some metrics; the others keep their last values'''
+        snapshot = dict(self.snapshot)
+        snapshot.update(values)
+        self.snapshot = snapshot
+
+    def close(self):
+        '''Stop the server thread'''
+        if self._thread is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class ScanProgress:
+    '''Progress of a temperature scan published to a MetricsServer
+
+    Called as progress(sweeps, total) by driver.simulate with the sweeps
+    done and to be done at the current temperature (the sweeps actually
+    run, nmsr*every production sweeps after the equilibration); the
+    values are published at most every `interval` seconds. The
+    acceptance ratio is read from the counters of the profiler prof,
+    including those of the phase still running (Profiler.total), so it
+    covers the sweeps done so far at the current temperature.
+    '''
+
+    def __init__(self, metrics, T, prof, interval=1.0):
+        self.metrics = metrics
+        self.T = T
+        self.prof = prof
+        self.interval = interval
+        self.sweeps_done = 0                # sweeps of the temperatures done
+        self.start_time = self.last = time.perf_counter()
+        self.m = 0
+        self.sweeps, self.total = 0, 1
+        metrics.publish(temperatures=len(T), temperature_index=0, sweeps_total=0)
+
+    def start(self, m):
+        '''Begin temperature m of the scan'''
+        self.m = m
+        self.sweeps, self.total = 0, 1
+        self.t0 = time.perf_counter()
+
+    def __call__(self, sweeps, total):
+        self.sweeps, self.total = sweeps, total
+        now = time.perf_counter()
+        if now - self.last >= self.interval:
+            self._publish(now)
+
+    def finish(self, **results):
+        '''End the current temperature and publish its results'''
+        self._publish(time.perf_counter(), temperature_index=self.m + 1, **results)
+        self.sweeps_done += self.sweeps
+        self.sweeps = 0
+
+    def _publish(self, now, **values):
+        self.last = now
+        T = float(self.T[self.m])
+        attempted = self.prof.total('attempted', T=T)
+        fraction = (self.m + self.sweeps/self.total)/len(self.T)
+        elapsed = now - self.start_time
+        self.metrics.publish(
+            temperature=T, sweeps_total=self.sweeps_done + self.sweeps,
+            sweeps_per_second=self.sweeps/(now - self.t0) if now > self.t0 else math.nan,
+            acceptance_ratio=(self.prof.total('accepted', T=T)/attempted
+                              if attempted else math.nan),
+            eta_seconds=elapsed*(1.0 - fraction)/fraction if fraction else math.nan,
+            **values)
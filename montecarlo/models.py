@@ -0,0 +1,152 @@
+# -----------------------------------------------------------------
+# Models: energy of a configuration and energy cost of a flip
+#
+# The Metropolis acceptance probability of a flip only depends on the
+# state s of the site and on the sum nb of its neighbours, so each
+# model tabulates min(1, exp(-beta*cost)) once per temperature:
+#     table[(s+1)//2, nb+z]
+# where z is the coordination number of the lattice. The kernels look
+# probabilities up in this table instead of calling np.exp.
+#
+# For heat-bath (Glauber) updates the new state of a site is drawn from
+# its local Boltzmann weights, independently of its current state:
+#     P(s=+1) = 1/(1 + exp(beta*cost(-1, nb)))
+# which is tabulated in the same way, indexed by [nb+z].
+#
+# The tables are kept in a small least-recently-used cache (TableCache)
+# keyed by the kind of table, beta, z and the public parameters of the
+# model (J, h...), so an annealing run visiting many temperatures does
+# not accumulate tables, and changing a parameter never returns a stale
+# table. Besides the number of tables the cache can bound their total
+# size in bytes (maxbytes), for models whose tables are large.
+# -----------------------------------------------------------------
+from collections import OrderedDict
+
+import numpy as np
+
+
+class TableCache:
+    '''Least-recently-used cache of the read-only tables of a model
+
+    Holds at most maxsize tables and, if maxbytes is given, at most
+    maxbytes bytes of tables (the most recent table is always kept).
+    '''
+
+    def __init__(self, maxsize=16, maxbytes=None):
+        self.maxsize = maxsize
+        self.maxbytes = maxbytes
+        self.nbytes = 0
+        self._tables = OrderedDict()
+
+    def __len__(self):
+        return len(self._tables)
+
+    def _full(self):
+        return (len(self._tables) > self.maxsize or
+                self.maxbytes is not None and self.nbytes > self.maxbytes)
+
+    def get(self, model, key, make):
+        '''Table of key (and the parameters of model), computed by make() if not cached'''
+        key = key + (tuple(v for k, v in sorted(vars(model).items()) if not k.startswith('_')),)
+        table = self._tables.get(key)
+        if table is None:
+            table = make()
+            table.setflags(write=False)
+            self._tables[key] = table
+            self.nbytes += table.nbytes
+            while len(self._tables) > 1 and self._full():
+                self.nbytes -= self._tables.popitem(last=False)[1].nbytes
+        else:
+            self._tables.move_to_end(key)
+        return table
+
+
+class _TabulatedModel:
+    '''Common code of the models: cached acceptance tables'''
+
+    #whether the flip cost depends on the neighbours
+    interacting = True
+
+    def cost(self, s, nb):
+        raise NotImplementedError
+
+    def cost_table(self, z):
+        '''Flip costs indexed by [(s+1)//2, nb+z]'''
+        nb = np.arange(-z, z+1)
+        return np.array([np.broadcast_to(self.cost(s, nb), nb.shape) for s in (-1, 1)],
+                        dtype=float)
+
+    def random_state(self, shape, rng):
+        '''Random configuration of s=+1/-1 (int8)'''
+        return 2*rng.integers(2, size=shape, dtype=np.int8)-1
+
+    def magnetization(self, config, axis=None):
+        '''Sum of the spins (over all the axes by default)'''
+        return np.sum(config, axis=axis)
+
+    def acceptance_table(self, beta, z):
+        '''Metropolis acceptance min(1, exp(-beta*cost)) indexed by [(s+1)//2, nb+z]'''
+        return self._tables.get(self, ('metropolis', float(beta), z),
+                                lambda: np.exp(np.minimum(0.0, -beta*self.cost_table(z))))
+
+    def heatbath_table(self, beta, z):
+        '''Heat-bath probability of the state s=+1 indexed by [nb+z]'''
+        def make():
+            #written with exp(-|x|) so that it does not overflow at low T
+            x = beta*self.cost_table(z)[0]
+            e = np.exp(-np.abs(x))
+            return np.where(x > 0, e/(1.0 + e), 1.0/(1.0 + e))
+        return self._tables.get(self, ('heatbath', float(beta), z), make)
+
+
+class IsingModel(_TabulatedModel):
+    '''Ising model: interacting spins s=+1/-1 with coupling J in a field h
+
+    The energy is E = -J*sum_<ij> s_i*s_j - h*sum_i s_i with each nearest
+    neighbour bond counted once. (The teaching programs in Ising/ use
+    J=1, h=0 and divide the double sum over sites by 4, therefore they
+    print half of this value.)
+    '''
+
+    def __init__(self, J=1.0, h=0.0):
+        self.J = J
+        self.h = h
+        self._tables = TableCache()
+
+    def __repr__(self):
+        return 'IsingModel(J=%r, h=%r)' % (self.J, self.h)
+
+    def cost(self, s, nb):
+        '''Energy cost of flipping spin s with neighbour sum nb'''
+        return 2*s*(self.J*nb + self.h)
+
+    def energy(self, config, lattice):
+        '''Energy of a given configuration (or of a batch with leading dimensions)'''
+        axes = tuple(range(-len(lattice.shape), 0))
+        return -self.J*lattice.bond_sum(config) - self.h*np.sum(config, axis=axes)
+
+
+class TwoStateModel(_TabulatedModel):
+    '''Ideal two state model (no interactions between sites)
+
+    The state with s=-1 has zero energy and the state with s=+1 has
+    energy epsilon.
+    '''
+
+    interacting = False
+
+    def __init__(self, epsilon=1.0):
+        self.epsilon = epsilon
+        self._tables = TableCache()
+
+    def __repr__(self):
+        return 'TwoStateModel(epsilon=%r)' % self.epsilon
+
+    def cost(self, s, nb):
+        '''Energy cost of flipping state s (neighbours do not matter)'''
+        return -s*self.epsilon
+
+    def energy(self, config, lattice):
+        '''Energy of a given configuration (or of a batch with leading dimensions)'''
+        axes = tuple(range(-len(lattice.shape), 0))
+        return self.epsilon*np.count_nonzero(np.asarray(config) > 0, axis=axes)
@@ -0,0 +1,331 @@
+# -----------------------------------------------------------------
+# Domain decomposition of large square lattices over processes
+#
+# The N x N configuration lives in one multiprocessing.shared_memory
+# buffer (one int8 per spin). The rows are split in `nblocks` strips and
+# each worker process owns a contiguous group of strips. All workers
+# update the sites of one checkerboard colour of their strips, wait at a
+# barrier, and then update the other colour. The rows just above and
+# below a strip are read in place from the shared buffer, nothing is
+# copied between processes. In the rows of one parity the sites of one
+# colour are every other column, a strided view of the strip, so a
+# half sweep only works on (and draws random numbers for) the sites
+# being updated.
+#
+# Every strip has its own random stream (seed, (1, b)), so a given seed
+# gives the same configuration for any number of workers.
+#
+# Failures: a worker that raises sends its traceback to the parent and
+# aborts the barrier between half sweeps, so that the other workers
+# stop; the parent also checks that the workers are alive while it
+# waits for a run. Either way run() raises RuntimeError, the workers
+# are stopped and the shared memory is released (also if the engine is
+# just garbage collected).
+#
+# Scaling: how the throughput grows with the number of cores has not
+# been measured yet (the development machine has a single core, where
+# more workers only add barrier overhead). Measure it on the target node
+# with
+#     python -m montecarlo.benchmark shared-1 shared-2 shared-4 --workers 1 2 4 --sizes 4096 8192
+# which reports the speedup and efficiency of every worker count.
+# -----------------------------------------------------------------
+import multiprocessing as mp
+import threading
+import traceback
+import weakref
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from . import profiling
+from .rng import make_rng, new_seed
+
+
+def _strips(N, nblocks):
+    '''Row boundaries of the strips'''
+    return [(N*b)//nblocks for b in range(nblocks+1)]
+
+
+class _Torus:
+    '''Shape and bond sum of the periodic N x N lattice, computed with rolls
+
+    Enough for model.energy, without the neighbour tables of a
+    SquareLattice (which would cost more memory than the spins).
+    '''
+
+    def __init__(self, N):
+        self.shape = (N, N)
+
+    def bond_sum(self, config):
+        s = config
+        return int(np.sum(s*np.roll(s, 1, 0), dtype=np.int64)
+                   + np.sum(s*np.roll(s, 1, 1), dtype=np.int64))
+
+
+class _Strip:
+    '''Rows r0:r1 of the shared configuration and their scratch buffers
+
+    The rows are taken in two groups, rows of even and of odd global
+    index; in a group the sites of a colour are the columns a, a+2, ...
+    with a = (colour + parity) % 2, and their horizontal neighbours are
+    the other columns of the same rows.
+    '''
+
+    def __init__(self, spins, r0, r1, rng):
+        N = spins.shape[1]
+        self.spins = spins
+        self.r0, self.r1 = r0, r1
+        self.rng = rng
+        self.groups = []
+        for q in (0, 1):
+            i0 = (q - r0) % 2                   # first local row of parity q
+            m = len(range(i0, r1-r0, 2))
+            if m:
+                shape = (m, N//2)
+                self.groups.append((q, i0, m, np.empty(shape, dtype=np.int8),
+                                    np.empty(shape, dtype=np.int8), np.empty(shape),
+                                    np.empty(shape), np.empty(shape, dtype=bool)))
+
+    def update(self, colour, table, z, count=False):
+        '''Metropolis update of the sites of one colour, all in place
+
+        table is the acceptance table as given by _offset_table. Returns
+        the number of flips if count is true (0 otherwise).
+        '''
+        s = self.spins
+        N = s.shape[0]
+        blk = s[self.r0:self.r1]
+        flips = 0
+        for q, i0, m, nb, key, p, u, flip in self.groups:
+            a = (colour + q) % 2
+            sites = blk[i0::2, a::2]
+            other = blk[i0::2, 1-a::2]
+            #neighbours in the row (periodic): columns j-1 and j+1
+            nb[:] = other
+            if a == 0:
+                nb[:, 1:] += other[:, :-1]
+                nb[:, 0] += other[:, -1]
+            else:
+                nb[:, :-1] += other[:, 1:]
+                nb[:, -1] += other[:, 0]
+            #neighbours in the rows above and below (boundary rows read in place)
+            if i0 == 1:
+                nb += blk[0::2, a::2][:m]
+            else:
+                nb[1:] += blk[1::2, a::2][:m-1]
+                nb[0] += s[self.r0-1, a::2]
+            below = blk[i0+1::2, a::2]
+            nb[:len(below)] += below
+            if len(below) < m:
+                nb[-1] += s[self.r1 % N, a::2]
+            #position (2z+1)*s + nb + 3z+1 in the offset table
+            np.multiply(sites, 2*z+1, out=key)
+            key += nb
+            key += 3*z+1
+            np.take(table, key, out=p, mode='clip')
+            self.rng.random(out=u)
+            np.less(u, p, out=flip)
+            if count:
+                flips += np.count_nonzero(flip)
+            #for s = +1/-1 stored as int8, -s = s ^ -2 (much faster than a masked negative)
+            np.multiply(flip.view(np.int8), -2, out=key)
+            np.bitwise_xor(sites, key, out=sites)
+        return flips
+
+
+def _offset_table(table, z):
+    '''Acceptance table[(s+1)//2, nb+z] stored at positions (2z+1)*s + nb + 3z+1 (>= 0)'''
+    K = 2*z+1
+    nb = np.arange(-z, z+1)
+    out = np.zeros(2*K + 2*z + 1)
+    out[nb + z] = table[0]
+    out[nb + 2*K + z] = table[1]
+    return out
+
+
+def _worker(w, shm_name, N, rows, model, seed, ctrl, go, phase, done, errors, timeout,
+            accepted):
+    '''Main loop of a worker process: wait for a command and run sweeps'''
+    shm = shared_memory.SharedMemory(name=shm_name)
+    spins = np.ndarray((N, N), dtype=np.int8, buffer=shm.buf)
+    strips = [_Strip(spins, r0, r1, make_rng(seed, (1, b))) for b, r0, r1 in rows]
+    try:
+        while True:
+            go.acquire()
+            nsweeps, beta, stop, count = int(ctrl[0]), ctrl[1], ctrl[2], bool(ctrl[3])
+            if stop:
+                break
+            table = _offset_table(model.acceptance_table(beta, 4), 4)
+            flips = 0
+            for i in range(nsweeps):
+                for colour in (0, 1):
+                    for strip in strips:
+                        flips += strip.update(colour, table, 4, count)
+                    phase.wait(timeout)
+            accepted[w] = flips
+            done.release()
+    except threading.BrokenBarrierError:
+        #aborted by the parent or by another worker, or a timeout at a barrier
+        errors.put('worker %d: barrier broken (another worker failed or timed out)' % w)
+    except BaseException:
+        errors.put('worker %d:\n%s' % (w, traceback.format_exc()))
+        phase.abort()
+    finally:
+        del spins, strips
+        shm.close()
+
+
+def _release(shm, procs, barriers):
+    '''Stop the workers and free the shared memory (also run by the finalizer)'''
+    for b in barriers:
+        b.abort()
+    for p in procs:
+        p.join(1.0)
+        if p.is_alive():
+            p.terminate()
+            p.join()
+    del procs[:]
+    try:
+        shm.close()
+    except BufferError:
+        pass                                # arrays still export the buffer
+    try:
+        shm.unlink()
+    except FileNotFoundError:
+        pass
+
+
+class SharedLatticeEngine:
+    '''Checkerboard Metropolis on a large periodic N x N square lattice
+
+    model    : model with an acceptance_table (IsingModel, TwoStateModel)
+    nworkers : number of worker processes (default: number of cores)
+    nblocks  : number of strips of rows (default: strips of at least 8
+               rows, at most 64 strips); fixes the random streams, so it
+               must be kept the same to reproduce a run
+    config   : initial configuration (random from seed if not given)
+    timeout  : seconds a worker waits at the barrier for the others (one
+               half sweep) before giving up
+
+    Use as a context manager, or call close() to stop the workers and
+    release the shared memory. With profiling on, run() is timed as the
+    phase 'shared' and the workers count the accepted flips.
+    '''
+
+    def __init__(self, N, model, beta, nworkers=None, nblocks=None, seed=None,
+                 config=None, context=None, timeout=300.0):
+        if N % 2:
+            raise ValueError('the checkerboard decomposition needs an even N, got %r' % (N,))
+        nworkers = nworkers or mp.cpu_count()
+        nblocks = nblocks or max(min(N//8, 64), nworkers)
+        if not nworkers <= nblocks <= N:
+            raise ValueError('need nworkers <= nblocks <= N')
+        self.N, self.model = N, model
+        self._torus = _Torus(N)
+        self.seed = new_seed() if seed is None else seed
+        self.nworkers, self.nblocks = nworkers, nblocks
+        self.timeout = timeout
+        ctx = mp.get_context(context)
+
+        self._shm = shared_memory.SharedMemory(create=True, size=N*N)
+        self._procs = []
+        self._ctrl = ctx.RawArray('d', 4)          # nsweeps, beta, stop, count flips
+        self._accepted = ctx.RawArray('q', nworkers)
+        self._ctrl[1] = beta
+        self._go = ctx.Semaphore(0)
+        self._done = ctx.Semaphore(0)
+        self._errors = ctx.SimpleQueue()
+        phase = ctx.Barrier(nworkers)
+        self._finalizer = weakref.finalize(self, _release, self._shm, self._procs,
+                                           (phase,))
+        self.config = np.ndarray((N, N), dtype=np.int8, buffer=self._shm.buf)
+        if config is None:
+            config = 2*make_rng(self.seed, (0,)).integers(2, size=(N, N), dtype=np.int8)-1
+        self.config[:] = config
+
+        bounds = _strips(N, nblocks)
+        for w in range(nworkers):
+            own = range((w*nblocks)//nworkers, ((w+1)*nblocks)//nworkers)
+            rows = [(b, bounds[b], bounds[b+1]) for b in own]
+            p = ctx.Process(target=_worker, daemon=True,
+                            args=(w, self._shm.name, N, rows, model, self.seed, self._ctrl,
+                                  self._go, phase, self._done, self._errors, timeout,
+                                  self._accepted))
+            p.start()
+            self._procs.append(p)
+
+    def __repr__(self):
+        return 'SharedLatticeEngine(N=%d, nworkers=%d, nblocks=%d)' % (self.N, self.nworkers,
+                                                                      self.nblocks)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @property
+    def beta(self):
+        return self._ctrl[1]
+
+    def set_beta(self, beta):
+        '''Change the temperature for the next sweeps'''
+        self._ctrl[1] = beta
+
+    def _fail(self, reason):
+        '''Stop everything and raise with the errors reported by the workers'''
+        errors = []
+        while not self._errors.empty():
+            errors.append(self._errors.get())
+        config = self.config.copy()
+        del self.config
+        self._finalizer()
+        self.config = config
+        raise RuntimeError('SharedLatticeEngine: %s\n%s' % (reason, '\n'.join(errors)))
+
+    def run(self, nsweeps):
+        '''Perform nsweeps sweeps with all the workers
+
+        Raises RuntimeError if a worker fails or dies; the engine is then
+        closed (self.config keeps a copy of the last configuration).
+        '''
+        if not self._procs:
+            raise RuntimeError('SharedLatticeEngine is closed')
+        if nsweeps <= 0:
+            return self.config
+        prof = profiling.active()
+        with prof.phase('shared'):
+            self._ctrl[0] = nsweeps
+            self._ctrl[3] = prof.enabled
+            for p in self._procs:
+                self._go.release()
+            finished = 0
+            while finished < self.nworkers:
+                if self._done.acquire(timeout=0.1):
+                    finished += 1
+                elif not self._errors.empty() or not all(p.is_alive() for p in self._procs):
+                    self._fail('a worker failed during the run')
+            if prof.enabled:
+                prof.count(attempted=self.N*self.N*nsweeps, accepted=sum(self._accepted))
+        return self.config
+
+    def energy(self):
+        '''Energy of the current configuration'''
+        return float(self.model.energy(self.config, self._torus))
+
+    def magnetization(self):
+        '''Magnetization of the current configuration'''
+        return int(np.sum(self.config, dtype=np.int64))
+
+    def close(self):
+        '''Stop the workers and release the shared memory'''
+        if self._procs:
+            self._ctrl[2] = 1
+            for p in self._procs:
+                self._go.release()
+            for p in self._procs:
+                p.join(self.timeout)
+            config = self.config.copy()
+            del self.config
+            self._finalizer()
+            self.config = config
@@ -0,0 +1,58 @@
+# -----------------------------------------------------------------
+# Plots of configurations and results
+# matplotlib is imported the first time a plot is requested, so that
+# importing the library (e.g. in worker processes) stays fast
+# -----------------------------------------------------------------
+
+
+def _pyplot():
+    import matplotlib.pyplot as plt
+    return plt
+
+
+#This function makes an image of the spin configurations
+def configPlot(config, i):
+    ''' Plots the configuration at MC iteration i'''
+    plt = _pyplot()
+    plt.pcolormesh(config, vmin=-1.0, vmax=1.0, cmap='RdBu_r')
+    plt.title('MC iteration=%d' % i)
+    plt.axis('tight')
+    plt.pause(0.1)
+
+
+#This function makes a plot of all data as a function of T
+def resultPlot(T, Energy, Magnetization, SpecificHeat, Susceptibility):
+    ''' Plots Energy, Magnetization, Specific heat and Susceptibility'''
+    plt = _pyplot()
+    plt.clf()
+    panels = [(Energy, "Energy ", "#A60628"),
+              (abs(Magnetization), "Magnetization ", "#348ABD"),
+              (SpecificHeat, "Specific Heat ", "#A60628"),
+              (Susceptibility, "Susceptibility", "#348ABD")]
+    for k, (y, label, color) in enumerate(panels):
+        plt.subplot(2, 2, k+1)
+        plt.plot(T, y, 'o', color=color)
+        plt.xlabel("Temperature (T)", fontsize=20)
+        plt.ylabel(label, fontsize=20)
+    plt.pause(0.1)
+
+
+#Plot evolution of Energy and Magnetization during a simulation
+def evolutionPlot(step, E, M, dE=None, dM=None):
+    ''' Plots Energy and Magnetization as a function of the MC step
+
+    dE, dM are optional error bars drawn as shaded bands.
+    '''
+    plt = _pyplot()
+    plt.subplot(2, 1, 1)
+    plt.plot(step, E, 'r+-')
+    if dE is not None:
+        plt.fill_between(step, E - dE, E + dE, color='r', alpha=0.3)
+    plt.ylabel('Energy')
+    plt.subplot(2, 1, 2)
+    plt.plot(step, M, 'b+-')
+    if dM is not None:
+        plt.fill_between(step, M - dM, M + dM, color='b', alpha=0.3)
+    plt.ylabel('Magnetization')
+    plt.xlabel('MC step')
+    plt.show()
@@ -0,0 +1,186 @@
+# -----------------------------------------------------------------
+# q-state Potts and clock models
+#
+# The state of a site is an integer 0..q-1 stored as uint8 and the
+# energy is a sum over nearest neighbour bonds of a pair energy e(a, b):
+#     Potts:  e(a, b) = -J*delta(a, b)
+#     clock:  e(a, b) = -J*cos(2*pi*(a - b)/q)
+# (the q=2 Potts model with J is the Ising model with J/2, up to a
+# constant).
+#
+# Metropolis (potts_move): every site of a sublattice proposes one of
+# the other q-1 states at random. With the Boltzmann weights of a bond
+# w(a, b) = exp(-beta*e(a, b)) the acceptance of a -> a' is
+#     min(1, prod_j w(a', s_j)/w(a, s_j))
+# so the model tabulates ratio[a, a', b] = w(a', b)/w(a, b) once per
+# (beta, q) and a sweep is table lookups and products over the z
+# neighbours, with no exponentials. These tables have q**3 entries, so
+# every model has its own cache holding the tables of up to TABLES
+# temperatures (a whole temperature scan, revisited without recomputing)
+# within TABLE_BYTES bytes, which is what bounds the large q tables.
+#
+# Clusters (cluster_move, Swendsen-Wang): bonds are activated with a
+# probability p(a, b) tabulated per beta, clusters are found with
+# domains.components and every cluster is updated as a whole: a new
+# random state (Potts) or a reflection a -> (r - a) mod q applied with
+# probability 1/2 (clock, Wolff embedding).
+# -----------------------------------------------------------------
+import numpy as np
+
+from . import profiling
+from .domains import components
+from .models import TableCache
+from .rng import as_rng
+
+#size of the table cache of every model (see the header)
+TABLES = 64
+TABLE_BYTES = 256*2**20
+
+
+class _PairModel:
+    '''Common code of the models with q states per site and a pair energy'''
+
+    def __init__(self, q, J):
+        if not 2 <= q <= 256:
+            raise ValueError('q must be between 2 and 256')
+        self.q = q
+        self.J = J
+        self._tables = TableCache(TABLES, TABLE_BYTES)
+
+    def __repr__(self):
+        return '%s(q=%r, J=%r)' % (type(self).__name__, self.q, self.J)
+
+    def pair_energy(self):
+        '''Table e[a, b] of the energy of a bond between states a and b'''
+        raise NotImplementedError
+
+    def random_state(self, shape, rng):
+        '''Random configuration of states 0..q-1'''
+        return rng.integers(self.q, size=shape, dtype=np.uint8)
+
+    def energy(self, config, lattice):
+        '''Energy of a configuration (or of a batch with leading dimensions)'''
+        config = np.asarray(config)
+        flat = config.reshape(config.shape[:config.ndim-len(lattice.shape)] + (lattice.nsites,))
+        i, j = lattice.bonds().T
+        return np.sum(self.pair_energy()[flat[..., i], flat[..., j]], axis=-1)
+
+    def ratio_table(self, beta):
+        '''Metropolis weight ratios w(a2, b)/w(a1, b) indexed by [a1, a2, b]'''
+        def make():
+            e = self.pair_energy()
+            return np.exp(-beta*(e[None, :, :] - e[:, None, :]))
+        return self._tables.get(self, ('ratio', float(beta)), make)
+
+
+class PottsModel(_PairModel):
+    '''q-state Potts model: E = -J*sum_<ij> delta(s_i, s_j), states 0..q-1'''
+
+    def __init__(self, q=3, J=1.0):
+        super().__init__(q, J)
+
+    def pair_energy(self):
+        return -self.J*np.eye(self.q)
+
+    def magnetization(self, config, axis=None):
+        '''Potts order parameter (q*rho_max - 1)/(q - 1) times the number of sites
+
+        rho_max is the fraction of sites in the most populated state.
+        '''
+        config = np.asarray(config)
+        n = config.size if axis is None else np.prod([config.shape[a] for a in np.atleast_1d(axis)])
+        counts = np.max([np.count_nonzero(config == k, axis=axis) for k in range(self.q)],
+                        axis=0)
+        return (self.q*counts - n)/(self.q - 1)
+
+    def cluster_update(self, flat, i, j, beta, rng):
+        '''Swendsen-Wang: bonds of equal states are active with p = 1 - exp(-beta*J)'''
+        if self.J <= 0:
+            raise ValueError('cluster updates need a ferromagnetic coupling J > 0')
+        same = flat[i] == flat[j]
+        active = same & (rng.random(len(i)) < -np.expm1(-beta*self.J))
+        root = components(len(flat), i[active], j[active])
+        flat[:] = rng.integers(self.q, size=len(flat), dtype=np.uint8)[root]
+
+
+class ClockModel(_PairModel):
+    '''q-state clock model: E = -J*sum_<ij> cos(theta_i - theta_j), theta = 2*pi*s/q'''
+
+    def __init__(self, q=6, J=1.0):
+        super().__init__(q, J)
+        self._cos = np.cos(2*np.pi*np.arange(q)/q)
+        self._sin = np.sin(2*np.pi*np.arange(q)/q)
+
+    def pair_energy(self):
+        d = np.arange(self.q)
+        return -self.J*self._cos[(d[:, None] - d[None, :]) % self.q]
+
+    def magnetization(self, config, axis=None):
+        '''Modulus of the sum of the unit vectors (cos theta, sin theta)'''
+        config = np.asarray(config)
+        return np.hypot(np.sum(self._cos[config], axis=axis), np.sum(self._sin[config], axis=axis))
+
+    def cluster_update(self, flat, i, j, beta, rng):
+        '''Swendsen-Wang with a random reflection a -> (r - a) mod q (Wolff embedding)'''
+        if self.J <= 0:
+            raise ValueError('cluster updates need a ferromagnetic coupling J > 0')
+        q = self.q
+        reflect = (int(rng.integers(q)) - np.arange(q)) % q
+        e = self.pair_energy()
+        #activation 1 - exp(min(0, -beta*(e(R a, b) - e(a, b))))
+        p = -np.expm1(np.minimum(0.0, -beta*(e[reflect, :] - e)))
+        active = rng.random(len(i)) < p[flat[i], flat[j]]
+        root = components(len(flat), i[active], j[active])
+        flip = rng.random(len(flat)) < 0.5
+        flat[:] = np.where(flip[root], reflect[flat], flat)
+
+
+#One Metropolis sweep updating the sublattices (colours) in turn
+def potts_move(config, lattice, model, beta, rng=None):
+    '''Vectorized Metropolis sweep of a Potts or clock model
+
+    Every site of a colour proposes one of the other q-1 states and all
+    of them are accepted or rejected at once with the model's ratio
+    table. Needs a lattice where all sites have the same number of
+    neighbours.
+    '''
+    if not lattice.regular:
+        raise ValueError('potts_move needs a lattice where all sites have the same number '
+                         'of neighbours')
+    rng = as_rng(rng)
+    prof = profiling.active()
+    q = model.q
+    ratio = model.ratio_table(beta)
+    flat = lattice.flat(config)
+    for sites in lattice.colours:
+        s = flat[sites]
+        with prof.phase('rng'):
+            shift = rng.integers(1, q, size=len(sites))
+            u = rng.random(len(sites))
+        new = ((s + shift) % q).astype(flat.dtype)
+        nbrs = flat[lattice.table[sites]]
+        p = np.prod(ratio[s[:, None], new[:, None], nbrs], axis=1)
+        accept = u < p
+        if prof.enabled:
+            prof.count(attempted=len(sites), accepted=np.count_nonzero(accept))
+        flat[sites[accept]] = new[accept]
+    return config
+
+
+#One Swendsen-Wang cluster update of the whole lattice
+def cluster_move(config, lattice, model, beta, rng=None):
+    '''Swendsen-Wang cluster update of a Potts or clock model (J > 0)
+
+    With profiling on, every site counts as an attempted move and the
+    sites whose state changed as accepted.
+    '''
+    rng = as_rng(rng)
+    prof = profiling.active()
+    flat = lattice.flat(config)
+    i, j = lattice.bonds().T
+    old = flat.copy() if prof.enabled else None
+    with prof.phase('clusters'):
+        model.cluster_update(flat, i, j, beta, rng)
+    if prof.enabled:
+        prof.count(attempted=len(flat), accepted=np.count_nonzero(flat != old))
+    return config
@@ -0,0 +1,268 @@
+# -----------------------------------------------------------------
+# Profiling hooks of the drivers and kernels
+#
+# The drivers and kernels ask for the active profiler once per call
+# and wrap their phases (equilibration, production sweeps,
+# measurements, random numbers, plots...) in
+#     with prof.phase('name'):
+# By default the active profiler is a NullProfiler, whose phase() is
+# one shared do-nothing context manager, so the hooks cost a few
+# hundred nanoseconds per sweep when profiling is off.
+#
+# With enable() a Profiler records, for every phase and temperature,
+# the number of calls, the wall time and the counters reported by the
+# kernels (attempted and accepted flips). Phases are nested: a phase
+# inherits the fields of the enclosing one (e.g. T of simulate), is
+# named by its path (e.g. simulate/production/measure) and its time is
+# also included in the enclosing phase. With memory=True the
+# peak of traced memory (tracemalloc) above the start of the phase and
+# the net number of allocated blocks are recorded too; this slows
+# down the run.
+#
+# The sweep kernels (kernels.py, potts.py, SpinState.sweep, the demon
+# sweep) time their random numbers as 'rng' (cluster_move times its
+# cluster update as 'clusters') and count their attempted and accepted
+# moves in the enclosing phase; the multi-sweep engines open their own
+# phase: 'kinetic' (kinetic.py), 'shared' (parallel.py, whose workers
+# count the accepted flips) and 'demon'.
+#
+# The totals are kept in memory and written to the log, one JSON
+# object per line, by flush() (the temperature_scan driver flushes
+# after every temperature). print_summary(read_log(path)) gives the time
+# per phase and the acceptance ratio per temperature.
+# -----------------------------------------------------------------
+import json
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+
+class _NullPhase:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_PHASE = _NullPhase()
+
+
+class NullProfiler:
+    '''Profiler that records nothing (the default)'''
+
+    enabled = False
+
+    def phase(self, name, **fields):
+        return _NULL_PHASE
+
+    def count(self, **counters):
+        pass
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class _Phase:
+    '''Timing of one entry into a phase of a Profiler'''
+
+    def __init__(self, prof, name, fields):
+        self.prof = prof
+        self.name = name
+        self.fields = fields
+        self.counters = {}
+
+    def __enter__(self):
+        prof = self.prof
+        self.path = self.name
+        if prof._stack:
+            parent = prof._stack[-1]
+            self.path = parent.path + '/' + self.name
+            self.fields = dict(parent.fields, **self.fields)
+        if prof.memory:
+            prof._update_peaks()
+            self.peak = self.current = tracemalloc.get_traced_memory()[0]
+            self.blocks = sys.getallocatedblocks()
+        prof._stack.append(self)
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        dt = time.perf_counter() - self.t0
+        prof = self.prof
+        prof._stack.pop()
+        key = (self.path, tuple(sorted(self.fields.items())))
+        total = prof._totals.get(key)
+        if total is None:
+            total = prof._totals[key] = dict(self.fields, phase=self.path, calls=0,
+                                             seconds=0.0)
+        total['calls'] += 1
+        total['seconds'] += dt
+        for c, v in self.counters.items():
+            total[c] = total.get(c, 0) + v
+        if prof.memory:
+            prof._update_peaks()
+            self.peak = max(self.peak, tracemalloc.get_traced_memory()[1])
+            total['peak_bytes'] = max(total.get('peak_bytes', 0), self.peak - self.current)
+            total['blocks'] = total.get('blocks', 0) + sys.getallocatedblocks() - self.blocks
+        return False
+
+
+class Profiler:
+    '''Wall time, counters and (optionally) memory per phase and temperature
+
+    path   : JSON lines log written by flush() (None: only kept in .log)
+    memory : also record traced memory peaks and allocated blocks
+    '''
+
+    enabled = True
+
+    def __init__(self, path=None, memory=False):
+        self.path = path
+        self.memory = memory
+        self.log = []
+        self._stack = []
+        self._totals = {}
+        if path is not None:
+            open(path, 'w').close()
+        if memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def phase(self, name, **fields):
+        '''Context manager timing a phase; fields (e.g. T) label its records'''
+        return _Phase(self, name, fields)
+
+    def count(self, **counters):
+        '''Add to the counters of the innermost open phase'''
+        if self._stack:
+            c = self._stack[-1].counters
+            for k, v in counters.items():
+                c[k] = c.get(k, 0) + int(v)
+
+    def total(self, counter, **fields):
+        '''Sum of a counter over the records (logged or not) with the given fields
+
+        The counts of the phases still open are included, so the total
+        is up to date also in the middle of a long phase.
+        '''
+        out = 0
+        for r in self.log + list(self._totals.values()):
+            if all(r.get(k) == v for k, v in fields.items()):
+                out += r.get(counter, 0)
+        for p in self._stack:
+            if all(p.fields.get(k) == v for k, v in fields.items()):
+                out += p.counters.get(counter, 0)
+        return out
+
+    def _update_peaks(self):
+        '''Pass the traced peak so far to the open phases and reset it'''
+        peak = tracemalloc.get_traced_memory()[1]
+        for p in self._stack:
+            p.peak = max(p.peak, peak)
+        tracemalloc.reset_peak()
+
+    def flush(self):
+        '''Move the totals recorded so far to the log'''
+        records = list(self._totals.values())
+        self._totals = {}
+        self.log.extend(records)
+        if self.path is not None and records:
+            with open(self.path, 'a') as f:
+                for r in records:
+                    f.write(json.dumps(r, default=float) + '\n')
+
+    def close(self):
+        self.flush()
+        if self.memory:
+            tracemalloc.stop()
+
+
+_active = NullProfiler()
+
+
+def active():
+    '''The active profiler (a NullProfiler when profiling is off)'''
+    return _active
+
+
+def enable(path=None, memory=False):
+    '''Start profiling the drivers and kernels; returns the Profiler'''
+    global _active
+    _active.close()
+    _active = Profiler(path, memory)
+    return _active
+
+
+def disable():
+    '''Stop profiling; flushes and returns the Profiler that was active'''
+    global _active
+    prof = _active
+    prof.close()
+    _active = NullProfiler()
+    return prof
+
+
+@contextmanager
+def profile(path=None, memory=False):
+    '''Profile the enclosed code: with profile('run.jsonl') as prof: ...'''
+    prof = enable(path, memory)
+    try:
+        yield prof
+    finally:
+        disable()
+
+
+def read_log(path):
+    '''Records of a profiling log'''
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def summarize(records):
+    '''Totals per phase and acceptance ratio per temperature of a list of records
+
+    Returns (phases, acceptance): phases maps the path of every phase to
+    a dict of calls, seconds and fraction of the time of the outermost
+    phases;
+    acceptance maps T to accepted/attempted flips.
+    '''
+    phases = {}
+    flips = {}
+    for r in records:
+        p = phases.setdefault(r['phase'], {'calls': 0, 'seconds': 0.0})
+        p['calls'] += r['calls']
+        p['seconds'] += r['seconds']
+        if 'peak_bytes' in r:
+            p['peak_bytes'] = max(p.get('peak_bytes', 0), r['peak_bytes'])
+            p['blocks'] = p.get('blocks', 0) + r['blocks']
+        if r.get('attempted'):
+            f = flips.setdefault(r.get('T'), [0, 0])
+            f[0] += r['accepted']
+            f[1] += r['attempted']
+    total = sum(p['seconds'] for path, p in phases.items() if '/' not in path)
+    for p in phases.values():
+        p['fraction'] = p['seconds']/total if total else 0.0
+    acceptance = {T: a/n for T, (a, n) in flips.items()}
+    return phases, acceptance
+
+
+def print_summary(records):
+    '''Print the table of phases and acceptance ratios of summarize()'''
+    phases, acceptance = summarize(records)
+    print('%-24s %10s %12s %7s' % ('phase', 'calls', 'seconds', '%'))
+    for path, p in sorted(phases.items()):
+        name = '  '*path.count('/') + path.rsplit('/', 1)[-1]
+        line = '%-24s %10d %12.4f %6.1f%%' % (name, p['calls'], p['seconds'],
+                                              100*p['fraction'])
+        if 'peak_bytes' in p:
+            line += '  peak %d B, %+d blocks' % (p['peak_bytes'], p['blocks'])
+        print(line)
+    if acceptance:
+        print('\n%-10s %10s' % ('T', 'acceptance'))
+        for T in sorted(acceptance, key=lambda t: (t is None, t)):
+            print('%-10s %10.4f' % ('-' if T is None else '%.4g' % T, acceptance[T]))
+
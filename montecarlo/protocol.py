@@ -0,0 +1,133 @@
+# -----------------------------------------------------------------
+# Temperature protocols: annealing, quenches and cycles
+#
+# A schedule is a function T(t) of the sweep number t = 0, 1, ... that
+# gives the temperature T > 0 of sweep t (np.inf is allowed, beta = 0).
+# The lattice is a state.SpinState, whose acceptance table is recomputed
+# in place only when beta changes, so slowly varying or piecewise constant
+# schedules cost nothing extra and the memory does not grow with the
+# number of temperatures visited.
+#
+# Observables (t, T, E, M per site) are streamed to a series file (see
+# series.py) in chunks of fixed size, and snapshots are appended to a
+# frames file, so a run of any length uses constant memory and the
+# files can be read while it is running (see read_series and
+# read_frames). A run does not write over or continue the files of an
+# earlier run with the same prefix: the random stream and the position
+# in the schedule of that run are not stored, so it could not be
+# resumed faithfully. To go on from a snapshot, start a new prefix with
+# config=read_frames(prefix, shape)[-1] and the schedule shifted by the
+# sweeps already done.
+#
+# A quench from T = infinity is a random initial configuration (the
+# default) followed by constant(T).
+# -----------------------------------------------------------------
+import os
+
+import numpy as np
+
+from .series import SeriesWriter, read_series as _read_series
+from .state import SpinState
+
+#columns of the .series file
+COLUMNS = ('t', 'T', 'E', 'M')
+
+
+def _check_T(*temperatures):
+    for T in temperatures:
+        if not T > 0:
+            raise ValueError('temperatures must be > 0 (np.inf for beta = 0), got %r' % (T,))
+
+
+def constant(T):
+    '''Constant temperature T'''
+    _check_T(T)
+    return lambda t: T
+
+
+def linear(T0, T1, nsweeps):
+    '''Linear ramp from T0 to T1 in nsweeps sweeps (then constant T1)
+
+    With nsweeps = 0 the temperature steps to T1 at once.
+    '''
+    _check_T(T0, T1)
+    if nsweeps < 0:
+        raise ValueError('the ramp needs nsweeps >= 0, got %r' % (nsweeps,))
+    if nsweeps == 0:
+        return constant(T1)
+    rate = (T1 - T0)/nsweeps
+    return lambda t: T0 + rate*min(t, nsweeps)
+
+
+def cycle(Tmin, Tmax, period):
+    '''Triangle wave between Tmax and Tmin (starting at Tmax) with the given period'''
+    _check_T(Tmin, Tmax)
+    if not period > 0:
+        raise ValueError('the cycle needs a period > 0, got %r' % (period,))
+    half = 0.5*period
+    def schedule(t):
+        x = (t % period)/half
+        return Tmax - (Tmax - Tmin)*(x if x <= 1.0 else 2.0 - x)
+    return schedule
+
+
+def run_protocol(model, lattice, schedule, nsweeps, prefix, every=1, snapshot_every=0,
+                 config=None, rng=None, chunk=4096, overwrite=False):
+    '''Evolve under the temperature schedule T(t) for nsweeps sweeps
+
+    Every `every` sweeps t, T(t), E and M per site are recorded and
+    written in chunks of `chunk` records to prefix + '.series'; every
+    `snapshot_every` sweeps (0: never) the configuration is appended to
+    prefix + '.frames'. Returns the final configuration.
+
+    Raises FileExistsError if files of an earlier run with this prefix
+    exist (overwrite=True replaces them), and ValueError if every or
+    snapshot_every are not valid or the schedule gives a temperature
+    that is not > 0.
+    '''
+    if not (isinstance(every, (int, np.integer)) and every >= 1):
+        raise ValueError('every must be an integer >= 1, got %r' % (every,))
+    if not (isinstance(snapshot_every, (int, np.integer)) and snapshot_every >= 0):
+        raise ValueError('snapshot_every must be an integer >= 0, got %r' % (snapshot_every,))
+    existing = [p for p in (prefix + '.series', prefix + '.frames') if os.path.exists(p)]
+    if existing and not overwrite:
+        raise FileExistsError('%s exists; use a new prefix or overwrite=True'
+                              % ' and '.join(existing))
+    for p in existing:
+        os.remove(p)
+    state = SpinState(lattice, model, config=config, rng=rng)
+    n = lattice.nsites
+    metadata = {'model': repr(model), 'lattice': repr(lattice), 'every': every}
+    frames = open(prefix + '.frames', 'wb') if snapshot_every else None
+    try:
+        with SeriesWriter(prefix + '.series', COLUMNS, metadata, chunk=chunk) as series:
+            for t in range(1, nsweeps+1):
+                T = schedule(t-1)
+                if not T > 0:
+                    raise ValueError('the schedule gave T=%r at sweep %d, temperatures '
+                                     'must be > 0' % (T, t-1))
+                state.sweep(1.0/T)
+                if t % every == 0:
+                    series.append(t, T, state.energy()/n, state.magnetization()/n)
+                if frames is not None and t % snapshot_every == 0:
+                    state.config.tofile(frames)
+                    frames.flush()
+    finally:
+        if frames is not None:
+            frames.close()
+    return state.config
+
+
+def read_series(prefix):
+    '''Records written so far by run_protocol, as a dict of arrays t, T, E, M'''
+    return _read_series(prefix + '.series')[0]
+
+
+def read_frames(prefix, shape):
+    '''Snapshots written so far by run_protocol, memory-mapped (K, *shape)'''
+    size = int(np.prod(shape))
+    nframes = os.path.getsize(prefix + '.frames')//size
+    if nframes == 0:
+        return np.zeros((0,) + tuple(shape), dtype=np.int8)
+    return np.memmap(prefix + '.frames', dtype=np.int8, mode='r',
+                     shape=(nframes,) + tuple(shape))
@@ -0,0 +1,105 @@
+# -----------------------------------------------------------------
+# Independent replicas at one temperature
+#
+# K copies of the system are stored as one (K, N, N) int8 array and
+# updated together: each sublattice of all the replicas is updated with
+# a single set of numpy operations (the lattice sums neighbours over the
+# leading replica dimension). Replica r draws its random numbers from
+# its own stream (seed, key + (r,)), so a replica evolves in the same
+# way whatever K is, and E(t), M(t) of every replica are recorded at
+# every sweep. The spread between replicas gives the error bars of
+# ensemble averaged relaxation curves (e.g. E(t) after a quench) from
+# a single run.
+# -----------------------------------------------------------------
+import numpy as np
+
+from .rng import new_seed, streams
+
+
+class ReplicaEnsemble:
+    '''K independent replicas of a lattice updated with a batched Metropolis sweep
+
+    config : initial configuration given to all the replicas (e.g. a
+             fully magnetized state); by default every replica starts
+             from its own random configuration
+    The sweep is the dynamics of kernels.checkerboard_move applied to
+    every replica.
+    '''
+
+    def __init__(self, lattice, model, K, seed=None, config=None, key=()):
+        self.lattice = lattice
+        self.model = model
+        self.K = K
+        self.seed = new_seed() if seed is None else seed
+        self.rngs = streams(self.seed, K, key)
+        if config is None:
+            self.configs = np.stack([model.random_state(lattice.shape, rng) for rng in self.rngs])
+        else:
+            self.configs = np.repeat(np.asarray(config, dtype=np.int8)[None], K, axis=0)
+        self.flat = self.configs.reshape(K, lattice.nsites)
+        self._u = [np.empty((K, len(sites))) for sites in lattice.colours]
+        self._axes = tuple(range(1, self.configs.ndim))
+
+    def sweep(self, beta):
+        '''One Metropolis sweep of every replica'''
+        lattice, flat = self.lattice, self.flat
+        z = lattice.z
+        table = self.model.acceptance_table(beta, z)
+        for sites, u in zip(lattice.colours, self._u):
+            for rng, row in zip(self.rngs, u):
+                rng.random(out=row)
+            nb = lattice.neighbour_sum(flat, sites)
+            s = flat[:, sites]
+            flip = u < table[(s+1)//2, nb+z]
+            flat[:, sites] = np.where(flip, -s, s)
+
+    def energy(self):
+        '''Energy of every replica (array of K)'''
+        return self.model.energy(self.configs, self.lattice)
+
+    def magnetization(self):
+        '''Magnetization of every replica (array of K)'''
+        return self.model.magnetization(self.configs, axis=self._axes)
+
+    def run(self, temp, msrmnt):
+        '''msrmnt sweeps at temperature temp
+
+        Returns step and the arrays E, M (msrmnt+1, K) with the energy and
+        magnetization per site of every replica after every sweep
+        (including the initial state).
+        '''
+        n = self.lattice.nsites
+        E = np.empty((msrmnt+1, self.K))
+        M = np.empty((msrmnt+1, self.K))
+        E[0] = self.energy()/n
+        M[0] = self.magnetization()/n
+        for t in range(1, msrmnt+1):
+            self.sweep(1.0/temp)
+            E[t] = self.energy()/n
+            M[t] = self.magnetization()/n
+        return np.arange(msrmnt+1), E, M
+
+
+def ensemble_average(x):
+    '''Mean, replica-to-replica variance and error of the mean of x (..., K)'''
+    x = np.asarray(x)
+    K = x.shape[-1]
+    mean = x.mean(axis=-1)
+    var = x.var(axis=-1, ddof=1) if K > 1 else np.zeros_like(mean)
+    return mean, var, np.sqrt(var/K)
+
+
+def replica_snapshots(model, lattice, temp, msrmnt, K, seed=None, config=None, plot=False):
+    '''Ensemble averaged E(t), M(t) of K replicas (as ising_snapshots.py, K times at once)
+
+    Returns step and the (mean, variance, error) tuples of E and M per
+    site at every sweep. With plot=True the mean curves are drawn with
+    their error bars.
+    '''
+    step, E, M = ReplicaEnsemble(lattice, model, K, seed=seed, config=config).run(temp, msrmnt)
+    Eavg = ensemble_average(E)
+    Mavg = ensemble_average(M)
+    if plot:
+        from .plotting import evolutionPlot
+        evolutionPlot(step, Eavg[0], Mavg[0], dE=Eavg[2], dM=Mavg[2])
+    return step, Eavg, Mavg
@@ -0,0 +1,37 @@
+# -----------------------------------------------------------------
+# Random numbers: independent, reproducible streams
+#
+# Every stream is a counter-based Philox generator whose seed sequence
+# is identified by (seed, key). The key names the piece of work that
+# consumes the stream (a temperature index, a replica, a lattice
+# block...), so the numbers used by a piece of work do not depend on
+# which worker process runs it or on how many workers there are.
+# -----------------------------------------------------------------
+import numpy as np
+
+
+def new_seed():
+    '''Fresh entropy from the OS, to be stored so a run can be repeated'''
+    return np.random.SeedSequence().entropy
+
+
+def make_rng(seed=None, key=()):
+    '''Philox generator for the stream `key` of `seed`
+
+    key is a tuple of non-negative integers. The same (seed, key) always
+    gives the same stream; different keys give independent streams.
+    '''
+    ss = np.random.SeedSequence(seed, spawn_key=tuple(int(k) for k in key))
+    return np.random.Generator(np.random.Philox(ss))
+
+
+def streams(seed, n, key=()):
+    '''List of n independent generators with keys key+(0,) ... key+(n-1,)'''
+    return [make_rng(seed, tuple(key) + (i,)) for i in range(n)]
+
+
+def as_rng(rng):
+    '''Accept a Generator, a seed or None (fresh entropy) and return a Generator'''
+    if isinstance(rng, np.random.Generator):
+        return rng
+    return make_rng(rng)
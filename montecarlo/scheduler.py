@@ -0,0 +1,411 @@
+# -----------------------------------------------------------------
+# Task scheduler for sweeps over (model, N, T, seed)
+#
+# A coordinator holds the list of tasks and hands them, one at a time,
+# to worker processes that connect to it over a socket
+# (multiprocessing.connection, authenticated with a shared key). Workers
+# can run on the same machine or on other nodes:
+#
+#     python -m montecarlo.scheduler coordinator --sizes 16 32 \
+#         --temperatures 2.0 2.27 2.5 --seeds 1 2 --store results.jsonl
+#     python -m montecarlo.scheduler worker HOST:PORT
+#
+# with the key in the MONTECARLO_AUTHKEY environment variable (the
+# coordinator makes one up and prints it if it is not set).
+#
+#  - longest job first: tasks are served by decreasing estimated cost
+#    (large N near the critical temperature first)
+#  - retries: the task of a worker that fails or disconnects goes back
+#    to the queue, up to max_retries times
+#  - speculative duplication: when the queue is empty, idle workers
+#    also run a copy of tasks that have been running for more than
+#    duplicate_after seconds (stragglers on slow or overloaded nodes).
+#    The running task is not taken away from its worker: the first
+#    result wins and the other copy is discarded, and both are
+#    identical because the random stream only depends on the task. An
+#    attempt that fails while another copy of the task is still running
+#    is ignored; only when no copy is left does the failure count
+#    towards max_retries
+#  - results are appended to a JSON lines store, and tasks already in
+#    the store are skipped, so an interrupted sweep can be resumed
+#
+# run_local() starts the coordinator and workers as subprocesses on
+# localhost, for tests and single-machine runs. It respawns workers that
+# die, gives up (RuntimeError) when too many have died, and raises
+# TaskFailures if some tasks failed more than max_retries times.
+# -----------------------------------------------------------------
+import heapq
+import json
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+from collections import namedtuple
+from multiprocessing.connection import Client, Listener
+
+import numpy as np
+
+Tc = 2.0/np.log(1.0 + np.sqrt(2.0))      # critical temperature of the 2D Ising model
+
+Task = namedtuple('Task', 'model N T seed eqSteps mcSteps kernel', defaults=('checkerboard',))
+Task.__doc__ = '''One simulation: model ('ising' or 'twostate') on an N x N lattice at T'''
+
+
+def sweep_tasks(models, sizes, temperatures, seeds, eqSteps, mcSteps, kernel='checkerboard'):
+    '''All combinations of models, lattice sizes, temperatures and seeds'''
+    return [Task(m, int(N), float(T), int(s), eqSteps, mcSteps, kernel)
+            for m in models for N in sizes for T in temperatures for s in seeds]
+
+
+def task_cost(task):
+    '''Estimated relative cost of a task, used for longest-job-first ordering'''
+    cost = task.N*task.N*(task.eqSteps + task.mcSteps)
+    if task.model == 'ising':
+        #critical slowing down: runs near Tc take longer to decorrelate
+        cost *= 1.0 + 4.0*np.exp(-((task.T - Tc)/0.3)**2)
+    return cost
+
+
+def task_key(task):
+    '''Identity of a task in the result store'''
+    return json.dumps([task.model, task.N, task.T, task.seed, task.eqSteps, task.mcSteps,
+                       task.kernel])
+
+
+def run_task(task):
+    '''Run one task and return its results (per site, as driver.simulate)'''
+    from .driver import simulate
+    from .kernels import mcmove, checkerboard_move
+    from .lattice import SquareLattice
+    from .models import IsingModel, TwoStateModel
+    from .rng import make_rng
+
+    model = {'ising': IsingModel, 'twostate': TwoStateModel}[task.model]()
+    kernel = {'metropolis': mcmove, 'checkerboard': checkerboard_move}[task.kernel]
+    rng = make_rng(task.seed, (task.N, int(round(task.T*1e6))))
+    E, M, C, X = simulate(model, SquareLattice(task.N), task.T, task.eqSteps, task.mcSteps,
+                          kernel=kernel, rng=rng)
+    return {'Energy': float(E), 'Magnetization': float(M),
+            'SpecificHeat': float(C), 'Susceptibility': float(X)}
+
+
+class ResultStore:
+    '''Results appended as one JSON record per line'''
+
+    def __init__(self, path):
+        self.path = path
+
+    def load(self):
+        '''Records stored so far, by task key'''
+        records = {}
+        if self.path and os.path.exists(self.path):
+            with open(self.path) as f:
+                for line in f:
+                    if line.strip():
+                        rec = json.loads(line)
+                        records[task_key(Task(**rec['task']))] = rec
+        return records
+
+    def append(self, record):
+        if self.path:
+            with open(self.path, 'a') as f:
+                f.write(json.dumps(record) + '\n')
+
+
+class Coordinator:
+    '''Serve tasks to workers and collect their results
+
+    tasks       : list of Task
+    address     : (host, port) to listen on; port 0 picks a free port
+    authkey     : bytes shared with the workers
+    store       : path of the JSON lines result store (optional)
+    max_retries : times a task is re-queued after a failure
+    duplicate_after : seconds after which an idle worker runs a
+                  speculative copy of a running task (None: never)
+    '''
+
+    def __init__(self, tasks, address=('localhost', 0), authkey=None, store=None,
+                 max_retries=2, duplicate_after=30.0):
+        self.authkey = authkey or os.urandom(16)
+        self.store = ResultStore(store)
+        self.max_retries = max_retries
+        self.duplicate_after = duplicate_after
+        self.tasks = list(tasks)
+        self.results = self.store.load()
+        self.failed = {}
+        self._lock = threading.Lock()
+        self._finished = threading.Event()
+        self._running = {}                  # task index -> start time of the last attempt
+        self._live = {}                     # task index -> attempts still running
+        self._retries = [0]*len(self.tasks)
+        self._queue = []
+        for i, task in enumerate(self.tasks):
+            if task_key(task) not in self.results:
+                heapq.heappush(self._queue, (-task_cost(task), i))
+        self._pending = {i for _, i in self._queue}
+        if not self._pending:
+            self._finished.set()
+        self._listener = Listener(address, authkey=self.authkey)
+        self.address = self._listener.address
+
+    def _next(self):
+        '''Index of the next task for an idle worker, 'wait' or None (all done)'''
+        with self._lock:
+            while self._queue:
+                _, i = heapq.heappop(self._queue)
+                if i in self._pending and i not in self._running:
+                    self._running[i] = time.time()
+                    self._live[i] = 1
+                    return i
+            if not self._pending:
+                return None
+            if self.duplicate_after is not None:
+                now = time.time()
+                stale = [(t0, i) for i, t0 in self._running.items()
+                         if now - t0 > self.duplicate_after]
+                if stale:
+                    t0, i = min(stale)
+                    self._running[i] = now
+                    self._live[i] += 1
+                    return i
+            return 'wait'
+
+    def _done(self, i, worker, record=None, error=None):
+        with self._lock:
+            live = self._live.pop(i, 1) - 1
+            if live:
+                self._live[i] = live
+            if i not in self._pending:
+                return                      # a copy of this task finished first
+            if error is not None and live:
+                return                      # another copy is still running
+            self._running.pop(i, None)
+            if error is None:
+                self._pending.discard(i)
+                self.results[task_key(self.tasks[i])] = record
+                self.store.append(record)
+            else:
+                self._retries[i] += 1
+                if self._retries[i] > self.max_retries:
+                    self._pending.discard(i)
+                    self.failed[task_key(self.tasks[i])] = error
+                else:
+                    heapq.heappush(self._queue, (-task_cost(self.tasks[i]), i))
+            if not self._pending:
+                self._finished.set()
+
+    def _serve(self, conn):
+        '''Conversation with one worker'''
+        current = None
+        try:
+            worker = conn.recv()
+            while True:
+                i = self._next()
+                if i is None:
+                    conn.send(('stop',))
+                    break
+                if i == 'wait':
+                    conn.send(('wait', 0.2))
+                    if conn.recv()[0] != 'ready':
+                        break
+                    continue
+                current = i
+                conn.send(('task', self.tasks[i]._asdict()))
+                reply = conn.recv()
+                if reply[0] == 'result':
+                    record = {'task': self.tasks[i]._asdict(), 'result': reply[1],
+                              'worker': worker, 'elapsed': reply[2]}
+                    self._done(i, worker, record=record)
+                else:
+                    self._done(i, worker, error=reply[1])
+                current = None
+        except (EOFError, OSError):
+            pass
+        finally:
+            if current is not None:
+                self._done(current, None, error='worker %r disconnected' % (worker,))
+            conn.close()
+
+    def _accept(self):
+        while not self._finished.is_set():
+            try:
+                conn = self._listener.accept()
+            except OSError:
+                break
+            threading.Thread(target=self._serve, args=(conn,), daemon=True).start()
+
+    def serve(self, timeout=None, poll=None):
+        '''Serve workers until every task has a result (or failed)
+
+        Returns False if the timeout (seconds) expired first. poll, if
+        given, is called about twice a second while waiting (e.g. to
+        watch the worker processes); an exception raised by it stops
+        the coordinator and is passed on.
+        '''
+        threading.Thread(target=self._accept, daemon=True).start()
+        end = None if timeout is None else time.time() + timeout
+        try:
+            while True:
+                wait = 0.5 if end is None else max(0.0, min(0.5, end - time.time()))
+                if self._finished.wait(wait):
+                    return True
+                if end is not None and time.time() >= end:
+                    return False
+                if poll is not None:
+                    poll()
+        finally:
+            self._listener.close()
+
+    def ordered_results(self):
+        '''Results in the order of the tasks (None for failed tasks)'''
+        return [self.results.get(task_key(t)) for t in self.tasks]
+
+
+def worker(address, authkey, name=None):
+    '''Ask the coordinator at address for tasks and run them until told to stop'''
+    conn = Client(address, authkey=authkey)
+    conn.send(name or '%s:%d' % (socket.gethostname(), os.getpid()))
+    try:
+        while True:
+            msg = conn.recv()
+            if msg[0] == 'stop':
+                break
+            if msg[0] == 'wait':
+                time.sleep(msg[1])
+                conn.send(('ready',))
+                continue
+            t0 = time.time()
+            try:
+                result = run_task(Task(**msg[1]))
+            except Exception as e:
+                conn.send(('error', '%s: %s' % (type(e).__name__, e)))
+            else:
+                conn.send(('result', result, time.time() - t0))
+    except EOFError:
+        pass
+    finally:
+        conn.close()
+
+
+class TaskFailures(RuntimeError):
+    '''Some tasks failed more than max_retries times
+
+    failed  : dict task key -> last error message
+    results : result records in the order of the tasks (None if failed)
+    '''
+
+    def __init__(self, failed, results):
+        self.failed = failed
+        self.results = results
+        super().__init__('%d task(s) failed:\n%s' % (len(failed), '\n'.join(
+            '%s: %s' % (key, error) for key, error in failed.items())))
+
+
+def run_local(tasks, nworkers=2, store=None, max_retries=2, duplicate_after=30.0,
+              timeout=None):
+    '''Run tasks with nworkers worker subprocesses on localhost
+
+    Returns the list of result records in the order of the tasks.
+    Workers that die are respawned, up to nworkers*(max_retries+1)
+    times in all; beyond that, or when the timeout (seconds) expires,
+    RuntimeError is raised. If tasks failed, TaskFailures is raised with
+    the errors and the results of the other tasks.
+    '''
+    coord = Coordinator(tasks, ('localhost', 0), store=store, max_retries=max_retries,
+                        duplicate_after=duplicate_after)
+    env = dict(os.environ, MONTECARLO_AUTHKEY=coord.authkey.hex())
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, [root, env.get('PYTHONPATH')]))
+    host, port = coord.address
+    command = [sys.executable, '-m', 'montecarlo.scheduler', 'worker', '%s:%d' % (host, port)]
+    procs = [subprocess.Popen(command, env=env) for w in range(nworkers)]
+    respawns = nworkers*(max_retries + 1)
+
+    def watch():
+        nonlocal respawns
+        for k, p in enumerate(procs):
+            if p.poll() is not None and not coord._finished.is_set():
+                if respawns == 0:
+                    raise RuntimeError('run_local: too many workers died (last exit status %d)'
+                                       % p.returncode)
+                respawns -= 1
+                procs[k] = subprocess.Popen(command, env=env)
+
+    try:
+        if not coord.serve(timeout, poll=watch):
+            raise RuntimeError('run_local: timed out after %g s' % timeout)
+    finally:
+        #after the last result, stragglers still running a duplicate are stopped
+        for p in procs:
+            try:
+                p.wait(5.0)
+            except subprocess.TimeoutExpired:
+                p.kill()
+                p.wait()
+    results = coord.ordered_results()
+    if coord.failed:
+        raise TaskFailures(coord.failed, results)
+    return results
+
+
+def _coordinator(args):
+    key = os.environ.get('MONTECARLO_AUTHKEY')
+    if key is None:
+        key = os.urandom(16).hex()
+        print('export MONTECARLO_AUTHKEY=%s' % key)
+    tasks = sweep_tasks(args.models, args.sizes, args.temperatures, args.seeds,
+                        args.eq_steps, args.mc_steps, args.kernel)
+    coord = Coordinator(tasks, (args.host, args.port), authkey=bytes.fromhex(key),
+                        store=args.store, max_retries=args.max_retries,
+                        duplicate_after=args.duplicate_after)
+    host, port = coord.address
+    print('%d tasks, %d to run; workers: python -m montecarlo.scheduler worker %s:%d'
+          % (len(tasks), len(coord._pending), socket.gethostname() if host == '0.0.0.0'
+             else host, port), flush=True)
+    if not coord.serve(args.timeout):
+        print('timed out after %g s' % args.timeout)
+        return 1
+    for key, error in coord.failed.items():
+        print('FAILED %s: %s' % (key, error))
+    print('%d results, %d failed' % (len(coord.results), len(coord.failed)))
+    return 1 if coord.failed else 0
+
+
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description='Coordinator and workers of the montecarlo '
+                                                 'task scheduler')
+    sub = parser.add_subparsers(dest='mode', required=True)
+    p = sub.add_parser('coordinator', help='serve a sweep of tasks to workers')
+    p.add_argument('--models', nargs='+', default=['ising'], choices=['ising', 'twostate'])
+    p.add_argument('--sizes', type=int, nargs='+', required=True)
+    p.add_argument('--temperatures', type=float, nargs='+', required=True)
+    p.add_argument('--seeds', type=int, nargs='+', default=[1])
+    p.add_argument('--eq-steps', type=int, default=1000)
+    p.add_argument('--mc-steps', type=int, default=1000)
+    p.add_argument('--kernel', default='checkerboard', choices=['checkerboard', 'metropolis'])
+    p.add_argument('--host', default='0.0.0.0', help='address to listen on')
+    p.add_argument('--port', type=int, default=0, help='port (0: any free port)')
+    p.add_argument('--store', help='JSON lines file of the results (resumed if it exists)')
+    p.add_argument('--max-retries', type=int, default=2)
+    p.add_argument('--duplicate-after', type=float, default=30.0,
+                   help='seconds before a straggling task is run again by an idle worker')
+    p.add_argument('--timeout', type=float, help='give up after this many seconds')
+    p = sub.add_parser('worker', help='run tasks of a coordinator')
+    p.add_argument('address', help='HOST:PORT of the coordinator')
+    args = parser.parse_args(argv)
+    if args.mode == 'coordinator':
+        return _coordinator(args)
+    host, port = args.address.rsplit(':', 1)
+    authkey = bytes.fromhex(os.environ['MONTECARLO_AUTHKEY'])
+    try:
+        worker((host, int(port)), authkey)
+    except ConnectionRefusedError:
+        pass                                # all the tasks were already done
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
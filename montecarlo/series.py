@@ -0,0 +1,185 @@
+# -----------------------------------------------------------------
+# Time series files: chunked columnar storage of observables
+#
+# Appending E and M to Python lists costs about 28 bytes per value
+# (plus the list pointer) and everything is lost if the run stops. A
+# SeriesWriter instead keeps one preallocated numpy buffer per column;
+# when the buffers are full they are written as one chunk and reused,
+# so the memory does not grow with the length of the run.
+#
+# File layout (little endian):
+#     b'MCSERIES'  uint32 n  n bytes of JSON header
+#     chunk*
+# The header has the column names and dtypes and a free metadata dict
+# (model, lattice, temperature...). A chunk is a uint32 count k
+# followed by the k values of every column, one column after the
+# other. Each chunk is written with a single write, so a reader (also
+# while the run is going) takes every complete chunk and ignores a
+# truncated one at the end. iter_series reads one chunk at a time, so
+# long series can be processed in bounded memory. A run stopped in the
+# middle of a write leaves such a truncated chunk; appending to the file
+# first cuts it off at the end of the last complete chunk.
+# -----------------------------------------------------------------
+import json
+import os
+
+import numpy as np
+
+MAGIC = b'MCSERIES'
+VERSION = 1
+
+
+def _column(c):
+    '''(name, little endian dtype string) of a column given as name or (name, dtype)'''
+    if isinstance(c, str):
+        return (c, '<f8')
+    return (c[0], np.dtype(c[1]).newbyteorder('<').str)
+
+
+def _read_header(f):
+    if f.read(len(MAGIC)) != MAGIC:
+        raise ValueError('%s is not a series file' % f.name)
+    n = int(np.frombuffer(f.read(4), dtype='<u4')[0])
+    return json.loads(f.read(n).decode())
+
+
+def _rowsize(header):
+    return sum(np.dtype(dt).itemsize for name, dt in header['columns'])
+
+
+def _end_of_chunks(f, header):
+    '''Offset of the end of the last complete chunk (f is just after the header)'''
+    rowsize = _rowsize(header)
+    size = os.fstat(f.fileno()).st_size
+    end = f.tell()
+    while end + 4 <= size:
+        f.seek(end)
+        k = int(np.frombuffer(f.read(4), dtype='<u4')[0])
+        if end + 4 + k*rowsize > size:
+            break
+        end += 4 + k*rowsize
+    return end
+
+
+class SeriesWriter:
+    '''Write rows of observables to a chunked columnar file
+
+    columns  : column names, or (name, dtype) pairs (default float64)
+    metadata : dict stored in the header (must be JSON serializable)
+    chunk    : number of rows kept in memory before they are written
+    append   : continue an existing file with the same columns (a
+               truncated chunk at its end is discarded)
+    '''
+
+    def __init__(self, path, columns, metadata=None, chunk=4096, append=False):
+        self.path = path
+        self.columns = [_column(c) for c in columns]
+        self.chunk = chunk
+        self._buf = [np.empty(chunk, dtype=dt) for name, dt in self.columns]
+        self._fill = 0
+        self.rows = 0
+        if append and os.path.exists(path) and os.path.getsize(path) > 0:
+            with open(path, 'rb') as f:
+                header = _read_header(f)
+                end = _end_of_chunks(f, header)
+            if [tuple(c) for c in header['columns']] != self.columns:
+                raise ValueError('%s has columns %r' % (path, header['columns']))
+            self.metadata = header['metadata']
+            #drop a chunk cut short by an interrupted run before appending
+            self._f = open(path, 'r+b')
+            self._f.truncate(end)
+            self._f.seek(end)
+        else:
+            self.metadata = {} if metadata is None else dict(metadata)
+            header = json.dumps({'version': VERSION, 'columns': self.columns,
+                                 'metadata': self.metadata}).encode()
+            self._f = open(path, 'wb')
+            self._f.write(MAGIC + np.uint32(len(header)).astype('<u4').tobytes() + header)
+            self._f.flush()
+
+    def append(self, *values):
+        '''Add one row (one value per column)'''
+        k = self._fill
+        for buf, v in zip(self._buf, values):
+            buf[k] = v
+        self._fill = k + 1
+        self.rows += 1
+        if self._fill == self.chunk:
+            self.flush()
+
+    def extend(self, *columns):
+        '''Add many rows, given as one array per column'''
+        columns = [np.asarray(c) for c in columns]
+        n = len(columns[0])
+        start = 0
+        while start < n:
+            k = min(self.chunk - self._fill, n - start)
+            for buf, c in zip(self._buf, columns):
+                buf[self._fill:self._fill+k] = c[start:start+k]
+            self._fill += k
+            self.rows += k
+            start += k
+            if self._fill == self.chunk:
+                self.flush()
+
+    def flush(self):
+        '''Write the rows in the buffers as one chunk'''
+        if self._fill == 0:
+            return
+        k = self._fill
+        data = [np.uint32(k).astype('<u4').tobytes()] + [buf[:k].tobytes() for buf in self._buf]
+        self._f.write(b''.join(data))
+        self._f.flush()
+        self._fill = 0
+
+    def close(self):
+        if not self._f.closed:
+            self.flush()
+            self._f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _chunks(f, header):
+    '''Complete chunks (dicts of arrays) of an open series file after its header'''
+    columns = [(name, np.dtype(dt)) for name, dt in header['columns']]
+    rowsize = _rowsize(header)
+    while True:
+        count = f.read(4)
+        if len(count) < 4:
+            return
+        k = int(np.frombuffer(count, dtype='<u4')[0])
+        raw = f.read(k*rowsize)
+        if len(raw) < k*rowsize:
+            return
+        chunk, pos = {}, 0
+        for name, dt in columns:
+            chunk[name] = np.frombuffer(raw, dtype=dt, count=k, offset=pos)
+            pos += k*dt.itemsize
+        yield chunk
+
+
+def iter_series(path):
+    '''Iterate over the complete chunks of a series file, as dicts of arrays'''
+    with open(path, 'rb') as f:
+        header = _read_header(f)
+        yield from _chunks(f, header)
+
+
+def read_series(path):
+    '''Columns (dict of arrays) and metadata of a series file
+
+    Only complete chunks are read, so the file can be read while it is
+    still being written.
+    '''
+    with open(path, 'rb') as f:
+        header = _read_header(f)
+        parts = list(_chunks(f, header))
+    data = {name: (np.concatenate([c[name] for c in parts]) if parts
+                   else np.zeros(0, dtype=dt))
+            for name, dt in header['columns']}
+    return data, header['metadata']
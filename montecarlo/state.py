@@ -0,0 +1,124 @@
+# -----------------------------------------------------------------
+# Compact spin configuration with preallocated work arrays
+#
+# The configuration is stored as int8 (one byte per spin, 8 times less
+# than the default integers) and every array used during a sweep
+# (gathered neighbours, neighbour sums, table indices, random numbers,
+# probabilities and flip masks) is allocated once per sublattice when
+# the state is created. A sweep then only calls numpy functions with
+# out= arguments, so the steady state of a simulation does not allocate
+# memory.
+#
+# The neighbour table of every sublattice is kept as int32 (16 bytes
+# per spin on the square lattice instead of 32 with intp). np.take
+# would make a temporary intp copy of such an index array at every
+# call, so the table is gathered in blocks of CHUNK rows, converted
+# into one small preallocated intp buffer.
+# -----------------------------------------------------------------
+import numpy as np
+
+from . import profiling
+from .rng import as_rng
+
+CHUNK = 8192                # rows of the neighbour table gathered at once
+
+
+class _Colour:
+    '''Sites of one sublattice, their neighbour table and scratch buffers'''
+
+    def __init__(self, sites, table):
+        k, z = len(sites), table.shape[1]
+        self.sites = sites
+        self.table = table[sites].astype(np.int32)
+        self.gathered = np.empty((k, z), dtype=np.int8)
+        buf = np.empty((min(k, CHUNK), z), dtype=np.intp)
+        #views (table rows, gathered rows, index buffer) of every block
+        self.blocks = [(self.table[r:r+CHUNK], self.gathered[r:r+CHUNK], buf[:min(CHUNK, k-r)])
+                       for r in range(0, k, CHUNK)]
+        self.s = np.empty(k, dtype=np.int8)
+        self.nb = np.empty(k, dtype=np.int8)
+        self.idx = np.empty(k, dtype=np.intp)
+        self.p = np.empty(k)
+        self.u = np.empty(k)
+        self.flip = np.empty(k, dtype=bool)
+
+
+class SpinState:
+    '''Spin configuration (int8) of a lattice with an allocation-free Metropolis sweep
+
+    lattice : lattice where all sites have the same number of neighbours
+    model   : model with an acceptance table (IsingModel, TwoStateModel)
+    config  : initial configuration (converted to int8, used in place if
+              it already is), random if not given
+    The sweep is the same dynamics as kernels.checkerboard_move.
+    '''
+
+    def __init__(self, lattice, model, config=None, rng=None):
+        if not lattice.regular:
+            raise ValueError('SpinState needs a lattice where all sites have the same number '
+                             'of neighbours')
+        if lattice.nsites >= 2**31:
+            raise ValueError('SpinState stores site indices as int32, the lattice is too large')
+        self.lattice = lattice
+        self.model = model
+        self.rng = as_rng(rng)
+        if config is None:
+            config = 2*self.rng.integers(2, size=lattice.shape, dtype=np.int8)-1
+        self.config = np.ascontiguousarray(config, dtype=np.int8)
+        self.flat = lattice.flat(self.config)
+        self._colours = [_Colour(sites, lattice.table) for sites in lattice.colours]
+        #flip costs and acceptance table with rows for s=-1 and s=+1 at 0
+        #and 2, flattened so that the index of a site is (s+1)*(2z+1)+nb+z
+        z = lattice.z
+        self._cost = np.zeros((3, 2*z+1))
+        self._cost[[0, 2]] = model.cost_table(z)
+        self._cost = self._cost.ravel()
+        self._acc = np.empty_like(self._cost)
+        self._beta = None
+
+    def _table(self, beta):
+        '''Acceptance table at beta, recomputed in place when beta changes'''
+        if beta != self._beta:
+            np.multiply(self._cost, -beta, out=self._acc)
+            np.minimum(self._acc, 0.0, out=self._acc)
+            np.exp(self._acc, out=self._acc)
+            self._beta = beta
+        return self._acc
+
+    def sweep(self, beta):
+        '''One Metropolis sweep, sublattice by sublattice, in place'''
+        flat, rng = self.flat, self.rng
+        prof = profiling.active()
+        z = self.lattice.z
+        table = self._table(beta)
+        #mode='clip' (indices are always valid): with the default mode take
+        #writes to a temporary copy of out
+        for c in self._colours:
+            np.take(flat, c.sites, out=c.s, mode='clip')
+            for nbrs, gathered, idx in c.blocks:
+                np.copyto(idx, nbrs)
+                np.take(flat, idx, out=gathered, mode='clip')
+            np.sum(c.gathered, axis=1, dtype=np.int8, out=c.nb)
+            np.multiply(c.s, 2*z+1, out=c.idx, dtype=np.intp)
+            c.idx += c.nb
+            c.idx += 3*z+1
+            np.take(table, c.idx, out=c.p, mode='clip')
+            with prof.phase('rng'):
+                rng.random(out=c.u)
+            np.less(c.u, c.p, out=c.flip)
+            if prof.enabled:
+                prof.count(attempted=len(c.sites), accepted=np.count_nonzero(c.flip))
+            np.negative(c.s, out=c.s, where=c.flip)
+            np.put(flat, c.sites, c.s, mode='clip')
+
+    def run(self, beta, nsweeps):
+        '''nsweeps sweeps at inverse temperature beta'''
+        for i in range(nsweeps):
+            self.sweep(beta)
+        return self.config
+
+    def energy(self):
+        return self.model.energy(self.config, self.lattice)
+
+    def magnetization(self):
+        return int(self.flat.sum())
@@ -0,0 +1,65 @@
+# -----------------------------------------------------------------
+# Time series statistics: autocorrelation and measurement interval
+#
+# Successive MC sweeps give correlated samples. With the normalized
+# autocorrelation rho(t) of a series, the integrated autocorrelation
+# time is
+#     tau_int = 1/2 + sum_{t=1}^{W} rho(t)
+# summed up to the first window W >= c*tau_int (Sokal's automatic
+# window, c ~ 5), and the error of a mean over n samples is
+#     sqrt(2*tau_int*var/n)
+# Measuring every k ~ tau_int sweeps keeps almost all the information
+# at a fraction of the cost of measuring every sweep; the averages of
+# the thinned series are still unbiased.
+# -----------------------------------------------------------------
+import math
+
+import numpy as np
+
+
+def autocorrelation(x):
+    '''Normalized autocorrelation rho(t), t = 0..len(x)-1, computed with FFTs'''
+    x = np.asarray(x, dtype=float)
+    n = len(x)
+    if n == 0:
+        raise ValueError('the autocorrelation of an empty series is not defined')
+    d = x - x.mean()
+    f = np.fft.rfft(d, n=2*n)
+    acf = np.fft.irfft(f.real**2 + f.imag**2)[:n]
+    if acf[0] <= 0:
+        return np.zeros(n)
+    #unbiased estimate at every lag
+    acf /= np.arange(n, 0, -1)
+    return acf/acf[0]
+
+
+def integrated_time(x, c=5.0):
+    '''Integrated autocorrelation time of a series (in units of its sampling interval)'''
+    rho = autocorrelation(x)
+    if len(rho) < 2:
+        return 0.5
+    tau = 0.5 + np.cumsum(rho[1:])
+    window = np.arange(1, len(rho))
+    ok = np.flatnonzero(window >= c*tau)
+    return float(tau[ok[0]] if len(ok) else tau[-1])
+
+
+def error_of_mean(x, tau=None):
+    '''Error of the mean of a correlated series'''
+    x = np.asarray(x, dtype=float)
+    if len(x) == 0:
+        raise ValueError('the error of the mean of an empty series is not defined')
+    if tau is None:
+        tau = integrated_time(x)
+    return math.sqrt(2.0*max(tau, 0.5)*x.var()/len(x))
+
+
+def measurement_interval(*series, nmax=None):
+    '''Number of sweeps between measurements from pilot series sampled every sweep
+
+    The interval is the largest integrated time of the series (at least
+    1); nmax caps it (e.g. so that a run still gets a minimum number of
+    measurements).
+    '''
+    k = max([1] + [int(integrated_time(x)) for x in series])
+    return k if nmax is None else max(1, min(k, nmax))
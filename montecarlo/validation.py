@@ -0,0 +1,389 @@
+# -----------------------------------------------------------------
+# Statistical validation of the update engines
+#
+# Every engine is run at a few temperatures and its averages of E,
+# |M| (or M) and C per site are compared with exact results:
+#  - Onsager's solution of the infinite square lattice (E and C from
+#    the complete elliptic integrals, computed with the arithmetic-
+#    geometric mean, and the spontaneous magnetization), on a lattice
+#    large enough for finite size corrections to be negligible at the
+#    temperatures used,
+#  - the exact 4x4 torus (exact.ExactTorus), where finite size effects
+#    are large but known exactly; its density of states g(B, M)
+#    restricted to M = 0 gives the fixed magnetization ensemble of the
+#    Kawasaki dynamics,
+#  - the closed forms of the ideal two state model,
+#  - the q=3 Potts and q=4 clock models on the 3x3 torus, by summing
+#    over all the configurations.
+# The error bar of each average comes from the data (jackknife over
+# blocks of sweeps, so correlations between sweeps are included) and a
+# check passes if |MC - exact| < nsigma*error + tolerance. Seeds are
+# fixed, so the suite is reproducible.
+#
+# The Creutz demon is microcanonical: its temperature T_d is read from
+# the mean demon energy, and its mean energy is compared with the exact
+# E(T_d) (the error bar includes that of T_d). The spins are first
+# equilibrated at T with the checkerboard kernel and the demons start
+# with their mean energy at T. The 4x4 torus is left out for the demon,
+# since 16 demons are not a heat bath for 16 spins.
+#
+#     python -m montecarlo.validation [--quick] [engines...]
+# prints a table and exits with status 1 if any check fails.
+# -----------------------------------------------------------------
+import functools
+import math
+import sys
+import time
+
+import numpy as np
+
+from .demon import DemonEngine
+from .exact import ExactTorus
+from .kernels import initialstate, mcmove, checkerboard_move, heatbath_move, calcEnergy, calcMag
+from .kinetic import ActiveInterfaceEngine, NFoldWayEngine, KawasakiEngine, fixed_magnetization
+from .lattice import SquareLattice
+from .models import IsingModel, TwoStateModel
+from .parallel import SharedLatticeEngine
+from .potts import PottsModel, ClockModel, potts_move, cluster_move
+from .rng import make_rng
+from .state import SpinState
+
+TC = 2.0/math.log(1.0 + math.sqrt(2.0))
+
+
+# -- exact results --------------------------------------------------
+
+def _ellipk_ellipe(k):
+    '''Complete elliptic integrals K(k), E(k) by the arithmetic-geometric mean'''
+    a, b = 1.0, math.sqrt(1.0 - k*k)
+    c2sum, power = 0.5*k*k, 0.5
+    while abs(a - b) > 1e-15*a:
+        c = 0.5*(a - b)
+        a, b = 0.5*(a + b), math.sqrt(a*b)
+        power *= 2.0
+        c2sum += power*c*c
+    K = math.pi/(2.0*a)
+    return K, K*(1.0 - c2sum)
+
+
+def onsager(T, J=1.0):
+    '''Energy, specific heat and (below Tc) spontaneous magnetization per site of the infinite lattice'''
+    b = J/T
+    t2 = math.tanh(2*b)**2
+    k = 2.0*math.sinh(2*b)/math.cosh(2*b)**2
+    K, E = _ellipk_ellipe(min(k, 1.0 - 1e-16))
+    coth = 1.0/math.tanh(2*b)
+    energy = -J*coth*(1.0 + (2.0/math.pi)*(2.0*t2 - 1.0)*K)
+    C = (4.0/math.pi)*(b*coth)**2*(K - E - (1.0 - t2)*(0.5*math.pi + (2.0*t2 - 1.0)*K))
+    out = {'E': energy, 'C': C}
+    if T < TC*J:
+        #above Tc <|M|> of a finite lattice is O(N^-1/2), not compared
+        out['absM'] = (1.0 - math.sinh(2*b)**-4)**0.125
+    return out
+
+
+def two_state(T, epsilon=1.0):
+    '''Energy, mean state and specific heat per site of the ideal two state model'''
+    x = epsilon/T
+    p = 1.0/(1.0 + math.exp(x))                 # occupation of the s=+1 state
+    return {'E': epsilon*p, 'M': 2.0*p - 1.0, 'C': x*x*p*(1.0 - p)}
+
+
+def _averages(E, A, weights, T, n):
+    '''Energy, |M| and specific heat per site from the energies E and |M| values A of states'''
+    x = -E/T
+    p = weights*np.exp(x - x.max())
+    p /= p.sum()
+    E1 = p @ E
+    return {'E': E1/n, 'absM': p @ A/n, 'C': (p @ (E*E) - E1*E1)/(n*T*T)}
+
+
+def fixed_magnetization_4x4(T, M=0, J=1.0):
+    '''Energy and specific heat per site of the 4x4 torus restricted to magnetization M'''
+    torus = _torus4()
+    g = torus.g[:, torus.mags == M][:, 0].astype(float)
+    out = _averages(-J*torus.bonds.astype(float), np.zeros(len(g)), g, T, torus.n)
+    del out['absM']
+    return out
+
+
+def brute_force(model, lattice, T):
+    '''Energy, |M| and specific heat per site by summing over all the q^n configurations'''
+    n = lattice.nsites
+    states = np.indices((model.q,)*n, dtype=np.uint8).reshape(n, -1).T
+    configs = states.reshape((-1,) + lattice.shape)
+    E = np.asarray(model.energy(configs, lattice), dtype=float)
+    A = np.abs(model.magnetization(configs, axis=tuple(range(1, configs.ndim))))
+    return _averages(E, np.asarray(A, dtype=float), np.ones(len(E)), T, n)
+
+
+@functools.lru_cache(maxsize=None)
+def _torus4():
+    return ExactTorus(4)
+
+
+# -- error bars -----------------------------------------------------
+
+def jackknife(estimator, *series, nblocks=20):
+    '''Estimate and jackknife error of estimator(*series) over nblocks blocks'''
+    n = len(series[0])//nblocks*nblocks
+    blocks = [np.asarray(x[:n]).reshape(nblocks, -1) for x in series]
+    full = estimator(*[x[:n] for x in series])
+    keep = ~np.eye(nblocks, dtype=bool)
+    partial = np.array([estimator(*[b[keep[j]].ravel() for b in blocks])
+                        for j in range(nblocks)])
+    err = math.sqrt((nblocks - 1)/nblocks*np.sum((partial - partial.mean())**2))
+    return full, err
+
+
+# -- engines --------------------------------------------------------
+# Every engine starts from config and returns the series of E and M
+# per site over nsweeps sweeps after neq equilibration sweeps, or None
+# if it cannot run the model. The engines of the fixed magnetization
+# ensemble (run.ensemble = 'fixed M') are only run on those checks; a
+# microcanonical engine is run on the canonical checks and also
+# returns the series of the mean demon energy and the function giving
+# T from its average.
+
+def _spins(model):
+    '''True for the models of +1/-1 spins with an acceptance table'''
+    return hasattr(model, 'acceptance_table')
+
+
+def _kernel(kernel):
+    def run(model, lattice, config, T, neq, nsweeps, rng):
+        if not _spins(model):
+            return None
+        return _series(kernel, model, lattice, config, T, neq, nsweeps, rng)
+    return run
+
+
+def _series(kernel, model, lattice, config, T, neq, nsweeps, rng):
+    '''E and M per site of every sweep of a kernel'''
+    n = lattice.nsites
+    E = np.empty(nsweeps)
+    M = np.empty(nsweeps)
+    for i in range(neq):
+        kernel(config, lattice, model, 1.0/T, rng)
+    for i in range(nsweeps):
+        kernel(config, lattice, model, 1.0/T, rng)
+        E[i] = calcEnergy(config, lattice, model)/n
+        M[i] = calcMag(config, model)/n
+    return E, M
+
+
+def _spin_state(model, lattice, config, T, neq, nsweeps, rng):
+    if not _spins(model):
+        return None
+    n = lattice.nsites
+    state = SpinState(lattice, model, config=config, rng=rng)
+    state.run(1.0/T, neq)
+    E = np.empty(nsweeps)
+    M = np.empty(nsweeps)
+    for i in range(nsweeps):
+        state.sweep(1.0/T)
+        E[i] = state.energy()/n
+        M[i] = state.magnetization()/n
+    return E, M
+
+
+def _kinetic(engine):
+    def run(model, lattice, config, T, neq, nsweeps, rng):
+        if not _spins(model):
+            return None
+        eng = engine(config, lattice, model, 1.0/T, rng)
+        eng.run(neq)
+        step, E, M = eng.run(nsweeps)
+        return np.array(E[1:]), np.array(M[1:])
+    return run
+
+
+#Exchange dynamics at fixed M decorrelates slowly (the integrated time
+#of E on the 4x4 torus at T=2 is about 60 sweeps), so its runs are this
+#many times longer: a jackknife block has to span many correlation
+#times for the error bar to hold.
+KAWASAKI_LENGTH = 50
+
+
+def _kawasaki(model, lattice, config, T, neq, nsweeps, rng):
+    if not _spins(model):
+        return None
+    config = fixed_magnetization(lattice, 0.0, rng)
+    return _kinetic(KawasakiEngine)(model, lattice, config, T, neq, KAWASAKI_LENGTH*nsweeps, rng)
+
+
+_kawasaki.ensemble = 'fixed M'
+
+
+def _demon(model, lattice, config, T, neq, nsweeps, rng):
+    if not _spins(model) or lattice.nsites < 64:
+        return None
+    for i in range(neq):
+        checkerboard_move(config, lattice, model, 1.0/T, rng)
+    engine = DemonEngine(config, lattice, model, rng=rng)
+    #demon energies 0, q, 2q... with their Boltzmann distribution at T
+    q = engine.quantum
+    engine.demons = q*(rng.geometric(-np.expm1(-q/T), size=lattice.nsites) - 1)
+    engine.run(neq)
+    step, E, M, D = engine.run(nsweeps)
+    return np.array(E), np.array(M), np.array(D), engine.temperature
+
+
+_demon.ensemble = 'microcanonical'
+
+
+def _shared(model, lattice, config, T, neq, nsweeps, rng):
+    if not _spins(model) or not isinstance(lattice, SquareLattice) or not lattice.periodic \
+            or lattice.N % 2:
+        return None
+    n = lattice.nsites
+    E = np.empty(nsweeps)
+    M = np.empty(nsweeps)
+    with SharedLatticeEngine(lattice.N, model, 1.0/T, nworkers=2, config=config,
+                             seed=int(rng.integers(2**63))) as engine:
+        engine.run(neq)
+        for i in range(nsweeps):
+            engine.run(1)
+            E[i] = engine.energy()/n
+            M[i] = engine.magnetization()/n
+    return E, M
+
+
+def _potts(kernel):
+    def run(model, lattice, config, T, neq, nsweeps, rng):
+        if isinstance(model, (PottsModel, ClockModel)):
+            return _series(kernel, model, lattice, config, T, neq, nsweeps, rng)
+        #Ising (h=0) as the q=2 Potts model with 2J; energies differ by J per bond
+        if not isinstance(model, IsingModel) or model.h != 0:
+            return None
+        potts = PottsModel(2, 2*model.J)
+        config = (config > 0).astype(np.uint8)
+        E, M = _series(kernel, potts, lattice, config, T, neq, nsweeps, rng)
+        return E + model.J*lattice.z/2, M
+    return run
+
+
+ENGINES = {
+    'mcmove': _kernel(mcmove),
+    'checkerboard': _kernel(checkerboard_move),
+    'heatbath': _kernel(heatbath_move),
+    'spinstate': _spin_state,
+    'active': _kinetic(ActiveInterfaceEngine),
+    'nfold': _kinetic(NFoldWayEngine),
+    'shared': _shared,
+    'potts': _potts(potts_move),
+    'cluster': _potts(cluster_move),
+    'kawasaki': _kawasaki,
+    'demon': _demon,
+}
+
+
+# -- checks ---------------------------------------------------------
+
+def _C(E, T, n):
+    return n*np.var(E)/T**2
+
+
+def _exact4(T):
+    r = _torus4().thermodynamics([T])
+    return {'E': r['E'][0], 'absM': r['absM'][0], 'C': r['C'][0]}
+
+
+def checks(quick=False):
+    '''List of (name, ensemble, model, lattice, T, exact) to be checked
+
+    exact is a function of the temperature returning the dict of exact
+    values; ensemble is 'canonical' or 'fixed M' (magnetization 0).
+    '''
+    L = 16 if quick else 32
+    out = []
+    for T in (1.8, 3.2):
+        out.append(('onsager L=%d' % L, 'canonical', IsingModel(), SquareLattice(L), T, onsager))
+    for T in (2.0, 2.6):
+        out.append(('exact 4x4', 'canonical', IsingModel(), SquareLattice(4), T, _exact4))
+        out.append(('4x4 M=0', 'fixed M', IsingModel(), SquareLattice(4), T,
+                    fixed_magnetization_4x4))
+    for T in (0.5, 2.0):
+        out.append(('two state', 'canonical', TwoStateModel(), SquareLattice(16), T, two_state))
+    for name, model, temps in (('potts q=3 3x3', PottsModel(3), (0.8, 1.5)),
+                               ('clock q=4 3x3', ClockModel(4), (1.0, 2.0))):
+        lattice = SquareLattice(3)
+        exact = lambda T, model=model, lattice=lattice: brute_force(model, lattice, T)
+        for T in temps:
+            out.append((name, 'canonical', model, lattice, T, exact))
+    return out
+
+
+def validate(engines=None, quick=False, nsigma=4.0, tol=2e-3, seed=2023, verbose=True):
+    '''Run every engine on every check; returns a list of result dicts
+
+    A value passes if |MC - exact| < nsigma*error + tol (tol absorbs the
+    finite size corrections of the Onsager checks). Ising runs below Tc
+    start from the ordered state, so that the averages are not spoiled
+    by the slow coarsening of a random start.
+    '''
+    engines = list(ENGINES) if engines is None else engines
+    neq, nsweeps = (200, 1000) if quick else (500, 4000)
+    results = []
+    for e, name in enumerate(engines):
+        ensemble = getattr(ENGINES[name], 'ensemble', 'canonical')
+        for c, (check, kind, model, lattice, T, exact_at) in enumerate(checks(quick)):
+            if kind != ('canonical' if ensemble == 'microcanonical' else ensemble):
+                continue
+            rng = make_rng(seed, (e, c))
+            t0 = time.time()
+            config = initialstate(lattice, rng, model)
+            if isinstance(model, IsingModel) and T < TC*model.J:
+                config.fill(1)
+            series = ENGINES[name](model, lattice, config, T, neq, nsweeps, rng)
+            if series is None:
+                continue
+            n = lattice.nsites
+            if ensemble == 'microcanonical':
+                E, M, D, temperature = series
+                #E - E_exact(T_d), with T_d from the mean demon energy
+                Td = temperature(np.mean(D))
+                diff, err = jackknife(lambda x, d: np.mean(x) - exact_at(temperature(np.mean(d)))['E'],
+                                      E, D)
+                measured = {'E(T_d)': (np.mean(E), err)}
+                exact = {'E(T_d)': np.mean(E) - diff}
+                T = Td
+            else:
+                E, M = series
+                exact = exact_at(T)
+                measured = {'E': jackknife(np.mean, E),
+                            'C': jackknife(lambda x: _C(x, T, n), E)}
+                if 'absM' in exact:
+                    measured['absM'] = jackknife(lambda x: np.mean(np.abs(x)), M)
+                if 'M' in exact:
+                    measured['M'] = jackknife(np.mean, M)
+            elapsed = time.time() - t0
+            for q, (value, err) in measured.items():
+                ok = abs(value - exact[q]) < nsigma*err + tol
+                results.append({'engine': name, 'check': check, 'T': T, 'quantity': q,
+                                'value': value, 'error': err, 'exact': exact[q], 'ok': ok,
+                                'time': elapsed})
+                if verbose:
+                    print('%-12s %-22s T=%-6.4g %-6s %9.5f +- %.5f  exact %9.5f  %s'
+                          % (name, check, T, q, value, err, exact[q], 'ok' if ok else 'FAIL'))
+    return results
+
+
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description='Validate the update engines against exact results')
+    parser.add_argument('engines', nargs='*', choices=[[]] + list(ENGINES),
+                        help='engines to validate (default: all)')
+    parser.add_argument('--quick', action='store_true', help='smaller lattices and shorter runs')
+    parser.add_argument('--nsigma', type=float, default=4.0)
+    parser.add_argument('--seed', type=int, default=2023)
+    args = parser.parse_args(argv)
+    results = validate(args.engines or None, quick=args.quick, nsigma=args.nsigma,
+                       seed=args.seed)
+    failed = [r for r in results if not r['ok']]
+    print('%d checks, %d failed' % (len(results), len(failed)))
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,29 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def _exact_energy(L, T, h=0.0, M=None):
+    '''Energy per site of the L x L periodic Ising model by enumeration
+
+    With M given, only the configurations of magnetization M are summed.
+    '''
+    n = L*L
+    bits = (np.arange(2**n)[:, None] >> np.arange(n)) & 1
+    s = (2*bits - 1).reshape(-1, L, L)
+    if M is not None:
+        s = s[s.sum(axis=(1, 2)) == M]
+    E = (-(s*np.roll(s, 1, 1) + s*np.roll(s, 1, 2)).sum(axis=(1, 2))
+         - h*s.sum(axis=(1, 2)))
+    w = np.exp(-(E - E.min())/T)
+    return (w @ E)/w.sum()/n
+
+
+@pytest.fixture
+def exact_energy():
+    '''exact_energy(L, T, h=0, M=None): canonical energy per site of a small torus'''
+    return _exact_energy
@@ -0,0 +1,101 @@
+import copy
+import json
+
+import pytest
+
+from montecarlo import benchmark
+
+
+@pytest.fixture(scope='module')
+def results():
+    return benchmark.run(['checkerboard', 'spinstate', 'shared-1'], sizes=[16, 32], workers=[1],
+                         min_time=0.01, verbose=False)
+
+
+def test_result_schema(results):
+    results = json.loads(json.dumps(results))
+    for key in ('python', 'numpy', 'machine', 'processor', 'cpu_count', 'date'):
+        assert key in results
+    sweeps = [r for r in results['records'] if r['kind'] == 'sweep']
+    measures = [r for r in results['records'] if r['kind'] == 'measure']
+    assert [(r['name'], r['N']) for r in sweeps] == [
+        (name, N) for name in ('checkerboard', 'spinstate', 'shared-1') for N in (16, 32)]
+    for r in sweeps:
+        assert r['sweeps'] >= 1 and r['seconds'] >= 0.01
+        assert r['sweeps_per_s'] == pytest.approx(r['sweeps']/r['seconds'])
+        assert r['flips_per_s'] == pytest.approx(r['N']**2*r['sweeps_per_s'])
+        assert r['bytes_per_spin'] > 0
+    assert {r['name'] for r in measures} == {'calcEnergy', 'calcMag', 'SpinState.energy',
+                                             'SpinState.magnetization'}
+    for r in measures:
+        assert r['ns_per_spin'] == pytest.approx(1e9*r['seconds']/(r['calls']*r['N']**2))
+
+
+def test_compare_reports_slower_records(results):
+    assert benchmark.compare(results, results) == []
+    slower = copy.deepcopy(results)
+    slower['records'][0]['flips_per_s'] *= 0.5
+    slower['records'][-1]['ns_per_spin'] *= 4
+    slower['records'].append({'kind': 'sweep', 'name': 'new', 'N': 16, 'flips_per_s': 1.0})
+    out = benchmark.compare(slower, results, threshold=0.2)
+    assert [(r['name'], ratio) for r, b, ratio in out] == [
+        (results['records'][0]['name'], pytest.approx(0.5)),
+        (results['records'][-1]['name'], pytest.approx(0.25))]
+
+
+def test_slow_sizes_are_skipped():
+    out = benchmark.run(['mcmove'], sizes=[8, 128], min_time=0.01, max_time=1e-4, verbose=False)
+    assert [r['N'] for r in out['records'] if r['kind'] == 'sweep'] == [8]
+
+
+def test_main_baseline_exit_status(tmp_path, results):
+    base = tmp_path / 'base.json'
+    fast = copy.deepcopy(results)
+    for r in fast['records']:
+        if r['kind'] == 'sweep':
+            r['flips_per_s'] *= 1000
+    base.write_text(json.dumps(fast))
+    out = tmp_path / 'out.json'
+    argv = ['checkerboard', '--sizes', '16', '--min-time', '0.01', '-o', str(out)]
+    assert benchmark.main(argv + ['--baseline', str(base)]) == 1
+    assert json.loads(out.read_text())['records'][0]['name'] == 'checkerboard'
+
+
+def test_shared_memory_and_legacy_records():
+    builders = benchmark.engines(workers=[1])
+    assert {'legacy-ising', 'legacy-twostate', 'shared-1'} <= set(builders)
+    shared = benchmark.bench_engine('shared-1', builders['shared-1'], 16, min_time=0.01)
+    assert shared['memory'] == 'parent+shm'
+    assert shared['bytes_per_spin'] >= 1.0
+    legacy = benchmark.bench_engine('legacy-ising', builders['legacy-ising'], 8, min_time=0.01)
+    assert 'memory' not in legacy and legacy['sweeps'] >= 1
+
+
+def test_lattice_tables_are_counted_for_lattice_engines_only():
+    builders = benchmark.engines(workers=[1])
+    r = benchmark.bench_engine('checkerboard', builders['checkerboard'], 32, min_time=0.01)
+    #the CSR neighbour table alone is 4 intp per site
+    assert r['table_bytes_per_spin'] >= 32
+    assert r['bytes_per_spin'] > r['table_bytes_per_spin']
+    for name in ('shared-1', 'legacy-ising'):
+        r = benchmark.bench_engine(name, builders[name], 32, min_time=0.01)
+        assert 'table_bytes_per_spin' not in r
+    #the legacy loop keeps only its int configuration
+    assert r['bytes_per_spin'] < 32
+
+
+def test_scaling_of_the_shared_engine():
+    records = [{'kind': 'sweep', 'name': 'shared-1', 'N': 64, 'flips_per_s': 1e6},
+               {'kind': 'sweep', 'name': 'shared-4', 'N': 64, 'flips_per_s': 3e6},
+               {'kind': 'sweep', 'name': 'shared-4', 'N': 128, 'flips_per_s': 3e6},
+               {'kind': 'sweep', 'name': 'checkerboard', 'N': 64, 'flips_per_s': 5e6}]
+    scaled = benchmark.scaling(records)
+    assert [(r['name'], r['N']) for r in scaled] == [('shared-1', 64), ('shared-4', 64)]
+    assert scaled[0]['speedup'] == scaled[0]['efficiency'] == 1.0
+    assert scaled[1]['speedup'] == pytest.approx(3.0)
+    assert scaled[1]['efficiency'] == pytest.approx(0.75)
+    assert 'speedup' not in records[2] and 'speedup' not in records[3]
+    results = benchmark.run(['shared-1', 'shared-2'], sizes=[16], workers=[1, 2],
+                            min_time=0.01, verbose=False)
+    two = [r for r in results['records'] if r['name'] == 'shared-2'][0]
+    assert two['efficiency'] == pytest.approx(two['speedup']/2)
@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+
+from montecarlo.correlation import CorrelationAccumulator, fit_xi, from_trajectory, xi_exponential
+from montecarlo.rng import make_rng
+
+
+def _frames(K, N, seed=1):
+    return (2*make_rng(seed).integers(2, size=(K, N, N)) - 1).astype(np.int8)
+
+
+def test_correlation_matches_direct_sums():
+    frames = _frames(3, 6)
+    acc = CorrelationAccumulator(6, batch=2)
+    acc.add(frames)
+    C = acc.correlation()
+    absm = np.abs(frames.mean(axis=(1, 2))).mean()
+    for dx in range(6):
+        for dy in range(6):
+            direct = np.mean(frames*np.roll(frames, (-dx, -dy), axis=(1, 2)))
+            assert C[dx, dy] == pytest.approx(direct - absm**2)
+
+
+def test_structure_factor_matches_dft():
+    frames = _frames(2, 8)
+    acc = CorrelationAccumulator(8)
+    for f in frames:
+        acc.add(f)
+    S = acc.structure_factor()
+    sk = np.fft.fft2(frames)
+    full = np.mean(np.abs(sk)**2, axis=0)/64
+    assert np.allclose(S[:, 1:], full[:, 1:5])
+    assert S[0, 0] == pytest.approx(full[0, 0] - 64*np.abs(frames.mean(axis=(1, 2))).mean()**2)
+
+
+def test_batches_do_not_change_the_result():
+    frames = _frames(10, 8, seed=2)
+    one = from_trajectory(frames, batch=3)
+    two = from_trajectory(frames, batch=64)
+    assert np.allclose(one.correlation(), two.correlation())
+    assert one.xi_second_moment() == pytest.approx(two.xi_second_moment())
+
+
+def test_correlation_length_fits():
+    r = np.arange(20)
+    assert xi_exponential(r, 0.8*np.exp(-r/3.0)) == pytest.approx(3.0)
+    T = np.array([2.4, 2.6, 3.0, 3.5])
+    Tc = 2.0/np.log(1.0 + np.sqrt(2.0))
+    nu, A = fit_xi(T, 0.5*(T - Tc)**-1.0)
+    assert nu == pytest.approx(1.0) and A == pytest.approx(0.5)
+
+
+def test_fft_buffers_are_reused():
+    frames = _frames(7, 8, seed=3)
+    acc = CorrelationAccumulator(8, batch=3)
+    buffers = acc._buf, acc._sk, acc._pk
+    acc.add(frames)
+    S = acc.structure_factor()
+    assert all(a is b for a, b in zip((acc._buf, acc._sk, acc._pk), buffers))
+    sk = np.fft.fft2(frames)
+    full = np.mean(np.abs(sk)**2, axis=0)/64
+    assert np.allclose(S[:, 1:], full[:, 1:5])
@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+
+from montecarlo.demon import DemonEngine
+from montecarlo.lattice import SquareLattice
+from montecarlo.models import IsingModel, TwoStateModel
+from montecarlo.rng import make_rng
+
+
+def test_demon_conserves_total_energy():
+    lattice = SquareLattice(8)
+    model = IsingModel()
+    rng = make_rng(5)
+    config = (2*rng.integers(2, size=lattice.shape) - 1).astype(np.int8)
+    engine = DemonEngine(config, lattice, model, demon_energy=40, rng=rng)
+    assert engine.quantum == 4
+    total = engine.total_energy
+    engine.run(20)
+    assert engine.total_energy == total
+    assert engine.E == model.energy(engine.config, lattice)
+    assert np.all(engine.demons >= 0) and np.all(engine.demons % 4 == 0)
+
+
+@pytest.mark.parametrize('q, T', [(1, 0.7), (4, 2.269), (4, 5.0)])
+def test_temperature_inverts_the_mean_demon_energy(q, T):
+    #mean of q*k with P(k) ~ exp(-q*k/T)
+    engine = DemonEngine(np.ones((4, 4), dtype=np.int8), SquareLattice(4),
+                         TwoStateModel(q), rng=1)
+    assert engine.temperature(q/np.expm1(q/T)) == pytest.approx(T)
+
+
+def test_demons_follow_the_boltzmann_distribution():
+    #P(E_d) ~ exp(-E_d/T) with the T given by the mean demon energy
+    lattice = SquareLattice(32)
+    engine = DemonEngine(np.ones(lattice.shape, dtype=np.int8), lattice, IsingModel(),
+                         demon_energy=2.2, rng=2)
+    engine.run(300)
+    freq = np.zeros(4)
+    for t in range(200):
+        engine.sweep()
+        values, f = engine.demon_histogram()
+        freq += f[:4]
+    ratio = freq[1:]/freq[:-1]
+    assert ratio == pytest.approx(np.exp(-4/engine.temperature()), rel=0.1)
+
+
+def test_non_integer_costs_are_rejected():
+    with pytest.raises(ValueError):
+        DemonEngine(np.ones((4, 4), dtype=np.int8), SquareLattice(4), IsingModel(1.0, 0.25))
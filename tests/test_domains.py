@@ -0,0 +1,60 @@
+from collections import deque
+
+import numpy as np
+import pytest
+
+from montecarlo.domains import DomainStatistics, components, label
+from montecarlo.rng import make_rng
+
+
+def _bfs_labels(s):
+    '''Reference labelling: breadth-first search over periodic neighbours'''
+    N = s.shape[0]
+    labels = np.full(s.shape, -1)
+    for start in range(N*N):
+        i, j = divmod(start, N)
+        if labels[i, j] >= 0:
+            continue
+        labels[i, j] = start
+        queue = deque([(i, j)])
+        while queue:
+            a, b = queue.popleft()
+            for c, d in (((a+1) % N, b), ((a-1) % N, b), (a, (b+1) % N), (a, (b-1) % N)):
+                if labels[c, d] < 0 and s[c, d] == s[a, b]:
+                    labels[c, d] = start
+                    queue.append((c, d))
+    return labels
+
+
+@pytest.mark.parametrize('N, p', [(8, 0.5), (12, 0.3), (16, 0.5)])
+def test_labels_match_breadth_first_search(N, p):
+    frames = np.where(make_rng(N).random((5, N, N)) < p, 1, -1).astype(np.int8)
+    labels = label(frames)
+    for k, s in enumerate(frames):
+        assert np.array_equal(labels[k] - k*N*N, _bfs_labels(s))
+
+
+def test_domains_wrap_around_the_edges():
+    s = -np.ones((6, 6), dtype=np.int8)
+    s[:, 0] = s[:, 5] = 1                   # one stripe across the periodic edge
+    s[0, 2] = s[5, 2] = 1                   # and one domain across the other edge
+    labels = label(s)
+    assert len(np.unique(labels)) == 3
+    assert labels[0, 2] == labels[5, 2] and labels[3, 0] == labels[3, 5]
+
+
+def test_components():
+    assert components(6, [0, 4, 3], [2, 5, 4]).tolist() == [0, 1, 0, 3, 3, 3]
+
+
+def test_statistics_of_a_stripe():
+    s = np.ones((8, 8), dtype=np.int8)
+    s[:, 2:5] = -1
+    stats = DomainStatistics(8, batch=3)
+    for k in range(4):
+        stats.add(s)
+    r = stats.results()
+    assert r['ndomains'].tolist() == [2]*4
+    assert r['interface'].tolist() == [16]*4
+    assert r['largest'][0] == pytest.approx(40/64)
+    assert r['sizes'].tolist() == [24, 40] and r['counts'].tolist() == [4, 4]
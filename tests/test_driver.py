@@ -0,0 +1,38 @@
+import numpy as np
+import pytest
+
+from montecarlo.driver import simulate
+from montecarlo.kernels import checkerboard_move
+from montecarlo.lattice import SquareLattice
+from montecarlo.models import IsingModel
+
+
+def test_measurements_every_k_sweeps():
+    frames = []
+    simulate(IsingModel(), SquareLattice(6), 2.0, 5, 50, rng=1, every=7,
+             observers=[lambda c: frames.append(c.copy())])
+    assert len(frames) == 50//7
+
+
+def test_auto_interval_near_the_critical_point():
+    #tau_int of checkerboard Metropolis at Tc on 16x16 is several sweeps
+    frames = []
+    simulate(IsingModel(), SquareLattice(16), 2.27, 400, 1000, kernel=checkerboard_move,
+             rng=2, every='auto', observers=[frames.append])
+    assert 10 <= len(frames) < 1000
+
+
+@pytest.mark.parametrize('eqSteps', [0, 1, 3])
+def test_auto_interval_with_short_equilibration(eqSteps):
+    frames = []
+    E, M, C, X = simulate(IsingModel(), SquareLattice(6), 2.0, eqSteps, 50, rng=1,
+                          every='auto', observers=[frames.append])
+    assert np.isfinite(E)
+    #too short a pilot: every sweep is measured
+    assert len(frames) == 50
+
+
+@pytest.mark.parametrize('every', [0, -2, 1.5, 'often'])
+def test_invalid_interval(every):
+    with pytest.raises(ValueError):
+        simulate(IsingModel(), SquareLattice(4), 2.0, 5, 10, rng=1, every=every)
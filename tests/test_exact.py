@@ -0,0 +1,85 @@
+import numpy as np
+import pytest
+
+from montecarlo.exact import ExactTorus, strip
+from montecarlo.lattice import SquareLattice
+from montecarlo.models import IsingModel
+from montecarlo.validation import onsager
+
+
+def _all_configs(L):
+    '''All the 2^(L*L) configurations of +1/-1 spins, shape (2^n, L, L)'''
+    n = L*L
+    bits = (np.arange(2**n)[:, None] >> np.arange(n)) & 1
+    return (2*bits - 1).astype(np.int8).reshape(-1, L, L)
+
+
+@pytest.mark.parametrize('L', [3, 4])
+def test_density_of_states_matches_enumeration(L):
+    torus = ExactTorus(L)
+    configs = _all_configs(L)
+    B = SquareLattice(L).bond_sum(configs)
+    M = configs.sum(axis=(1, 2))
+    g = np.zeros_like(torus.g)
+    np.add.at(g, (np.searchsorted(torus.bonds, B), np.searchsorted(torus.mags, M)), 1)
+    assert g.sum() == 2**(L*L)
+    assert np.array_equal(g, torus.g)
+
+
+@pytest.mark.parametrize('h', [0.0, 0.3])
+def test_thermodynamics_matches_boltzmann_sums(h):
+    L, T = 3, 2.2
+    configs = _all_configs(L)
+    model = IsingModel(1.0, h)
+    E = model.energy(configs, SquareLattice(L)).astype(float)
+    M = configs.sum(axis=(1, 2)).astype(float)
+    w = np.exp(-(E - E.min())/T)
+    w /= w.sum()
+    r = ExactTorus(L).thermodynamics(T, h=h)
+    n = L*L
+    assert r['E'][0] == pytest.approx(w @ E/n)
+    assert r['C'][0] == pytest.approx((w @ E**2 - (w @ E)**2)/(n*T*T))
+    assert r['M'][0] == pytest.approx(w @ M/n, abs=1e-12)
+    assert r['absM'][0] == pytest.approx(w @ np.abs(M)/n)
+
+
+def test_rectangular_torus():
+    #3 x 4 and 4 x 3 are the same torus
+    a = ExactTorus(3, 4).thermodynamics([1.5, 2.5], h=0.1)
+    b = ExactTorus(4, 3).thermodynamics([1.5, 2.5], h=0.1)
+    for key in ('F', 'E', 'C', 'M', 'chi'):
+        assert np.allclose(a[key], b[key])
+    assert ExactTorus(3, 4).g.sum() == 2**12
+
+
+def test_long_torus_approaches_the_strip():
+    T = 4.0
+    s = strip(3, T)
+    errors = [abs(ExactTorus(3, K).thermodynamics(T)['E'][0] - s['E'][0]) for K in (5, 6, 7, 8)]
+    assert errors == sorted(errors, reverse=True)
+    assert errors[-1] < 2e-3
+    assert ExactTorus(3, 8).thermodynamics(T)['F'][0] == pytest.approx(s['F'][0], abs=2e-3)
+
+
+def test_ising_py_convention():
+    bonds = ExactTorus(3).thermodynamics([1.5, 3.0])
+    ising = ExactTorus(3).thermodynamics([1.5, 3.0], convention='ising.py')
+    assert np.allclose(ising['E'], bonds['E']/2)
+    assert np.allclose(ising['C'], bonds['C']/4)
+    assert np.allclose(ising['chi'], bonds['chi'])
+    with pytest.raises(ValueError):
+        strip(3, 2.0, convention='other')
+
+
+def test_wide_strip_approaches_onsager():
+    T = 3.0
+    errors = [abs(strip(L, T)['E'][0] - onsager(T)['E']) for L in (6, 8, 10)]
+    assert errors[0] > errors[1] > errors[2]
+    assert errors[2] < 5e-3
+
+
+def test_size_limits():
+    with pytest.raises(ValueError):
+        ExactTorus(2)
+    with pytest.raises(ValueError):
+        ExactTorus(6)
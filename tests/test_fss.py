@@ -0,0 +1,44 @@
+import numpy as np
+import pytest
+
+from montecarlo.fss import binder_crossing, fss_scan, measure_moments, observables, peak
+from montecarlo.lattice import SquareLattice
+from montecarlo.models import IsingModel
+from montecarlo.rng import as_rng
+
+Tc = 2.0/np.log(1.0 + np.sqrt(2.0))
+
+
+def test_binder_crossing_of_straight_lines():
+    T = np.linspace(2.0, 2.6, 7)
+    small = {'T': T, 'U': 0.6 - 0.5*(T - 2.3)}
+    large = {'T': T, 'U': 0.6 - 1.5*(T - 2.3)}
+    assert binder_crossing(small, large) == pytest.approx(2.3)
+    assert binder_crossing(small, {'T': T, 'U': small['U'] + 0.1}) is None
+
+
+def test_peak_is_refined_with_a_parabola():
+    T = np.linspace(2.0, 3.0, 11)
+    assert peak(T, -(T - 2.43)**2)[0] == pytest.approx(2.43)
+
+
+def test_observables_of_ordered_and_disordered_points():
+    #all spins up: U = 2/3; m = +-1 with equal weights: chi = 0 for |m|
+    points = [{'T': 1.0, 'L': 4, 'E': -32.0, 'E2': 1024.0, 'absM': 1.0, 'M2': 1.0, 'M4': 1.0}]
+    obs = observables(points)
+    assert obs['U'][0] == pytest.approx(2.0/3.0)
+    assert obs['chi'][0] == 0.0 and obs['C'][0] == 0.0
+
+
+def test_scan_finds_the_critical_temperature():
+    result = fss_scan([4, 8], np.linspace(1.8, 2.8, 11), eqSteps=200, mcSteps=2000, seed=1,
+                      verbose=False)
+    assert result.Tc == pytest.approx(Tc, abs=0.15)
+    assert result.estimates['gamma/nu'] > 1.0
+
+
+def test_measure_moments_seed_is_one_stream():
+    args = (IsingModel(), SquareLattice(6), 2.3, 10, 40)
+    a = measure_moments(*args, rng=5)
+    assert a['E'] == measure_moments(*args, rng=5)['E']
+    assert a['E'] == measure_moments(*args, rng=as_rng(5))['E']
@@ -0,0 +1,40 @@
+import numpy as np
+import pytest
+
+from montecarlo.kernels import heatbath_move, initialstate
+from montecarlo.lattice import SquareLattice
+from montecarlo.models import IsingModel, TwoStateModel
+from montecarlo.rng import make_rng
+
+
+@pytest.mark.parametrize('beta', [0.1, 0.44, 50.0])
+def test_heatbath_table(beta):
+    model, z = IsingModel(1.0, 0.3), 4
+    p_up = model.heatbath_table(beta, z)
+    assert np.all(np.isfinite(p_up))
+    for nb in range(-z, z+1):
+        #energy of +1 minus energy of -1 with neighbour sum nb
+        dE = -2*(nb + 0.3)
+        assert p_up[nb+z] == pytest.approx(1.0/(1.0 + np.exp(beta*dE)))
+
+
+def test_heatbath_samples_the_canonical_energy(exact_energy):
+    lattice, model, T = SquareLattice(4), IsingModel(1.0, 0.2), 2.5
+    rng = make_rng(4)
+    config = initialstate(lattice, rng)
+    E = []
+    for t in range(20000):
+        heatbath_move(config, lattice, model, 1.0/T, rng)
+        E.append(model.energy(config, lattice)/16)
+    assert np.mean(E[100:]) == pytest.approx(exact_energy(4, T, 0.2), abs=0.03)
+
+
+def test_heatbath_two_state_model():
+    lattice, model = SquareLattice(32), TwoStateModel()
+    rng = make_rng(5)
+    config = initialstate(lattice, rng)
+    E = []
+    for t in range(50):
+        heatbath_move(config, lattice, model, 1.0, rng)
+        E.append(model.energy(config, lattice)/lattice.nsites)
+    assert np.mean(E) == pytest.approx(1.0/(1.0 + np.e), abs=0.005)
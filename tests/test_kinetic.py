@@ -0,0 +1,97 @@
+import numpy as np
+import pytest
+
+from montecarlo.kinetic import (ActiveInterfaceEngine, KawasakiEngine, NFoldWayEngine,
+                                fixed_magnetization)
+from montecarlo.lattice import SquareLattice
+from montecarlo.models import IsingModel, TwoStateModel
+from montecarlo.rng import make_rng
+from montecarlo.validation import jackknife
+
+
+def _random(lattice, rng):
+    return (2*rng.integers(2, size=lattice.shape) - 1).astype(np.int8)
+
+
+def test_active_interface_samples_the_canonical_energy(exact_energy):
+    lattice, model, T = SquareLattice(4), IsingModel(1.0, 0.2), 2.5
+    rng = make_rng(0)
+    engine = ActiveInterfaceEngine(_random(lattice, rng), lattice, model, 1.0/T, rng)
+    step, E, M = engine.run(20000)
+    assert np.mean(E[100:]) == pytest.approx(exact_energy(4, T, 0.2), abs=0.05)
+
+
+def test_active_interface_bookkeeping():
+    lattice, model = SquareLattice(16), IsingModel()
+    rng = make_rng(1)
+    engine = ActiveInterfaceEngine(_random(lattice, rng), lattice, model, 1.0, rng)
+    step, E, M = engine.run(20, every=5)
+    assert step == [0, 5, 10, 15, 20]
+    config = engine.config
+    assert engine.E == model.energy(config, lattice)
+    assert engine.M == config.sum()
+    assert engine.nb == lattice.neighbour_sum(lattice.flat(config)).tolist()
+    assert engine.sets.cls == [engine._class(i) for i in range(lattice.nsites)]
+    #low temperature: the domains coarsen and the energy drops
+    assert E[-1] < E[0] - 1.0
+
+
+def test_nfold_samples_the_canonical_energy(exact_energy):
+    lattice, model, T = SquareLattice(4), IsingModel(1.0, 0.2), 2.5
+    rng = make_rng(2)
+    engine = NFoldWayEngine(_random(lattice, rng), lattice, model, 1.0/T, rng)
+    step, E, M = engine.run(20000)
+    assert np.mean(E[100:]) == pytest.approx(exact_energy(4, T, 0.2), abs=0.05)
+
+
+def test_nfold_two_state_model():
+    lattice, model = SquareLattice(16), TwoStateModel()
+    rng = make_rng(3)
+    engine = NFoldWayEngine(_random(lattice, rng), lattice, model, 1.0, rng)
+    step, E, M = engine.run(300)
+    assert np.mean(E[20:]) == pytest.approx(1.0/(1.0 + np.e), abs=0.01)
+
+
+def test_nfold_energy_is_consistent():
+    lattice = SquareLattice(8)
+    model = IsingModel(1.0, 0.2)
+    rng = make_rng(3)
+    engine = NFoldWayEngine(_random(lattice, rng), lattice, model, 0.5, rng)
+    engine.run(20)
+    assert engine.E == pytest.approx(model.energy(engine.config, lattice))
+    assert engine.M == engine.config.sum()
+
+
+def _bond_energy(config):
+    '''Energy of the bonds of a periodic square configuration, from rolls'''
+    s = config.astype(int)
+    return -float(np.sum(s*np.roll(s, 1, 0)) + np.sum(s*np.roll(s, 1, 1)))
+
+
+def test_kawasaki_conserves_magnetization():
+    lattice = SquareLattice(16)
+    model = IsingModel()
+    rng = make_rng(7)
+    config = fixed_magnetization(lattice, 0.25, rng)
+    M0 = int(config.sum())
+    assert M0 == 64
+    engine = KawasakiEngine(config, lattice, model, 1.0/1.5, rng)
+    step, E, M = engine.run(50)
+    assert engine.flips > 0
+    assert np.all(np.array(M)*lattice.nsites == M0)
+    assert int(engine.config.sum()) == M0
+    #the energy kept incrementally is the energy of the configuration
+    assert engine.E == _bond_energy(engine.config)
+
+
+def test_kawasaki_samples_fixed_magnetization(exact_energy):
+    #tau_int of E is about 60 sweeps here: long run, error bar from 20 jackknife blocks
+    lattice, T = SquareLattice(4), 2.0
+    rng = make_rng(8)
+    engine = KawasakiEngine(fixed_magnetization(lattice, 0.0, rng), lattice, IsingModel(),
+                            1.0/T, rng)
+    engine.run(500)
+    step, E, M = engine.run(100000)
+    mean, err = jackknife(np.mean, np.array(E[1:]))
+    assert err < 0.015
+    assert abs(mean - exact_energy(4, T, M=0)) < 4*err
@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+
+from montecarlo.kernels import checkerboard_move, initialstate, mcmove
+from montecarlo.lattice import (CubicLattice, HoneycombLattice, SquareLattice,
+                                TriangularLattice)
+from montecarlo.models import IsingModel
+from montecarlo.rng import make_rng
+
+
+def test_square_neighbour_sum_matches_rolls():
+    lattice = SquareLattice(5)
+    config = 2*make_rng(1).integers(2, size=(3, 5, 5)) - 1
+    nb = (np.roll(config, 1, 1) + np.roll(config, -1, 1)
+          + np.roll(config, 1, 2) + np.roll(config, -1, 2))
+    assert np.array_equal(lattice.neighbour_sum(lattice.flat(config)), nb.reshape(3, -1))
+    bonds = np.sum(config*(np.roll(config, 1, 1) + np.roll(config, 1, 2)), axis=(1, 2))
+    assert np.array_equal(lattice.bond_sum(config), bonds)
+
+
+@pytest.mark.parametrize('lattice, nbonds', [
+    (SquareLattice(4), 32), (SquareLattice(4, periodic=False), 24),
+    (TriangularLattice(6), 108), (HoneycombLattice(4), 24), (CubicLattice(3), 81),
+    (TriangularLattice(4, periodic=False), 33)])
+def test_neighbour_tables(lattice, nbonds):
+    #neighbour relations are symmetric, without self loops, and colours are independent sets
+    pairs = set()
+    for i in range(lattice.nsites):
+        for j in lattice.neighbours(i):
+            assert i != j and i in lattice.neighbours(j)
+            pairs.add((min(i, j), max(i, j)))
+    assert len(pairs) == nbonds
+    assert sorted(map(tuple, lattice.bonds().tolist())) == sorted(pairs)
+    colour = np.empty(lattice.nsites, dtype=int)
+    for c, sites in enumerate(lattice.colours):
+        colour[sites] = c
+    assert sorted(np.concatenate(lattice.colours).tolist()) == list(range(lattice.nsites))
+    assert all(colour[i] != colour[j] for i, j in pairs)
+
+
+def test_neighbour_sum_of_irregular_lattice():
+    lattice = SquareLattice(4, periodic=False)
+    assert not lattice.regular
+    flat = 2*make_rng(2).integers(2, size=lattice.nsites) - 1
+    expected = [flat[lattice.neighbours(i)].sum() for i in range(lattice.nsites)]
+    assert np.array_equal(lattice.neighbour_sum(flat), expected)
+    sites = lattice.colours[1]
+    assert np.array_equal(lattice.neighbour_sum(flat, sites), np.array(expected)[sites])
+
+
+@pytest.mark.parametrize('kernel', [mcmove, checkerboard_move])
+def test_kernels_order_a_triangular_lattice(kernel):
+    lattice = TriangularLattice(6)
+    rng = make_rng(4)
+    config = initialstate(lattice, rng)
+    for t in range(30):
+        kernel(config, lattice, IsingModel(), 2.0, rng)
+    #far below T_c = 3.64 the lattice is almost fully magnetized
+    assert abs(config.mean()) > 0.9
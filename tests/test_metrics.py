@@ -0,0 +1,111 @@
+import math
+import urllib.error
+import urllib.request
+
+import pytest
+
+from montecarlo import profiling
+from montecarlo.driver import temperature_scan
+from montecarlo.lattice import SquareLattice
+from montecarlo.metrics import MetricsServer, exposition
+from montecarlo.models import IsingModel
+
+
+def _get(server, path='/metrics'):
+    with urllib.request.urlopen('http://%s:%d%s' % (server.host, server.port, path)) as r:
+        return r.headers['Content-Type'], r.read().decode()
+
+
+def test_exposition():
+    text = exposition({'temperature': math.inf, 'energy': -math.inf, 'specific_heat': math.nan,
+                       'magnetization': 0.5, 'unknown': 1.0})
+    assert text.splitlines() == [
+        '# HELP montecarlo_temperature Current temperature (reduced units)',
+        '# TYPE montecarlo_temperature gauge',
+        'montecarlo_temperature +Inf',
+        '# HELP montecarlo_energy Energy per site at the last temperature',
+        '# TYPE montecarlo_energy gauge',
+        'montecarlo_energy -Inf',
+        '# HELP montecarlo_magnetization Magnetization per site at the last temperature',
+        '# TYPE montecarlo_magnetization gauge',
+        'montecarlo_magnetization 0.5',
+        '# HELP montecarlo_specific_heat Specific heat per site at the last temperature',
+        '# TYPE montecarlo_specific_heat gauge',
+        'montecarlo_specific_heat NaN']
+    assert exposition({}) == '\n'
+
+
+def test_server_serves_the_last_snapshot():
+    with MetricsServer() as server:
+        server.publish(temperatures=3, temperature_index=0)
+        server.publish(temperature_index=1)
+        kind, body = _get(server)
+        assert kind.startswith('text/plain; version=0.0.4')
+        assert 'montecarlo_temperatures 3.0' in body
+        assert 'montecarlo_temperature_index 1.0' in body
+        with pytest.raises(urllib.error.HTTPError) as err:
+            _get(server, '/other')
+        assert err.value.code == 404
+    assert server._thread is None
+
+
+def test_scan_publishes_progress_and_results():
+    with MetricsServer() as server:
+        E, M, C, X = temperature_scan(IsingModel(), SquareLattice(4), [2.0, 3.0], 5, 30,
+                                      seed=1, verbose=False, metrics=server, every=7)
+        snapshot = server.snapshot
+    assert isinstance(profiling.active(), profiling.NullProfiler)
+    assert snapshot['temperatures'] == 2
+    assert snapshot['temperature_index'] == 2
+    assert snapshot['temperature'] == 3.0
+    #30//7 = 4 measurements every 7 sweeps after 5 equilibration sweeps
+    assert snapshot['sweeps_total'] == 2*(5 + 28)
+    assert snapshot['eta_seconds'] == 0.0
+    assert snapshot['energy'] == E[-1] and snapshot['susceptibility'] == X[-1]
+    assert 0.0 < snapshot['acceptance_ratio'] < 1.0
+
+
+def test_progress_is_published_within_a_temperature():
+    seen = []
+
+    class Server:
+        snapshot = {}
+
+        def publish(self, **values):
+            seen.append(dict(values))
+
+    temperature_scan(IsingModel(), SquareLattice(4), [2.0], 10, 20, seed=1, verbose=False,
+                     metrics=Server(), interval=0.0)
+    live = [v for v in seen if 'sweeps_total' in v and 'temperature_index' not in v]
+    #one publication at the end of the equilibration and one per measurement
+    assert [v['sweeps_total'] for v in live] == list(range(10, 31))
+
+
+def test_acceptance_is_live_within_a_temperature():
+    seen = []
+
+    class Server:
+        snapshot = {}
+
+        def publish(self, **values):
+            seen.append(dict(values))
+
+    #no equilibration: before the production phase ends only its open counters exist
+    temperature_scan(IsingModel(), SquareLattice(4), [2.0], 0, 20, seed=1, verbose=False,
+                     metrics=Server(), interval=0.0)
+    live = [v['acceptance_ratio'] for v in seen
+            if v.get('sweeps_total') and 'temperature_index' not in v]
+    assert len(live) == 20
+    assert all(0.0 < a < 1.0 for a in live)
+    assert len(set(live)) > 1
+
+
+def test_total_includes_open_phases():
+    with profiling.profile() as prof:
+        with prof.phase('outer', T=1.0):
+            prof.count(attempted=3)
+            with prof.phase('inner'):
+                prof.count(attempted=4)
+            assert prof.total('attempted', T=1.0) == 7
+            assert prof.total('attempted', T=2.0) == 0
+        assert prof.total('attempted') == 7
@@ -0,0 +1,74 @@
+import numpy as np
+import pytest
+
+from montecarlo.driver import hysteresis
+from montecarlo.kernels import checkerboard_move, initialstate, mcmove
+from montecarlo.lattice import SquareLattice
+from montecarlo.models import IsingModel, TableCache, TwoStateModel
+from montecarlo.potts import PottsModel
+from montecarlo.rng import make_rng
+
+
+@pytest.mark.parametrize('model', [IsingModel(), IsingModel(0.5, -0.3), TwoStateModel(2.0)])
+def test_acceptance_table_is_the_metropolis_rule(model):
+    beta, z = 0.7, 4
+    table = model.acceptance_table(beta, z)
+    for s in (-1, 1):
+        for nb in range(-z, z+1):
+            expected = min(1.0, np.exp(-beta*model.cost(s, nb)))
+            assert table[(s+1)//2, nb+z] == pytest.approx(expected)
+    assert model.acceptance_table(beta, z) is table
+
+
+@pytest.mark.parametrize('kernel', [mcmove, checkerboard_move])
+def test_two_state_occupation(kernel):
+    #exact fraction of excited sites 1/(1+exp(epsilon/T))
+    lattice, model, T = SquareLattice(16), TwoStateModel(), 1.0
+    rng = make_rng(3)
+    config = initialstate(lattice, rng)
+    E = []
+    for t in range(300):
+        kernel(config, lattice, model, 1.0/T, rng)
+        if t >= 50:
+            E.append(model.energy(config, lattice)/lattice.nsites)
+    assert np.mean(E) == pytest.approx(1.0/(1.0 + np.exp(1.0/T)), abs=0.01)
+
+
+def test_hysteresis_follows_the_field():
+    M = hysteresis(SquareLattice(8), 1.0, [2.0, -2.0], 20, rng=1)
+    assert M[0] == 1.0 and M[1] == -1.0
+
+
+def test_tables_follow_parameter_changes():
+    model = IsingModel()
+    before = model.acceptance_table(0.5, 4)
+    model.h = 0.5
+    after = model.acceptance_table(0.5, 4)
+    assert not np.array_equal(before, after)
+    assert np.array_equal(after, IsingModel(1.0, 0.5).acceptance_table(0.5, 4))
+    potts = PottsModel(3)
+    ratio = potts.ratio_table(1.0)
+    potts.J = 2.0
+    assert not np.array_equal(ratio, potts.ratio_table(1.0))
+
+
+def test_table_cache_is_bounded():
+    model = TwoStateModel()
+    for k in range(200):
+        model.acceptance_table(0.01*(k + 1), 4)
+        model.heatbath_table(0.01*(k + 1), 4)
+    assert len(model._tables) <= model._tables.maxsize
+    #the most recent table is kept and read-only
+    table = model.acceptance_table(2.0, 4)
+    assert model.acceptance_table(2.0, 4) is table
+    assert not table.flags.writeable
+
+
+def test_table_cache_byte_bound():
+    cache = TableCache(maxsize=16, maxbytes=3*800)
+    model = IsingModel()
+    for k in range(10):
+        cache.get(model, ('t', k), lambda: np.zeros(100))
+    assert len(cache) == 3 and cache.nbytes == 3*800
+    big = cache.get(model, ('big',), lambda: np.zeros(1000))
+    assert len(cache) == 1 and cache.get(model, ('big',), None) is big
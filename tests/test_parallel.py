@@ -0,0 +1,74 @@
+from multiprocessing import shared_memory
+
+import numpy as np
+import pytest
+
+from montecarlo.models import IsingModel, TwoStateModel
+from montecarlo.parallel import SharedLatticeEngine
+
+
+def _run(nworkers, nsweeps=4):
+    with SharedLatticeEngine(12, IsingModel(), 0.4, nworkers=nworkers, nblocks=6,
+                             seed=11) as engine:
+        engine.run(nsweeps)
+        return engine.config.copy()
+
+
+def test_reproducible_for_any_number_of_workers():
+    one = _run(1)
+    assert np.array_equal(one, _run(2))
+    assert np.array_equal(one, _run(3))
+
+
+def test_energy_and_magnetization():
+    with SharedLatticeEngine(8, IsingModel(1.0, 0.2), 0.3, nworkers=2, seed=1) as engine:
+        engine.run(2)
+        s = engine.config
+        bonds = np.sum(s*np.roll(s, 1, 0)) + np.sum(s*np.roll(s, 1, 1))
+        assert engine.energy() == pytest.approx(-bonds - 0.2*s.sum())
+        assert engine.magnetization() == s.sum()
+
+
+def test_two_state_model():
+    #energy of the excited sites, and their exact fraction 1/(1+e^(1/T)) at T=1
+    with SharedLatticeEngine(32, TwoStateModel(), 1.0, nworkers=2, seed=3) as engine:
+        E = []
+        for t in range(40):
+            engine.run(5)
+            assert engine.energy() == np.count_nonzero(engine.config > 0)
+            E.append(engine.energy()/1024)
+    assert np.mean(E) == pytest.approx(1.0/(1.0 + np.e), abs=0.01)
+
+
+def test_odd_size_is_rejected():
+    with pytest.raises(ValueError):
+        SharedLatticeEngine(7, IsingModel(), 0.4, nworkers=1)
+
+
+class _Failing(IsingModel):
+    '''Raises in the workers when asked for a table at beta > 1'''
+
+    def acceptance_table(self, beta, z):
+        if beta > 1:
+            raise ArithmeticError('no table')
+        return super().acceptance_table(beta, z)
+
+
+def test_worker_error_is_reported():
+    engine = SharedLatticeEngine(8, _Failing(), 0.5, nworkers=2, seed=1, timeout=10)
+    engine.run(1)
+    engine.set_beta(2.0)
+    with pytest.raises(RuntimeError, match='ArithmeticError'):
+        engine.run(1)
+    with pytest.raises(RuntimeError, match='closed'):
+        engine.run(1)
+    assert engine.config.shape == (8, 8)
+
+
+def test_close_releases_the_shared_memory():
+    engine = SharedLatticeEngine(8, IsingModel(), 0.4, nworkers=2, seed=1)
+    name = engine._shm.name
+    engine.close()
+    with pytest.raises(FileNotFoundError):
+        shared_memory.SharedMemory(name=name)
+    assert engine.config.shape == (8, 8)
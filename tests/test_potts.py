@@ -0,0 +1,69 @@
+import numpy as np
+import pytest
+
+from montecarlo import potts
+from montecarlo.lattice import SquareLattice
+from montecarlo.models import IsingModel
+from montecarlo.potts import ClockModel, PottsModel, cluster_move, potts_move
+from montecarlo.rng import make_rng
+
+
+def _mean_energy(model, kernel, T, nsweeps, L=4, seed=0):
+    lattice = SquareLattice(L)
+    rng = make_rng(seed)
+    config = model.random_state(lattice.shape, rng)
+    E = []
+    for t in range(nsweeps):
+        kernel(config, lattice, model, 1.0/T, rng)
+        E.append(model.energy(config, lattice)/lattice.nsites)
+    return np.mean(E[100:])
+
+
+def test_ratio_table():
+    model = ClockModel(5, 0.7)
+    e = model.pair_energy()
+    ratio = model.ratio_table(0.9)
+    a1, a2, b = 1, 3, 4
+    assert ratio[a1, a2, b] == pytest.approx(np.exp(-0.9*(e[a2, b] - e[a1, b])))
+
+
+def test_q2_potts_energy_is_ising():
+    #-2*delta(a, b) = -(1 + s_a*s_b): 2J Potts is J Ising minus J per bond
+    lattice = SquareLattice(6)
+    config = make_rng(1).integers(2, size=lattice.shape, dtype=np.uint8)
+    ising = IsingModel().energy(2*config.astype(int) - 1, lattice)
+    assert PottsModel(2, 2.0).energy(config, lattice) == ising - 72
+
+
+@pytest.mark.parametrize('kernel', [potts_move, cluster_move])
+def test_q2_potts_samples_the_ising_energy(kernel, exact_energy):
+    T = 2.5
+    E = _mean_energy(PottsModel(2, 2.0), kernel, T, 10000)
+    assert E + 2.0 == pytest.approx(exact_energy(4, T), abs=0.04)
+
+
+@pytest.mark.parametrize('kernel', [potts_move, cluster_move])
+def test_q4_clock_samples_two_ising_models(kernel, exact_energy):
+    #cos(theta_a - theta_b) = (s_a*s_b + t_a*t_b)/2 for q=4: two Ising models with J/2
+    T = 1.2
+    E = _mean_energy(ClockModel(4), kernel, T, 10000, seed=1)
+    assert E == pytest.approx(exact_energy(4, 2*T), abs=0.04)
+
+
+def test_clock_cluster_agrees_with_metropolis():
+    model, T = ClockModel(6), 0.8
+    cluster = _mean_energy(model, cluster_move, T, 4000, L=6, seed=2)
+    metropolis = _mean_energy(model, potts_move, T, 4000, L=6, seed=3)
+    assert cluster == pytest.approx(metropolis, abs=0.04)
+
+
+def test_clock_tables_of_a_scan_stay_cached(monkeypatch):
+    model = ClockModel(8)
+    betas = np.linspace(0.2, 2.0, 40)
+    first = [model.ratio_table(b) for b in betas]
+    assert all(model.ratio_table(b) is t for b, t in zip(betas, first))
+    monkeypatch.setattr(potts, 'TABLE_BYTES', 2**20)
+    big = ClockModel(32)                    # 256 KiB per table
+    for b in betas[:20]:
+        big.ratio_table(b)
+    assert big._tables.nbytes <= 2**20 and len(big._tables) == 4
@@ -0,0 +1,130 @@
+import numpy as np
+import pytest
+
+from montecarlo import profiling
+from montecarlo.driver import simulate, temperature_scan
+from montecarlo.kernels import checkerboard_move, mcmove
+from montecarlo.lattice import SquareLattice
+from montecarlo.demon import DemonEngine
+from montecarlo.kinetic import NFoldWayEngine
+from montecarlo.models import IsingModel
+from montecarlo.parallel import SharedLatticeEngine
+from montecarlo.potts import PottsModel, cluster_move, potts_move
+from montecarlo.rng import make_rng
+from montecarlo.state import SpinState
+
+
+def _phases(records):
+    return {r['phase'] for r in records}
+
+
+def test_off_by_default():
+    assert isinstance(profiling.active(), profiling.NullProfiler)
+    assert profiling.active().phase('x') is profiling.active().phase('y')
+
+
+def test_phases_nest_and_count(tmp_path):
+    path = tmp_path / 'prof.jsonl'
+    with profiling.profile(str(path)) as prof:
+        simulate(IsingModel(), SquareLattice(8), 2.5, 5, 10, kernel=mcmove, rng=1, every=2)
+        prof.flush()
+    assert isinstance(profiling.active(), profiling.NullProfiler)
+    records = profiling.read_log(str(path))
+    assert records == prof.log
+    by = {r['phase']: r for r in records}
+    assert {'simulate', 'simulate/equilibrate', 'simulate/equilibrate/rng',
+            'simulate/production', 'simulate/production/measure',
+            'simulate/production/rng'} <= set(by)
+    assert all(r['T'] == 2.5 for r in records)
+    assert by['simulate']['calls'] == 1
+    assert by['simulate/production/measure']['calls'] == 5
+    assert by['simulate/equilibrate/rng']['calls'] == 5
+    #a phase includes the time of the phases inside it
+    assert by['simulate']['seconds'] >= by['simulate/production']['seconds']
+    assert by['simulate/production']['seconds'] >= by['simulate/production/measure']['seconds']
+    #mcmove attempts N*N flips per sweep
+    assert by['simulate/equilibrate']['attempted'] == 5*64
+    assert by['simulate/production']['attempted'] == 10*64
+    assert 0 < by['simulate/production']['accepted'] <= 10*64
+
+
+def test_scan_flushes_every_temperature(tmp_path):
+    path = tmp_path / 'prof.jsonl'
+    T = [1.5, 3.0]
+    with profiling.profile(str(path)) as prof:
+        temperature_scan(IsingModel(), SquareLattice(8), T, 10, 20,
+                         kernel=checkerboard_move, seed=3, verbose=False)
+        assert prof._totals == {}
+    records = profiling.read_log(str(path))
+    assert {r['T'] for r in records} == set(T)
+    phases, acceptance = profiling.summarize(records)
+    assert phases['simulate']['calls'] == 2
+    assert phases['simulate']['fraction'] == pytest.approx(1.0)
+    assert set(acceptance) == set(T)
+    #fewer flips are accepted in the ordered phase
+    assert 0 < acceptance[1.5] < acceptance[3.0] < 1
+
+
+def test_memory_peaks():
+    with profiling.profile(memory=True) as prof:
+        with prof.phase('outer'):
+            with prof.phase('alloc'):
+                a = np.ones(1 << 20)
+            del a
+        prof.flush()
+    by = {r['phase']: r for r in prof.log}
+    assert by['outer/alloc']['peak_bytes'] >= 8 << 20
+    assert by['outer']['peak_bytes'] >= by['outer/alloc']['peak_bytes']
+
+
+def _spins(N, seed):
+    return (2*make_rng(seed).integers(2, size=(N, N)) - 1).astype(np.int8)
+
+
+def _engines(lattice):
+    '''(phase, run) of every engine outside kernels.py, each doing 2 sweeps'''
+    model, rng = IsingModel(), make_rng(1)
+    state = SpinState(lattice, model, rng=rng)
+    potts = make_rng(2).integers(3, size=lattice.shape).astype(np.uint8)
+    nfold = NFoldWayEngine(_spins(lattice.N, 3), lattice, model, 0.4, rng)
+    demon = DemonEngine(_spins(lattice.N, 4), lattice, model, demon_energy=4, rng=rng)
+    return [('rng', lambda: state.run(0.4, 2)),
+            ('rng', lambda: [potts_move(potts, lattice, PottsModel(3), 1.0, rng)
+                             for t in range(2)]),
+            ('clusters', lambda: [cluster_move(potts, lattice, PottsModel(3), 1.0, rng)
+                                  for t in range(2)]),
+            ('kinetic', lambda: nfold.run(2)),
+            ('demon', lambda: demon.run(2))]
+
+
+def test_engines_time_their_phases_and_count_moves():
+    lattice = SquareLattice(8)
+    for phase, run in _engines(lattice):
+        with profiling.profile() as prof:
+            #the counts go to the innermost open phase
+            with prof.phase('run'):
+                run()
+            prof.flush()
+        assert 'run/' + phase in _phases(prof.log), phase
+        assert prof.total('attempted') == 2*64, phase
+        assert 0 < prof.total('accepted') <= 2*64, phase
+
+
+def test_shared_engine_counts_the_worker_flips():
+    with SharedLatticeEngine(8, IsingModel(), 0.0, nworkers=2, seed=1) as engine:
+        engine.run(1)
+        with profiling.profile() as prof:
+            engine.run(3)
+            prof.flush()
+    assert _phases(prof.log) == {'shared'}
+    #at beta = 0 every flip is accepted
+    assert prof.total('attempted') == prof.total('accepted') == 3*64
+
+
+def test_print_summary(capsys):
+    records = [{'phase': 'simulate', 'T': 2.0, 'calls': 1, 'seconds': 2.0},
+               {'phase': 'simulate/production', 'T': 2.0, 'calls': 1, 'seconds': 1.5,
+                'attempted': 100, 'accepted': 25}]
+    profiling.print_summary(records)
+    out = capsys.readouterr().out
+    assert '  production' in out and '75.0%' in out and '0.2500' in out
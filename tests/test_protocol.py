@@ -0,0 +1,82 @@
+import numpy as np
+import pytest
+
+from montecarlo.lattice import SquareLattice
+from montecarlo.models import IsingModel
+from montecarlo.protocol import (constant, cycle, linear, read_frames, read_series,
+                                 run_protocol)
+
+
+def test_linear_and_cycle():
+    ramp = linear(3.0, 1.0, 4)
+    assert [ramp(t) for t in (0, 2, 4, 9)] == [3.0, 2.0, 1.0, 1.0]
+    wave = cycle(1.0, 3.0, 4)
+    assert [wave(t) for t in range(5)] == [3.0, 2.0, 1.0, 2.0, 3.0]
+
+
+def test_run_protocol_records(tmp_path):
+    prefix = str(tmp_path/'run')
+    lattice = SquareLattice(4)
+    config = run_protocol(IsingModel(), lattice, linear(3.0, 1.0, 6), 6, prefix, every=2,
+                          snapshot_every=3, rng=1, chunk=2)
+    data = read_series(prefix)
+    assert list(data['t']) == [2, 4, 6]
+    assert np.allclose(data['T'], [3.0 - 1/3, 3.0 - 1, 3.0 - 5/3])
+    assert data['E'][-1] == IsingModel().energy(config, lattice)/16
+    assert data['M'][-1] == config.sum()/16
+    frames = read_frames(prefix, lattice.shape)
+    assert frames.shape == (2, 4, 4)
+    assert np.array_equal(frames[-1], config)
+
+
+def test_quench_orders_the_lattice(tmp_path):
+    prefix = str(tmp_path/'quench')
+    run_protocol(IsingModel(), SquareLattice(16), constant(1.0), 200, prefix, every=10, rng=2)
+    E = read_series(prefix)['E']
+    #coarsening towards the ground state E = -2 per site
+    assert E[-1] < E[0] and E[-1] < -1.6
+
+
+def test_linear_with_zero_sweeps_steps_at_once():
+    schedule = linear(3.0, 1.0, 0)
+    assert schedule(0) == 1.0
+    assert schedule(10) == 1.0
+    with pytest.raises(ValueError):
+        linear(3.0, 1.0, -1)
+
+
+@pytest.mark.parametrize('make', [lambda: constant(0.0), lambda: constant(-1.0),
+                                  lambda: linear(0.0, 1.0, 5), lambda: cycle(-1.0, 2.0, 4),
+                                  lambda: cycle(1.0, 2.0, 0)])
+def test_non_positive_temperatures_are_rejected(make):
+    with pytest.raises(ValueError):
+        make()
+
+
+def test_run_protocol_rejects_bad_schedule(tmp_path):
+    with pytest.raises(ValueError, match='sweep 2'):
+        run_protocol(IsingModel(), SquareLattice(4), lambda t: 2.0 - t, 5,
+                     str(tmp_path/'run'), rng=1)
+
+
+def test_existing_prefix_is_not_appended_to(tmp_path):
+    prefix = str(tmp_path/'run')
+    lattice = SquareLattice(4)
+    run_protocol(IsingModel(), lattice, constant(2.0), 4, prefix, snapshot_every=2, rng=1)
+    with pytest.raises(FileExistsError):
+        run_protocol(IsingModel(), lattice, constant(2.0), 4, prefix, rng=1)
+    assert read_series(prefix)['t'].tolist() == [1, 2, 3, 4]
+    run_protocol(IsingModel(), lattice, constant(2.0), 6, prefix, every=3, rng=1,
+                 overwrite=True)
+    assert read_series(prefix)['t'].tolist() == [3, 6]
+    #the frames of the replaced run are removed too
+    assert not (tmp_path/'run.frames').exists()
+
+
+@pytest.mark.parametrize('kwargs', [{'every': 0}, {'every': -1}, {'every': 1.5},
+                                    {'snapshot_every': -1}])
+def test_invalid_intervals(tmp_path, kwargs):
+    with pytest.raises(ValueError):
+        run_protocol(IsingModel(), SquareLattice(4), constant(2.0), 4, str(tmp_path/'run'),
+                     rng=1, **kwargs)
+    assert not (tmp_path/'run.series').exists()
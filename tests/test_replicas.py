@@ -0,0 +1,42 @@
+import numpy as np
+import pytest
+
+from montecarlo.lattice import SquareLattice
+from montecarlo.models import IsingModel, TwoStateModel
+from montecarlo.replicas import ReplicaEnsemble, ensemble_average, replica_snapshots
+
+
+def test_replica_does_not_depend_on_the_number_of_replicas():
+    lattice, model = SquareLattice(8), IsingModel()
+    small = ReplicaEnsemble(lattice, model, 2, seed=4)
+    large = ReplicaEnsemble(lattice, model, 5, seed=4)
+    step, E2, M2 = small.run(2.0, 10)
+    step, E5, M5 = large.run(2.0, 10)
+    assert np.array_equal(large.configs[:2], small.configs)
+    assert np.array_equal(E5[:, :2], E2) and np.array_equal(M5[:, :2], M2)
+    assert not np.array_equal(large.configs[0], large.configs[1])
+
+
+def test_batched_energy_is_the_energy_of_each_replica():
+    lattice = SquareLattice(6)
+    for model in (IsingModel(1.0, 0.3), TwoStateModel()):
+        ensemble = ReplicaEnsemble(lattice, model, 3, seed=1)
+        ensemble.sweep(0.5)
+        expected = [model.energy(c, lattice) for c in ensemble.configs]
+        assert np.allclose(ensemble.energy(), expected)
+
+
+def test_ensemble_average_of_the_canonical_energy(exact_energy):
+    T = 2.5
+    step, E, M = replica_snapshots(IsingModel(1.0, 0.2), SquareLattice(4), T, 300, 64, seed=2)
+    mean, var, err = E
+    assert mean.shape == (301,)
+    assert np.mean(mean[50:]) == pytest.approx(exact_energy(4, T, 0.2), abs=0.03)
+    assert np.all(err == np.sqrt(var/64))
+
+
+def test_ensemble_average():
+    mean, var, err = ensemble_average([[1.0, 2.0, 3.0], [0.0, 0.0, 0.0]])
+    assert mean.tolist() == [2.0, 0.0]
+    assert var.tolist() == [1.0, 0.0]
+    assert err[0] == pytest.approx(np.sqrt(1/3))
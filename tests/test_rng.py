@@ -0,0 +1,35 @@
+import numpy as np
+
+from montecarlo.driver import simulate, temperature_scan
+from montecarlo.lattice import SquareLattice
+from montecarlo.models import IsingModel
+from montecarlo.rng import as_rng, make_rng, streams
+
+
+def test_streams_are_reproducible_and_distinct():
+    a = make_rng(42, (3, 1)).random(1000)
+    assert np.array_equal(a, make_rng(42, (3, 1)).random(1000))
+    assert not np.array_equal(a, make_rng(42, (3, 2)).random(1000))
+    assert not np.array_equal(a, make_rng(43, (3, 1)).random(1000))
+    s = streams(42, 3, (3,))
+    assert np.array_equal(s[1].random(1000), a)
+
+
+def test_bulk_draws_equal_single_draws():
+    bulk = make_rng(5).random(64)
+    rng = make_rng(5)
+    assert np.array_equal(bulk, [rng.random() for i in range(64)])
+
+
+def test_as_rng():
+    rng = make_rng(1)
+    assert as_rng(rng) is rng
+    assert as_rng(7).random() == make_rng(7).random()
+
+
+def test_temperature_m_uses_stream_m():
+    #the result at a temperature does not depend on the other temperatures of the scan
+    model, lattice = IsingModel(), SquareLattice(4)
+    scan = temperature_scan(model, lattice, [1.5, 2.5], 3, 5, seed=9, verbose=False)
+    alone = simulate(model, lattice, 2.5, 3, 5, rng=make_rng(9, (1,)))
+    assert [x[1] for x in scan] == list(alone)
@@ -0,0 +1,107 @@
+import json
+import os
+import subprocess
+import sys
+import time
+
+import pytest
+
+from montecarlo.scheduler import (Coordinator, Task, TaskFailures, run_local, run_task,
+                                  sweep_tasks, task_cost, task_key)
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_run_local_results_in_task_order():
+    tasks = sweep_tasks(['ising', 'twostate'], [4], [2.0], [1], 5, 10)
+    results = run_local(tasks, nworkers=2)
+    assert [r['task']['model'] for r in results] == ['ising', 'twostate']
+    #the random stream only depends on the task
+    assert results[0]['result'] == run_task(tasks[0])
+
+
+def test_longest_job_first():
+    small, large = Task('ising', 8, 3.5, 1, 10, 10), Task('ising', 16, 3.5, 1, 10, 10)
+    critical = Task('ising', 8, 2.27, 1, 10, 10)
+    assert task_cost(large) > task_cost(small)
+    assert task_cost(critical) > task_cost(small)
+
+
+def test_store_resumes_a_sweep(tmp_path):
+    store = str(tmp_path/'results.jsonl')
+    tasks = sweep_tasks(['twostate'], [4], [1.0, 2.0], [1], 2, 4)
+    first = run_local(tasks[:1], nworkers=1, store=store)
+    results = run_local(tasks, nworkers=1, store=store)
+    assert results[0] == first[0]
+    with open(store) as f:
+        assert len([json.loads(line) for line in f]) == 2
+
+
+def test_run_local_raises_on_failed_tasks():
+    tasks = sweep_tasks(['ising'], [4], [2.0], [1], 5, 10) + [Task('nosuch', 4, 2.0, 1, 5, 10)]
+    with pytest.raises(TaskFailures) as info:
+        run_local(tasks, nworkers=1, max_retries=0)
+    assert len(info.value.failed) == 1
+    assert info.value.results[0] is not None and info.value.results[1] is None
+
+
+def test_run_local_gives_up_on_dead_workers(monkeypatch):
+    #workers that exit at once are respawned a bounded number of times
+    monkeypatch.setattr(sys, 'executable', '/bin/false')
+    tasks = sweep_tasks(['ising'], [4], [2.0], [1], 5, 10)
+    with pytest.raises(RuntimeError, match='worker'):
+        run_local(tasks, nworkers=1, max_retries=1, timeout=60)
+
+
+def test_failed_duplicate_is_ignored_while_a_copy_runs():
+    tasks = sweep_tasks(['ising'], [4], [2.0], [1], 5, 10)
+    coord = Coordinator(tasks, max_retries=0, duplicate_after=0.0)
+    try:
+        assert coord._next() == 0
+        time.sleep(0.01)
+        assert coord._next() == 0           # speculative copy of the straggler
+        coord._done(0, 'copy', error='ValueError: lost node')
+        assert coord.failed == {} and 0 in coord._pending
+        coord._done(0, 'first', record={'result': 1})
+        assert coord.failed == {} and coord._finished.is_set()
+        assert coord.ordered_results() == [{'result': 1}]
+    finally:
+        coord._listener.close()
+
+
+def test_failure_counts_when_no_copy_is_left():
+    tasks = sweep_tasks(['ising'], [4], [2.0], [1], 5, 10)
+    coord = Coordinator(tasks, max_retries=1, duplicate_after=0.0)
+    try:
+        coord._next()
+        time.sleep(0.01)
+        coord._next()
+        coord._done(0, 'a', error='first')
+        coord._done(0, 'b', error='second')
+        #one retry used: the task is queued again
+        assert coord._retries[0] == 1 and coord._next() == 0
+        coord._done(0, 'c', error='third')
+        assert coord.failed == {task_key(tasks[0]): 'third'}
+    finally:
+        coord._listener.close()
+
+
+def test_command_line_coordinator_and_worker(tmp_path):
+    env = dict(os.environ, MONTECARLO_AUTHKEY=os.urandom(16).hex(),
+               PYTHONPATH=os.pathsep.join([ROOT] + sys.path))
+    store = str(tmp_path/'results.jsonl')
+    coordinator = subprocess.Popen(
+        [sys.executable, '-m', 'montecarlo.scheduler', 'coordinator', '--sizes', '4',
+         '--temperatures', '2.0', '3.0', '--eq-steps', '5', '--mc-steps', '10', '--host',
+         'localhost', '--store', store, '--timeout', '60'],
+        env=env, stdout=subprocess.PIPE, text=True)
+    line = coordinator.stdout.readline()
+    assert line.startswith('2 tasks, 2 to run')
+    address = line.split()[-1]
+    subprocess.run([sys.executable, '-m', 'montecarlo.scheduler', 'worker', address],
+                   env=env, check=True, timeout=60)
+    out, _ = coordinator.communicate(timeout=60)
+    assert coordinator.returncode == 0
+    assert '2 results, 0 failed' in out
+    with open(store) as f:
+        assert sorted(json.loads(line)['task']['T'] for line in f) == [2.0, 3.0]
@@ -0,0 +1,68 @@
+import importlib.util
+import os
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+
+from montecarlo.kernels import calcEnergy, calcMag
+from montecarlo.lattice import SquareLattice
+from montecarlo.models import IsingModel, TwoStateModel
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCRIPTS = [os.path.join('Ising', 'ising.py'), os.path.join('Ising', 'ising_snapshots.py'),
+           os.path.join('TwoStateModel', 'two_state.py'),
+           os.path.join('TwoStateModel', 'two_state_snapshots.py'),
+           os.path.join('Ising', 'Example_initial_condition_fully_magnetized_1',
+                        'ising_initial_magnetized.py'),
+           os.path.join('TwoStateModel', 'example_3bis', 'two_state_snapshots.py')]
+
+
+def _load(path):
+    '''Module of one of the example scripts, loaded from its file'''
+    spec = importlib.util.spec_from_file_location('_script', os.path.join(ROOT, path))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.mark.parametrize('path', ['montecarlo'] + SCRIPTS)
+def test_import_does_not_load_matplotlib(path):
+    if path == 'montecarlo':
+        code = 'import montecarlo'
+    else:
+        code = ('import importlib.util as u; s = u.spec_from_file_location("m", %r); '
+                'u.module_from_spec(s); s.loader.exec_module(u.module_from_spec(s))'
+                % os.path.join(ROOT, path))
+    code += '; import sys; assert "matplotlib" not in sys.modules'
+    subprocess.run([sys.executable, '-c', code], cwd=ROOT, check=True, timeout=60)
+
+
+def test_library_energies_match_the_scripts():
+    #the scripts print half of the energy of the bonds (see IsingModel)
+    ising = _load(os.path.join('Ising', 'ising.py'))
+    two_state = _load(os.path.join('TwoStateModel', 'two_state.py'))
+    rng = np.random.default_rng(1)
+    for N in (4, 5, 8):
+        config = 2*rng.integers(2, size=(N, N)) - 1
+        lattice = SquareLattice(N)
+        assert calcEnergy(config, lattice, IsingModel()) == 2*ising.calcEnergy(config)
+        assert calcEnergy(config, lattice, TwoStateModel()) == two_state.calcEnergy(config)
+        assert calcMag(config) == ising.calcMag(config)
+
+
+@pytest.mark.parametrize('path', [os.path.join('Ising', 'ising_snapshots.py'),
+                                  os.path.join('TwoStateModel', 'two_state_snapshots.py')])
+def test_snapshot_scripts_stream_the_series_to_a_file(path, tmp_path, monkeypatch):
+    matplotlib = pytest.importorskip('matplotlib')
+    matplotlib.use('Agg')
+    script = _load(path)
+    answers = iter(['1.2', '20'])
+    monkeypatch.setattr('builtins.input', lambda prompt='': next(answers))
+    monkeypatch.setattr(script, 'configPlot', lambda *args: None)
+    monkeypatch.chdir(tmp_path)
+    script.main()
+    step, E, M = np.loadtxt(script.SERIES_FILE, unpack=True)
+    assert step.tolist() == list(range(21))
+    assert np.all(np.abs(M) <= 1)
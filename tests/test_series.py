@@ -0,0 +1,90 @@
+import numpy as np
+import pytest
+
+from montecarlo.driver import snapshots
+from montecarlo.lattice import SquareLattice
+from montecarlo.models import IsingModel
+from montecarlo.series import SeriesWriter, iter_series, read_series
+
+
+def test_round_trip(tmp_path):
+    path = str(tmp_path/'run.series')
+    with SeriesWriter(path, ['E', ('step', 'i8'), ('M', 'f4')], {'T': 2.0}, chunk=3) as w:
+        for t in range(5):
+            w.append(-t/2, t, t/10)
+        w.extend(np.arange(5, 12)*-0.5, np.arange(5, 12), np.arange(5, 12)/10)
+        assert w.rows == 12
+    data, metadata = read_series(path)
+    assert metadata == {'T': 2.0}
+    assert data['step'].dtype == np.int64 and data['M'].dtype == np.float32
+    assert data['step'].tolist() == list(range(12))
+    assert np.array_equal(data['E'], -0.5*np.arange(12))
+    assert np.allclose(data['M'], np.arange(12)/10)
+
+
+def test_complete_chunks_are_read_while_writing(tmp_path):
+    path = str(tmp_path/'run.series')
+    w = SeriesWriter(path, ['x'], chunk=4)
+    w.extend(np.arange(6.0))
+    #the first chunk is on disk, the other two rows are still buffered
+    assert read_series(path)[0]['x'].tolist() == [0, 1, 2, 3]
+    w.close()
+    assert read_series(path)[0]['x'].tolist() == list(range(6))
+
+
+def test_truncated_chunk_is_ignored(tmp_path):
+    path = str(tmp_path/'run.series')
+    with SeriesWriter(path, ['x'], chunk=4) as w:
+        w.extend(np.arange(8.0))
+    with open(path, 'r+b') as f:
+        f.truncate(f.seek(0, 2) - 5)
+    assert read_series(path)[0]['x'].tolist() == [0, 1, 2, 3]
+
+
+def test_append(tmp_path):
+    path = str(tmp_path/'run.series')
+    with SeriesWriter(path, ['x'], {'seed': 1}) as w:
+        w.extend([1.0, 2.0])
+    with SeriesWriter(path, ['x'], append=True) as w:
+        assert w.metadata == {'seed': 1}
+        w.append(3.0)
+    assert read_series(path)[0]['x'].tolist() == [1.0, 2.0, 3.0]
+    with pytest.raises(ValueError):
+        SeriesWriter(path, ['y'], append=True)
+
+
+def test_snapshots_stream_to_a_series_file(tmp_path):
+    args = (IsingModel(), SquareLattice(6), 2.0, 30)
+    step, E, M, config = snapshots(*args, rng=4)
+    path = str(tmp_path/'run.series')
+    out, config2 = snapshots(*args, rng=4, out=path)
+    assert out == path
+    assert np.array_equal(config, config2)
+    data, metadata = read_series(path)
+    assert np.allclose(data['E'], E) and np.allclose(data['M'], M)
+    assert data['step'].tolist() == step
+    assert metadata['T'] == 2.0
+
+
+def test_iter_series_yields_chunks(tmp_path):
+    path = str(tmp_path/'run.series')
+    with SeriesWriter(path, ['x', ('n', 'i4')], chunk=4) as w:
+        w.extend(np.arange(10.0), np.arange(10))
+    chunks = list(iter_series(path))
+    assert [len(c['x']) for c in chunks] == [4, 4, 2]
+    assert np.concatenate([c['n'] for c in chunks]).tolist() == list(range(10))
+
+
+def test_append_after_a_truncated_chunk(tmp_path):
+    path = str(tmp_path/'run.series')
+    with SeriesWriter(path, ['x', ('n', 'i4')], chunk=4) as w:
+        w.extend(np.arange(8.0), np.arange(8))
+    #a run interrupted while writing its third chunk
+    with open(path, 'ab') as f:
+        f.write(np.uint32(4).astype('<u4').tobytes() + np.arange(2.0).tobytes())
+    with SeriesWriter(path, ['x', ('n', 'i4')], chunk=4, append=True) as w:
+        w.extend(np.arange(8.0, 11.0), np.arange(8, 11))
+    data = read_series(path)[0]
+    assert data['x'].tolist() == list(range(11))
+    assert data['n'].tolist() == list(range(11))
+    assert [len(c['x']) for c in iter_series(path)] == [4, 4, 3]
@@ -0,0 +1,70 @@
+import os
+import tracemalloc
+
+import numpy as np
+import pytest
+
+from montecarlo.lattice import SquareLattice
+from montecarlo.models import IsingModel, TwoStateModel
+from montecarlo.rng import make_rng
+from montecarlo.state import SpinState
+
+from test_scripts import _load
+
+
+def test_energy_agrees_with_ising_py():
+    #Ising/ising.py prints half of the energy of the bonds
+    ising = _load(os.path.join('Ising', 'ising.py'))
+    state = SpinState(SquareLattice(10), IsingModel(), rng=make_rng(2))
+    for k in range(5):
+        state.sweep(0.5)
+        assert state.config.dtype == np.int8
+        assert state.energy() == 2*ising.calcEnergy(state.config.astype(int))
+        assert state.magnetization() == ising.calcMag(state.config.astype(int))
+
+
+def test_sweep_samples_the_canonical_energy(exact_energy):
+    state = SpinState(SquareLattice(4), IsingModel(1.0, 0.2), rng=make_rng(3))
+    T = 2.5
+    E = []
+    for t in range(20000):
+        state.sweep(1.0/T)
+        E.append(state.energy()/16)
+    assert np.mean(E[100:]) == pytest.approx(exact_energy(4, T, 0.2), abs=0.03)
+
+
+def test_two_state_occupation():
+    state = SpinState(SquareLattice(32), TwoStateModel(), rng=make_rng(4))
+    E = [state.run(1.0, 1) is not None and state.energy()/1024 for t in range(60)]
+    assert np.mean(E[10:]) == pytest.approx(1.0/(1.0 + np.e), abs=0.005)
+
+
+def test_sweep_memory_does_not_grow_with_the_lattice():
+    #only numpy's fixed size casting buffers, far less than a byte per spin
+    state = SpinState(SquareLattice(512), IsingModel(), rng=make_rng(5))
+    state.sweep(0.4)
+    tracemalloc.start()
+    try:
+        for t in range(3):
+            state.sweep(0.4)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    assert peak < 512*512//2
+
+
+def test_neighbour_tables_are_int32():
+    #160x160: every colour has more than CHUNK sites, so it is gathered in two blocks
+    lattice = SquareLattice(160)
+    model = IsingModel(1.0, 0.3)
+    state = SpinState(lattice, model, rng=make_rng(6))
+    for c in state._colours:
+        assert c.table.dtype == np.int32
+    #at very low T a sweep is deterministic: a spin flips iff the cost is <= 0
+    flat = lattice.flat(state.config.copy())
+    for sites in lattice.colours:
+        s = flat[sites]
+        cost = 2*s*(model.J*flat[lattice.table[sites]].sum(axis=1) + model.h)
+        flat[sites] = np.where(cost <= 0, -s, s)
+    state.sweep(1e6)
+    assert np.array_equal(lattice.flat(state.config), flat)
@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+
+from montecarlo.rng import make_rng
+from montecarlo.stats import autocorrelation, error_of_mean, integrated_time, measurement_interval
+
+
+def _ar1(phi, n, seed=0):
+    '''AR(1) series x_t = phi*x_{t-1} + noise, with tau_int = (1+phi)/(2(1-phi))'''
+    noise = make_rng(seed).standard_normal(n)
+    x = np.empty(n)
+    x[0] = noise[0]
+    for t in range(1, n):
+        x[t] = phi*x[t-1] + noise[t]
+    return x
+
+
+def test_autocorrelation_of_ar1():
+    rho = autocorrelation(_ar1(0.8, 100000))
+    assert rho[0] == 1.0
+    assert rho[1:4] == pytest.approx([0.8, 0.64, 0.512], abs=0.02)
+
+
+def test_integrated_time_of_ar1():
+    assert integrated_time(_ar1(0.8, 100000)) == pytest.approx(4.5, rel=0.1)
+    assert integrated_time(make_rng(1).standard_normal(10000)) == pytest.approx(0.5, abs=0.1)
+
+
+def test_error_of_mean():
+    x = make_rng(2).standard_normal(10000)
+    assert error_of_mean(x) == pytest.approx(0.01, rel=0.1)
+    y = _ar1(0.8, 100000)
+    assert error_of_mean(y) == pytest.approx(np.sqrt(9.0*y.var()/len(y)), rel=0.1)
+
+
+def test_measurement_interval():
+    x = _ar1(0.9, 20000)
+    assert measurement_interval(x) >= 8
+    assert measurement_interval(x, nmax=3) == 3
+    assert measurement_interval(make_rng(3).standard_normal(1000)) == 1
+
+
+def test_empty_series():
+    with pytest.raises(ValueError):
+        autocorrelation([])
+    with pytest.raises(ValueError):
+        error_of_mean([])
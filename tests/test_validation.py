@@ -0,0 +1,74 @@
+import math
+
+import numpy as np
+import pytest
+
+from montecarlo import validation
+from montecarlo.exact import ExactTorus
+from montecarlo.lattice import SquareLattice
+from montecarlo.potts import PottsModel
+from montecarlo.validation import (TC, brute_force, fixed_magnetization_4x4, jackknife, onsager,
+                                   two_state, validate)
+
+FAST = ['checkerboard', 'heatbath', 'spinstate', 'shared', 'potts', 'kawasaki']
+
+
+def test_onsager_specific_heat_is_the_derivative_of_the_energy():
+    for T in (1.5, 2.0, 3.0):
+        dT = 1e-5
+        dE = (onsager(T + dT)['E'] - onsager(T - dT)['E'])/(2*dT)
+        assert onsager(T)['C'] == pytest.approx(dE, rel=1e-5)
+
+
+def test_onsager_limits():
+    assert onsager(0.5)['E'] == pytest.approx(-2.0, abs=1e-6)
+    assert onsager(0.5)['absM'] == pytest.approx(1.0, abs=1e-6)
+    assert onsager(TC - 1e-9)['absM'] < 0.2
+    assert 'absM' not in onsager(3.0)
+    #high temperature series: E = -2 tanh(1/T) + O(T^-3)
+    assert onsager(50.0)['E'] == pytest.approx(-2*math.tanh(1/50.0), rel=1e-3)
+
+
+def test_two_state_closed_forms():
+    r = two_state(1.0)
+    p = 1/(1 + math.e)
+    assert r['E'] == pytest.approx(p)
+    assert r['M'] == pytest.approx(2*p - 1)
+    dT = 1e-5
+    assert r['C'] == pytest.approx((two_state(1 + dT)['E'] - two_state(1 - dT)['E'])/(2*dT), rel=1e-6)
+
+
+def test_fixed_magnetization_is_a_slice_of_g():
+    torus = ExactTorus(4)
+    T = 2.0
+    g = torus.g[:, torus.mags == 0][:, 0]
+    E = -torus.bonds
+    w = g*np.exp(-(E - E.min())/T)
+    assert fixed_magnetization_4x4(T)['E'] == pytest.approx(w @ E/w.sum()/16)
+
+
+def test_brute_force_q2_potts_is_ising():
+    #q=2 Potts with 2J is Ising with J, shifted by J per bond
+    potts = brute_force(PottsModel(2, 2.0), SquareLattice(3), 2.0)
+    ising = ExactTorus(3).thermodynamics(2.0)
+    assert potts['E'] + 2.0 == pytest.approx(ising['E'][0])
+    assert potts['C'] == pytest.approx(ising['C'][0])
+    assert potts['absM'] == pytest.approx(ising['absM'][0])
+
+
+def test_jackknife_of_the_mean_is_the_standard_error():
+    x = np.random.default_rng(0).normal(size=20000)
+    value, err = jackknife(np.mean, x, nblocks=20)
+    assert value == pytest.approx(x.mean())
+    assert err == pytest.approx(x.std()/math.sqrt(len(x)), rel=0.4)
+
+
+def test_fast_engines_pass():
+    results = validate(FAST, quick=True, verbose=False)
+    assert {r['engine'] for r in results} == set(FAST)
+    assert [r for r in results if not r['ok']] == []
+
+
+def test_main_exit_status(capsys):
+    assert validation.main(['--quick', 'heatbath']) == 0
+    assert '0 failed' in capsys.readouterr().out